@@ -0,0 +1,65 @@
+'''
+Benchmark email template rendering on this host.
+
+Usage:
+    python -m app.auth.benchmark_email_templates --iterations 2000
+
+Compares rendering from the precompiled registry against loading and compiling
+each template on every render, for the default and an enterprise branding.
+'''
+
+import argparse
+import statistics
+import time
+from typing import Callable, Optional
+
+from app.auth.services.email_templates import Branding, EmailTemplateRegistry, email_templates
+
+SAMPLE_CONTEXT = {
+    "verification": {"verification_link": "https://example.com/verify-email?token=abc"},
+    "welcome": {},
+    "login_code": {"otp_code": "123456"},
+    "account_recovery": {"otp_code": "123456", "recovery_link": "https://example.com/recover?code=123456"},
+    "password_reset": {"reset_token": 123456},
+    "teammate_invitation": {
+        "inviter_name": "Ada Lovelace",
+        "enterprise_name": "Acme & Co",
+        "invitation_link": "https://example.com/accept-invitation?token=abc",
+        "otp": "a1b2c3d4",
+    },
+}
+
+SAMPLE_BRANDING = Branding(
+    name="Acme & Co",
+    logo_url="/logos/acme.png",
+    primary_color="#0f766e",
+    accent_color="#f59e0b",
+    footer_text="Acme & Co, 1 Marina Road, Lagos",
+)
+
+
+def _median_us(render: Callable[[], str], iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(timings)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark email template rendering")
+    parser.add_argument("--iterations", type=int, default=2000, help="Renders per template for the cached registry")
+    parser.add_argument("--uncached-iterations", type=int, default=50, help="Renders per template when compiling each time")
+    args = parser.parse_args(argv)
+
+    print(f"{'template':<22}{'cached':>12}{'branded':>12}{'uncached':>12}")
+    for name, context in SAMPLE_CONTEXT.items():
+        cached = _median_us(lambda: email_templates.render(name, **context), args.iterations)
+        branded = _median_us(lambda: email_templates.render(name, SAMPLE_BRANDING, **context), args.iterations)
+        uncached = _median_us(lambda: EmailTemplateRegistry().render(name, **context), args.uncached_iterations)
+        print(f"{name:<22}{cached:>10.1f}us{branded:>10.1f}us{uncached:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
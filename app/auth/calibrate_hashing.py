@@ -0,0 +1,112 @@
+'''
+Benchmark password hashing parameters on this host.
+
+Usage:
+    python -m app.auth.calibrate_hashing --target-ms 250
+
+Prints the strongest bcrypt and argon2 settings whose median hashing time stays
+within the target, as environment variables for `.env`. Existing hashes are
+upgraded transparently on the next successful login once the new settings are
+deployed.
+'''
+
+import argparse
+import statistics
+import time
+from typing import Optional
+
+from passlib.context import CryptContext
+from passlib.exc import MissingBackendError
+
+SAMPLE_PASSWORD = "Calibrate@123"
+
+BCRYPT_CANDIDATES = range(10, 17)
+# (time_cost, memory_cost KiB), weakest first
+ARGON2_CANDIDATES = [
+    (2, 19456),
+    (2, 32768),
+    (3, 65536),
+    (4, 65536),
+    (3, 131072),
+    (4, 262144),
+]
+
+
+def _median_ms(context: CryptContext, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> Optional[dict]:
+    best = None
+    for rounds in BCRYPT_CANDIDATES:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+        elapsed = _median_ms(context, samples)
+        print(f"bcrypt rounds={rounds}: {elapsed:.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = {"BCRYPT_ROUNDS": rounds, "median_ms": round(elapsed, 1)}
+    return best
+
+
+def calibrate_argon2(target_ms: float, samples: int, parallelism: int) -> Optional[dict]:
+    best = None
+    for time_cost, memory_cost in ARGON2_CANDIDATES:
+        context = CryptContext(
+            schemes=["argon2"],
+            argon2__rounds=time_cost,
+            argon2__memory_cost=memory_cost,
+            argon2__parallelism=parallelism,
+        )
+        try:
+            elapsed = _median_ms(context, samples)
+        except MissingBackendError:
+            print("argon2: skipped, install argon2-cffi to benchmark it")
+            return None
+        print(f"argon2 t={time_cost} m={memory_cost}KiB p={parallelism}: {elapsed:.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = {
+            "ARGON2_TIME_COST": time_cost,
+            "ARGON2_MEMORY_COST": memory_cost,
+            "ARGON2_PARALLELISM": parallelism,
+            "median_ms": round(elapsed, 1),
+        }
+    return best
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Calibrate password hashing cost for this host")
+    parser.add_argument("--target-ms", type=float, default=250, help="Maximum median time per hash")
+    parser.add_argument("--samples", type=int, default=5, help="Hashes per candidate")
+    parser.add_argument("--parallelism", type=int, default=1, help="argon2 lanes per hash")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=None,
+                        help="Scheme to recommend as default (defaults to the first that meets the target)")
+    args = parser.parse_args(argv)
+
+    results = {
+        "bcrypt": calibrate_bcrypt(args.target_ms, args.samples),
+        "argon2": calibrate_argon2(args.target_ms, args.samples, args.parallelism),
+    }
+
+    preferred = [args.scheme] if args.scheme else ["argon2", "bcrypt"]
+    chosen = next((s for s in preferred if results.get(s)), None)
+    if not chosen:
+        print(f"\nNo candidate met the {args.target_ms} ms target; keep the current settings.")
+        return
+
+    print(f"\n# Recommended settings (target {args.target_ms} ms)")
+    schemes = [chosen] + [s for s in ("argon2", "bcrypt") if s != chosen and results.get(s)]
+    print(f"PASSWORD_SCHEMES = \"{','.join(schemes)}\"")
+    for scheme in schemes:
+        for key, value in results[scheme].items():
+            if key != "median_ms":
+                print(f"{key} = {value}")
+
+
+if __name__ == "__main__":
+    main()
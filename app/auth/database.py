@@ -1,23 +1,240 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.exc import DBAPIError, InvalidRequestError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 # from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declarative_base, Session
+from app.config import DatabaseSettings, get_database_settings
+
+
+def normalize_database_url(database_url: str) -> URL:
+    """Map plain driver URLs onto their async drivers"""
+    url = make_url(database_url)
+    if url.drivername in ("postgres", "postgresql", "postgresql+psycopg2"):
+        url = url.set(drivername="postgresql+asyncpg")
+    elif url.drivername in ("sqlite", "sqlite+pysqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def create_engine_from_settings(settings: DatabaseSettings, database_url: str | None = None) -> AsyncEngine:
+    """Build an async engine with pooling and backend-specific tuning"""
+    url = normalize_database_url(database_url or settings.database_url)
+    options: dict = {"echo": settings.db_echo}
+    connect_args: dict = {}
+
+    if not _is_memory_sqlite(url):
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+
+    if url.get_backend_name() == "postgresql":
+        # Cache of prepared statements per connection, kept by SQLAlchemy's asyncpg dialect
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.db_prepared_statement_cache_size)})
+        if settings.db_statement_timeout_ms:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+
+    engine = create_async_engine(url, connect_args=connect_args, **options)
+
+    if url.get_backend_name() == "sqlite":
+        pragmas = [
+            f"PRAGMA synchronous={settings.sqlite_synchronous}",
+            f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+            f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        ]
+        if not _is_memory_sqlite(url):
+            pragmas.insert(0, f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return engine
+
+
+class ReadOnlySession(Session):
+    """Session for read-only requests; it refuses to flush or commit"""
+
+    def flush(self, objects=None):
+        raise InvalidRequestError("Read-only session cannot write")
+
+    def commit(self):
+        raise InvalidRequestError("Read-only session cannot commit")
+
+
+def read_sessionmaker(bind: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(bind, expire_on_commit=False, autoflush=False, sync_session_class=ReadOnlySession)
+
+
+class ReplicaRouter:
+    """
+    Round-robin over read replicas. A replica that fails to connect is
+    skipped for `retry_after` seconds; when none are usable, reads go to
+    the primary (if allowed).
+    """
 
-# Use environment variables in production
-DATABASE_URL = "sqlite+aiosqlite:///./auth.db"
+    def __init__(self, engines: List[AsyncEngine], primary: async_sessionmaker, retry_after: float, fallback_to_primary: bool = True):
+        self.engines = engines
+        self.primary = primary
+        self.retry_after = retry_after
+        self.fallback_to_primary = fallback_to_primary
+        self._factories = [read_sessionmaker(e) for e in engines]
+        self._unhealthy_until = [0.0] * len(engines)
+        self._next = 0
+        self.fallbacks = 0
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+    def _candidates(self) -> List[int]:
+        count = len(self.engines)
+        if not count:
+            return []
+        start = self._next
+        self._next = (start + 1) % count
+        now = time.monotonic()
+        order = ((start + i) % count for i in range(count))
+        return [i for i in order if self._unhealthy_until[i] <= now]
+
+    def mark_unhealthy(self, index: int) -> None:
+        self._unhealthy_until[index] = time.monotonic() + self.retry_after
+
+    async def session(self) -> AsyncSession:
+        for index in self._candidates():
+            session = self._factories[index]()
+            try:
+                await session.connection()
+                return session
+            except (DBAPIError, OSError) as e:
+                await session.close()
+                self.mark_unhealthy(index)
+                print(f"Read replica {self.engines[index].url.render_as_string(hide_password=True)} unavailable: {e}")
+        if self.engines and not self.fallback_to_primary:
+            raise RuntimeError("No read replica available")
+        if self.engines:
+            self.fallbacks += 1
+        return self.primary()
+
+    def session_nowait(self) -> AsyncSession:
+        """Next healthy replica without a connection check (or the primary)"""
+        candidates = self._candidates()
+        if candidates:
+            return self._factories[candidates[0]]()
+        if self.engines and not self.fallback_to_primary:
+            raise RuntimeError("No read replica available")
+        return self.primary()
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": [
+                {
+                    "url": e.url.render_as_string(hide_password=True),
+                    "healthy": self._unhealthy_until[i] <= now,
+                }
+                for i, e in enumerate(self.engines)
+            ],
+            "primary_fallbacks": self.fallbacks,
+        }
+
+
+class LazySession:
+    """
+    Stands in for an AsyncSession and only creates it on first use, so a
+    request rejected before it touches the database (bad token, validation
+    error, cache hit) never opens a session or checks out a connection.
+    """
+
+    _ASYNC_METHODS = frozenset({
+        "execute", "scalar", "scalars", "get", "get_one", "stream", "stream_scalars",
+        "refresh", "delete", "merge", "flush", "connection", "run_sync",
+    })
+
+    def __init__(self, factory: Callable[[], AsyncSession], async_factory: Optional[Callable[[], Awaitable[AsyncSession]]] = None):
+        self._factory = factory
+        self._async_factory = async_factory
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def materialized(self) -> bool:
+        return self._session is not None
+
+    async def _materialize(self) -> AsyncSession:
+        if self._session is None:
+            self._session = await self._async_factory() if self._async_factory else self._factory()
+        return self._session
+
+    def __getattr__(self, name):
+        if self._session is not None:
+            return getattr(self._session, name)
+        if name in self._ASYNC_METHODS:
+            async def call(*args, **kwargs):
+                session = await self._materialize()
+                return await getattr(session, name)(*args, **kwargs)
+            return call
+        # Synchronous use (add, begin, ...) cannot await, so skip any async setup
+        self._session = self._factory()
+        return getattr(self._session, name)
+
+    def in_transaction(self) -> bool:
+        return self._session is not None and self._session.in_transaction()
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+_settings = get_database_settings()
+engine = create_engine_from_settings(_settings)
 AsyncSessionLocal = async_sessionmaker(
     engine, expire_on_commit=False
 )
+replica_router = ReplicaRouter(
+    [create_engine_from_settings(_settings, url) for url in _settings.replica_urls],
+    primary=read_sessionmaker(engine),
+    retry_after=_settings.db_replica_retry_seconds,
+    fallback_to_primary=_settings.db_replica_fallback_to_primary,
+)
 Base = declarative_base()
 
 async def get_db():
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
+    session = LazySession(AsyncSessionLocal)
+    try:
+        yield session
+        if session.in_transaction():
             await session.commit()
-        except:
+    except:
+        if session.in_transaction():
             await session.rollback()
-            raise
-        finally:
-            await session.close()
+        raise
+    finally:
+        await session.close()
+
+
+async def get_read_db():
+    """Session for pure reads, served by a replica when configured. Never commits."""
+    session = LazySession(replica_router.session_nowait, replica_router.session)
+    try:
+        yield session
+    finally:
+        # close() rolls back whatever the request opened
+        await session.close()
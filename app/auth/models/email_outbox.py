@@ -0,0 +1,40 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Enum as SQLAEnum, Index
+from app.auth.database import Base
+import enum
+
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
+
+
+class EmailOutbox(Base):
+    """
+    Emails waiting to be delivered. Rows are written in the same transaction
+    as the change that triggers them and delivered by the outbox worker.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    template = Column(String, nullable=False)
+    to_email = Column(String, nullable=False)
+    context = Column(JSON, nullable=False, default=dict)
+    # Optional idempotency key; a second message with the same key is dropped
+    dedup_key = Column(String, nullable=True, unique=True)
+
+    status = Column(SQLAEnum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # When the one-time code or link in `context` stops working; undelivered by then, the row is dropped
+    expires_at = Column(DateTime, nullable=True)
+    claim_token = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SQLAEnum, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SQLAEnum, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship, foreign
 from app.auth.database import Base
 from app.enterprises.models.enterprises import Enterprise
@@ -36,10 +36,10 @@ class User(Base):
     is_superuser = Column(Boolean, default=False)
     last_login = Column(DateTime, nullable=True)
     email_verified = Column(Boolean, default=False)
-    verification_token = Column(String, nullable=True)
+    # Bumped when enterprise memberships change so claims-bearing tokens are refreshed
+    token_version = Column(Integer, default=0, nullable=False)
+    verification_token_hash = Column(String(64), nullable=True, unique=True, index=True)
     verification_token_expires_at = Column(DateTime, nullable=True)
-    otp_code = Column(String, nullable=True)
-    otp_code_expires_at = Column(DateTime, nullable=True)
     # is_onboarded = Column(Boolean, default=False)
     
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -64,10 +64,10 @@ class Staff(Base):
     __tablename__ = "staff"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), unique=False, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=False, nullable=False)
     enterprise_id = Column(Integer, ForeignKey("enterprises.id"), nullable=False)
     inviter_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    invite_token = Column(String, nullable=True)
+    invite_token_hash = Column(String(64), nullable=True, unique=True, index=True)
     invite_token_expires_at = Column(DateTime, nullable=True)
     role = Column(SQLAEnum(StaffRole), nullable=False)
 
@@ -94,6 +94,8 @@ class Staff(Base):
     
     __table_args__ = (
         UniqueConstraint('user_id', 'enterprise_id', name='uq_staff_user_enterprise'),
+        # Membership checks filter on all three; the leading user_id also serves per-user lookups
+        Index('ix_staff_user_enterprise_active', 'user_id', 'enterprise_id', 'is_active'),
     )
 
 
@@ -101,7 +103,7 @@ class Client(Base):
     __tablename__ = "clients"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), unique=False, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=False, nullable=False)
     enterprise_id = Column(Integer, ForeignKey("enterprises.id"), nullable=False)
     inviter_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
@@ -129,6 +131,7 @@ class Client(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'enterprise_id', name='uq_client_user_enterprise'),
+        Index('ix_clients_user_enterprise_active', 'user_id', 'enterprise_id', 'is_active'),
     )
 
 
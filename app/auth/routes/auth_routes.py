@@ -1,17 +1,22 @@
-from fastapi import Depends, HTTPException, status, APIRouter
+from fastapi import Depends, Header, HTTPException, status, APIRouter
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.auth.database import get_db
+from app.auth.database import get_db, get_read_db
 from app.schemas.schema import UserCreate, UserResponse, UserRegisterResponse
 from app.auth.schemas.auth_schemas import LoginRequest, TokenResponse, RefreshRequest, LoginResponse
+from app.auth.schemas.auth_schemas import IntrospectionBatchRequest, IntrospectionBatchResponse
 from app.auth.services.auth_service import AuthService
-from app.auth.services.email_service import EmailService
+from app.auth.services.token_service import TokenService
 from typing import Dict, Any
 
 from fastapi.responses import RedirectResponse
 import os
+import secrets
 from dotenv import load_dotenv
 load_dotenv()
 
+# Shared secret for service-to-service endpoints; they are disabled when unset
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
+
 
 auth_router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -32,15 +37,15 @@ async def register_user(
     )
 
     if error:
-        if "user created" in error.lower():
-            return user, error
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error
-            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
 
-    return user, {"message": "User successfully created, check your spam mail for verification mail"}
+    return UserRegisterResponse(
+        **UserResponse.model_validate(user).model_dump(),
+        message="User successfully created, check your spam mail for verification mail"
+    )
 
 @auth_router.post("/resend-verification-email", status_code=status.HTTP_200_OK)
 async def resend_verification_email(
@@ -48,7 +53,6 @@ async def resend_verification_email(
     db: AsyncSession = Depends(get_db)
 ):
     auth_service = AuthService(db)
-    email_service = EmailService()
     user = await auth_service.get_user_by_email(email)
     if not user:
         raise HTTPException(
@@ -61,9 +65,7 @@ async def resend_verification_email(
             detail="Email already verified",
         )
     
-    token = user.verification_token
-    verification_link = f"http://xenx.onrender.com/verify-email?token={token}"
-    await email_service.send_verification_email(str(user.email), verification_link)
+    await auth_service.resend_verification_email(user)
     
     return {"message": f"Verification email sent to {user.email}"}
 
@@ -105,3 +107,20 @@ async def refresh_token(
 ) -> Dict[str, str]:
     auth_service = AuthService(db)
     return await auth_service.refresh_token(refresh_data.refresh_token)
+
+
+@auth_router.post("/introspect/batch", response_model=IntrospectionBatchResponse, include_in_schema=False)
+async def introspect_tokens_batch(
+    payload: IntrospectionBatchRequest,
+    x_internal_api_key: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+) -> Dict[str, Any]:
+    """
+    Internal: validate a batch of access tokens and resolve their users in one call.
+    Results are returned in request order.
+    """
+    if not INTERNAL_API_KEY or not x_internal_api_key or not secrets.compare_digest(x_internal_api_key, INTERNAL_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+    results = await TokenService.introspect_tokens(db, payload.tokens)
+    return {"results": results}
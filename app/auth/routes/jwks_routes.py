@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Request, Response, status
+from app.auth.services.token_service import JWKS_CACHE_SECONDS, key_ring
+import hashlib
+
+
+jwks_router = APIRouter(tags=["Authentication"])
+
+@jwks_router.get("/.well-known/jwks.json", summary="Public keys for verifying access tokens")
+async def get_jwks(request: Request):
+    """
+    JSON Web Key Set with every public key that may have signed a live token.
+    Empty when tokens are signed with a shared secret (HS256).
+    """
+    body = key_ring.jwks() if key_ring else b'{"keys": []}'
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {
+        "Cache-Control": f"public, max-age={JWKS_CACHE_SECONDS}",
+        "ETag": etag,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -11,11 +11,10 @@ from app.auth.schemas.auth_schemas import (
     MessageResponse,
     AccountRecoveryRequest
 )
-from app.auth.services.auth_service import AuthService
-from app.auth.services.email_service import EmailService
+from app.auth.services.auth_service import AuthService, PasswordPolicy
+from app.auth.services.email_outbox import enqueue_email
 
 
-email_service = EmailService()
 recovery_router = APIRouter(prefix="/auth", tags=["Account Recovery"])
 
 @recovery_router.post(
@@ -49,7 +48,8 @@ async def send_one_time_login_code(payload: ForgotPasswordSchema, db: AsyncSessi
     if user:
         try:
             otp_code = await auth_service.create_otp(user)
-            await email_service.send_login_code_email(payload.email, otp_code)
+            await enqueue_email(db, "login_code", payload.email, expires_at=auth_service.otp_expires_at(), otp_code=otp_code)
+            await db.commit()
         except Exception:
             # Silently fail to avoid leaking information about valid emails
             pass
@@ -133,13 +133,16 @@ async def reset_password(payload: ResetPasswordSchema, db: AsyncSession = Depend
             detail="No account found with this email address",
         )
 
+    # Validate before verifying, codes are single-use
+    is_valid, error_msg = PasswordPolicy.validate(payload.new_password)
+    if not is_valid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
+
     if not await auth_service.verify_otp(user, payload.code):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired code. Codes expire after 15 minutes.",
         )
-
-    # Password validation is handled in the update_password method
     
     # We need to get the user ID as an integer to avoid SQLAlchemy Column type issues
     try:
@@ -206,18 +209,18 @@ async def initiate_account_recovery(
             if payload.recovery_url:
                 recovery_link = f"{payload.recovery_url}?email={payload.email}&code={otp_code}"
             
-            # Send the recovery email
-            await email_service.send_account_recovery_email(
-                to_email=payload.email,
-                otp_code=otp_code,
-                recovery_link=recovery_link
+            # Queue the recovery email
+            await enqueue_email(
+                db, "account_recovery", payload.email,
+                expires_at=auth_service.otp_expires_at(), otp_code=otp_code, recovery_link=recovery_link,
             )
+            await db.commit()
             
             # For logging purposes only, don't change the user-facing message
-            print(f"Recovery email sent to {payload.email}")
+            print(f"Recovery email queued for {payload.email}")
         except Exception as e:
             # Log the error but don't expose it to the client
-            print(f"Error sending recovery email: {str(e)}")
+            print(f"Error queueing recovery email: {str(e)}")
             
     # Return the same generic message regardless of whether the email was sent
     # This is important for security to prevent user enumeration
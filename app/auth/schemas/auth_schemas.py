@@ -1,5 +1,8 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, Union
+from typing import Dict, List, Optional, Union
+import os
+
+INTROSPECTION_MAX_BATCH = int(os.getenv("INTROSPECTION_MAX_BATCH", 1000))
 
 class LoginRequest(BaseModel):
     """Schema for login request with either email or username"""
@@ -67,3 +70,33 @@ class PasswordResetResponse(BaseModel):
     """Response for password reset confirmation"""
     message: str = Field(..., description="Success message for password reset")
     success: bool = Field(..., description="Whether the operation was successful")
+
+class IntrospectionBatchRequest(BaseModel):
+    """Access tokens to validate in one call"""
+    tokens: List[str] = Field(..., min_length=1, max_length=INTROSPECTION_MAX_BATCH)
+
+class IntrospectedPrincipal(BaseModel):
+    """User data resolved for an active token"""
+    id: int
+    email: str
+    username: str
+    subscription_plan: str
+    is_active: bool
+    is_superuser: bool
+    email_verified: bool
+    memberships: Optional[Dict[int, str]] = Field(None, description="Enterprise id to staff role, for claims tokens")
+
+    class Config:
+        from_attributes = True
+
+class TokenIntrospection(BaseModel):
+    """Result for a single token, in request order"""
+    active: bool
+    status: str = Field(..., description="active, expired, invalid, outdated, user_not_found or user_inactive")
+    sub: Optional[str] = None
+    exp: Optional[float] = None
+    principal: Optional[IntrospectedPrincipal] = None
+
+class IntrospectionBatchResponse(BaseModel):
+    """Per-token introspection results"""
+    results: List[TokenIntrospection]
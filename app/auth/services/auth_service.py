@@ -1,17 +1,24 @@
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
 from app.auth.models.users import User
-from app.auth.services.token_service import TokenService
+from app.auth.services.token_service import TokenService, REFRESH_TOKEN_EXPIRE_DAYS, hash_token
+from app.auth.services.revocation_service import revocation_index
 from typing import Optional, Dict, Any, Union
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status
+import asyncio
 import re
 import secrets
-from app.auth.services.email_service import EmailService
+from app.auth.services.email_outbox import enqueue_email
+from app.auth.services.password_hasher import password_hasher
+from app.auth.services.otp_store import otp_store
+from app.auth.services.principal_cache import principal_cache
+from app.auth.database import AsyncSessionLocal
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Strong references to in-flight rehash tasks so they are not garbage collected
+_background_tasks: set[asyncio.Task] = set()
 
 class PasswordPolicy:
     MIN_LENGTH = 8
@@ -30,11 +37,11 @@ class AuthService:
         self.session = session
 
     # Password confirmation
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await password_hasher.verify(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+    async def get_password_hash(self, password: str) -> str:
+        return await password_hasher.hash(password)
 
     # Create user
     async def create_user(
@@ -52,6 +59,9 @@ class AuthService:
         if not is_valid:
             return None, error_msg
 
+        # Hash outside the try block so a saturated pool surfaces as a 503
+        password_hash = await self.get_password_hash(password)
+
         try:
             verification_token = secrets.token_urlsafe(32)
             verification_token_expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
@@ -59,27 +69,24 @@ class AuthService:
             user = User(
                 email=email,
                 username=username,
-                password_hash=self.get_password_hash(password),
+                password_hash=password_hash,
                 # role=role,
                 first_name=first_name,
                 last_name=last_name,
                 phone_number=phone_number,
-                verification_token=verification_token,
+                verification_token_hash=hash_token(verification_token),
                 verification_token_expires_at=verification_token_expires_at
             )
             self.session.add(user)
+            # Queued in the same transaction; the outbox worker sends it after commit
+            verification_link = f"http://xenx.onrender.com/verify-email?token={verification_token}"
+            await enqueue_email(
+                self.session, "verification", email,
+                expires_at=verification_token_expires_at, verification_link=verification_link,
+            )
             await self.session.commit()
             await self.session.refresh(user)
 
-            try:
-                # Send verification email
-                email_service = EmailService()
-                verification_link = f"http://xenx.onrender.com/verify-email?token={verification_token}"
-                await email_service.send_verification_email(email, verification_link)
-            except Exception as e:
-                await self.session.rollback()
-                return user, f"User Created. Failed to send verification email: {str(e)}"
-
             return user, ""
         except IntegrityError as e:
             await self.session.rollback()
@@ -92,8 +99,20 @@ class AuthService:
             await self.session.rollback()
             return None, str(e)
 
+    async def resend_verification_email(self, user: User) -> None:
+        """Issue a fresh verification token and queue it; only its hash is stored, so the old one can't be resent"""
+        verification_token = secrets.token_urlsafe(32)
+        user.verification_token_hash = hash_token(verification_token) # type: ignore
+        user.verification_token_expires_at = datetime.now(timezone.utc) + timedelta(hours=1) # type: ignore
+        verification_link = f"http://xenx.onrender.com/verify-email?token={verification_token}"
+        await enqueue_email(
+            self.session, "verification", str(user.email),
+            expires_at=user.verification_token_expires_at, verification_link=verification_link,  # type: ignore
+        )
+        await self.session.commit()
+
     async def verify_user_email(self, token: str) -> tuple[bool, Union[str, Dict[str, Any]]]:
-        result = await self.session.execute(select(User).filter(User.verification_token == token))
+        result = await self.session.execute(select(User).filter(User.verification_token_hash == hash_token(token)))
         user = result.scalar_one_or_none()
 
         if not user:
@@ -103,16 +122,14 @@ class AuthService:
             return False, "Verification token has expired"
 
         user.email_verified = True # type: ignore
-        user.verification_token = None # type: ignore
+        user.verification_token_hash = None # type: ignore
         user.verification_token_expires_at = None # type: ignore
+        await enqueue_email(self.session, "welcome", str(user.email), dedup_key=f"welcome:{user.id}")
         await self.session.commit()
-
-        # Send welcome email
-        email_service = EmailService()
-        await email_service.send_welcome_email(user.email) # type: ignore
+        await principal_cache.invalidate(user.id) # type: ignore
 
         # Generate tokens
-        tokens = TokenService.create_tokens_for_user(user)
+        tokens = await TokenService.issue_tokens_for_user(self.session, user)
         return True, tokens
 
     # Log user in
@@ -137,8 +154,11 @@ class AuthService:
         if not bool(user.is_active):
             return None, "Account disabled"
             
-        if not self.verify_password(password, user.password_hash): # type: ignore
+        if not await self.verify_password(password, user.password_hash): # type: ignore
             return None, "Invalid credentials"
+
+        if password_hasher.needs_update(user.password_hash): # type: ignore
+            self.schedule_rehash(user.id, password, user.password_hash) # type: ignore
             
         # Update last login time
         user.last_login = datetime.now(timezone.utc)  # type: ignore
@@ -146,6 +166,28 @@ class AuthService:
         
         return user, ""
         
+    @staticmethod
+    def schedule_rehash(user_id: int, password: str, old_hash: str) -> None:
+        """Upgrade a stale password hash in the background after a successful login"""
+        task = asyncio.create_task(AuthService._rehash_password(user_id, password, old_hash))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    @staticmethod
+    async def _rehash_password(user_id: int, password: str, old_hash: str) -> None:
+        try:
+            new_hash = await password_hasher.hash(password)
+            async with AsyncSessionLocal() as session:
+                # Only replace the hash we verified against, never a newer password
+                await session.execute(
+                    update(User)
+                    .where(User.id == user_id, User.password_hash == old_hash)
+                    .values(password_hash=new_hash)
+                )
+                await session.commit()
+        except Exception as e:
+            print(f"Password rehash for user {user_id} failed: {str(e)}")
+
     async def login(self, email: Optional[str] = None, username: Optional[str] = None, password: str = None) -> Dict[str, Any]: # type: ignore
         """Login a user and return tokens"""
         if email:
@@ -170,7 +212,7 @@ class AuthService:
             )
             
         # Generate tokens
-        tokens = TokenService.create_tokens_for_user(user)
+        tokens = await TokenService.issue_tokens_for_user(self.session, user)
         
         # Add user info to response
         user_data = {
@@ -206,7 +248,7 @@ class AuthService:
         await self.session.commit()
 
         # Generate tokens
-        tokens = TokenService.create_tokens_for_user(user)
+        tokens = await TokenService.issue_tokens_for_user(self.session, user)
 
         # Add user info to response
         user_data = {
@@ -222,27 +264,25 @@ class AuthService:
 
         return {**tokens, "user": user_data}
         
+    @staticmethod
+    def _otp_subject(user: User) -> str:
+        return f"user:{user.id}"
+
     async def create_otp(self, user: User) -> str:
-        """Generate and save OTP for a user"""
-        otp = "".join([str(secrets.randbelow(10)) for _ in range(6)])
-        user.otp_code = self.get_password_hash(otp) # Hash the OTP
-        user.otp_code_expires_at = datetime.now(timezone.utc) + timedelta(minutes=10) # OTP valid for 10 minutes
-        await self.session.commit()
-        return otp
+        """Generate and store an OTP for a user"""
+        return await otp_store.issue(self._otp_subject(user))
+
+    def otp_expires_at(self) -> datetime:
+        """When an OTP issued now stops working"""
+        return datetime.now(timezone.utc) + timedelta(seconds=otp_store.ttl)
 
     async def verify_otp(self, user: User, otp: str) -> bool:
-        """Verify OTP for a user"""
-        if not user.otp_code or not user.otp_code_expires_at:
-            return False
-        if datetime.now(timezone.utc) > user.otp_code_expires_at:
-            return False # OTP expired
-        return self.verify_password(otp, user.otp_code)
+        """Verify OTP for a user. A valid code is consumed."""
+        return await otp_store.verify(self._otp_subject(user), otp)
 
     async def clear_otp(self, user: User):
         """Clear OTP for a user after use"""
-        user.otp_code = None
-        user.otp_code_expires_at = None
-        await self.session.commit()
+        await otp_store.clear(self._otp_subject(user))
         
     async def update_password(self, user_id: int, new_password: str) -> bool:
         """Update a user's password after account recovery
@@ -266,39 +306,62 @@ class AuthService:
                 return False
                 
             # Update the password
-            hashed_password = self.get_password_hash(new_password)
+            hashed_password = await self.get_password_hash(new_password)
             user.password_hash = hashed_password
             await self.session.commit()
+            await principal_cache.invalidate(user_id)
             return True
+        except HTTPException:
+            # Hashing pool saturated, let the caller see the 503
+            await self.session.rollback()
+            raise
         except Exception:
             await self.session.rollback()
             return False
 
     # New access token
     async def refresh_token(self, refresh_token: str) -> Dict[str, str]:
-        """Generate new access token using refresh token"""
+        """
+        Exchange a refresh token for a new token pair. The presented token is
+        revoked (rotation); presenting it again revokes its whole family.
+        """
+        invalid = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
         try:
             # Verify the refresh token
             payload = TokenService.verify_token(refresh_token, token_type="refresh")
             user_id = int(payload.get("sub"))
+            jti, family = payload.get("jti"), payload.get("fam")
+            if not jti or not family:
+                raise invalid
+
+            if await revocation_index.is_revoked(family):
+                raise invalid
+
+            if not await revocation_index.revoke(jti, float(payload["exp"])):
+                # Token was already rotated: assume it leaked and end the session
+                family_expires_at = (datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)).timestamp()
+                await revocation_index.revoke(family, family_expires_at)
+                raise invalid
             
             # Get the user
             result = await self.session.execute(select(User).filter(User.id == user_id))
             user = result.scalar_one_or_none()
             
             if not user or not user.is_active:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid refresh token",
-                    headers={"WWW-Authenticate": "Bearer"}
-                )
+                raise invalid
                 
             # Generate new tokens
-            return TokenService.create_tokens_for_user(user)
+            return await TokenService.issue_tokens_for_user(self.session, user, family)
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=str(e),
                 headers={"WWW-Authenticate": "Bearer"}
-            )
\ No newline at end of file
+            )
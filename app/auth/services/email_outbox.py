@@ -0,0 +1,274 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.auth.database import AsyncSessionLocal
+from app.auth.models.email_outbox import EmailOutbox, OutboxStatus
+from app.auth.services.email_service import EmailService
+from app.auth.services.email_transport import EmailDeliveryError
+
+load_dotenv()
+
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "true").lower() == "true"
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 500))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 5))
+# After a wake-up, wait this long so emails from concurrent requests share provider calls
+EMAIL_OUTBOX_COALESCE_SECONDS = float(os.getenv("EMAIL_OUTBOX_COALESCE_SECONDS", 0.5))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 8))
+EMAIL_OUTBOX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", 30))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", 3600))
+# How long a claimed batch is reserved before another worker may pick it up
+EMAIL_OUTBOX_LEASE_SECONDS = float(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", 300))
+
+_PENDING_KEY = "email_outbox_pending"
+
+
+async def enqueue_email(
+    session: AsyncSession,
+    template: str,
+    to_email: str,
+    dedup_key: Optional[str] = None,
+    expires_at: Optional[datetime] = None,
+    **context: Any,
+) -> None:
+    """
+    Add an email to the outbox as part of the session's transaction. Nothing is
+    sent unless the caller commits; a message whose dedup_key is already in the
+    outbox is dropped. Pass `expires_at` when the context holds a one-time code
+    or link: the row is discarded, unsent, once it has expired.
+    """
+    if template not in EmailService.SUBJECTS:
+        raise ValueError(f"Unknown email template: {template}")
+    if expires_at is not None and expires_at.tzinfo is not None:
+        expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    values = dict(
+        template=template,
+        to_email=to_email,
+        context=context,
+        dedup_key=dedup_key,
+        status=OutboxStatus.PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+        expires_at=expires_at,
+    )
+    if dedup_key is None:
+        session.add(EmailOutbox(**values))
+    else:
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(EmailOutbox).values(**values).on_conflict_do_nothing(index_elements=["dedup_key"])
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(EmailOutbox).values(**values).on_conflict_do_nothing(index_elements=["dedup_key"])
+        else:
+            stmt = insert(EmailOutbox).values(**values)
+        await session.execute(stmt)
+    session.info[_PENDING_KEY] = True
+
+
+class OutboxWorker:
+    """
+    Drains the email outbox in batches. Rows are claimed with a lease so
+    several workers (or processes) can run side by side; failed sends are
+    retried with exponential backoff and dead-lettered after
+    EMAIL_OUTBOX_MAX_ATTEMPTS or on a permanent provider error.
+
+    The context of a row may hold one-time codes, so it is wiped as soon as
+    the row is sent, dead-lettered or expired.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        email_service: Optional[EmailService] = None,
+        batch_size: int = EMAIL_OUTBOX_BATCH_SIZE,
+        poll_interval: float = EMAIL_OUTBOX_POLL_SECONDS,
+        coalesce: float = EMAIL_OUTBOX_COALESCE_SECONDS,
+        max_attempts: int = EMAIL_OUTBOX_MAX_ATTEMPTS,
+        backoff: float = EMAIL_OUTBOX_BACKOFF_SECONDS,
+        max_backoff: float = EMAIL_OUTBOX_MAX_BACKOFF_SECONDS,
+        lease: float = EMAIL_OUTBOX_LEASE_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.email_service = email_service or EmailService()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.coalesce = coalesce
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.expired = 0
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(self.max_backoff, self.backoff * (2 ** (attempts - 1))))
+
+    async def _expire(self, session: AsyncSession, now: datetime) -> None:
+        """Dead-letter pending rows whose code has expired; sending them would be useless"""
+        result = await session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.status == OutboxStatus.PENDING, EmailOutbox.expires_at <= now)
+            .values(status=OutboxStatus.DEAD, context={}, claim_token=None, last_error="Expired before delivery")
+        )
+        self.expired += result.rowcount or 0
+
+    async def _claim(self, token: str) -> List[EmailOutbox]:
+        now = datetime.utcnow()
+        due = (EmailOutbox.status == OutboxStatus.PENDING) & (EmailOutbox.next_attempt_at <= now)
+        async with self.session_factory() as session:
+            await self._expire(session, now)
+            ids = (await session.execute(
+                select(EmailOutbox.id).where(due).order_by(EmailOutbox.next_attempt_at).limit(self.batch_size)
+            )).scalars().all()
+            if not ids:
+                await session.commit()
+                return []
+            # Re-check the predicate so rows another worker claimed meanwhile are skipped
+            await session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(ids), due)
+                .values(claim_token=token, next_attempt_at=now + timedelta(seconds=self.lease))
+            )
+            await session.commit()
+            result = await session.execute(
+                select(EmailOutbox).where(EmailOutbox.id.in_(ids), EmailOutbox.claim_token == token)
+            )
+            return list(result.scalars().all())
+
+    async def _deliver(self, rows: List[EmailOutbox]) -> List[Optional[Exception]]:
+        """Send a claimed batch; rows of the same template are coalesced into as few provider calls as possible"""
+        by_template: Dict[str, List[int]] = {}
+        for index, row in enumerate(rows):
+            by_template.setdefault(row.template, []).append(index)  # type: ignore
+
+        async def send(template: str, indexes: List[int]) -> List[Optional[Exception]]:
+            try:
+                return await self.email_service.send_many(
+                    template, [(rows[i].to_email, rows[i].context or {}) for i in indexes]  # type: ignore
+                )
+            except Exception as e:
+                return [e] * len(indexes)
+
+        results: List[Optional[Exception]] = [None] * len(rows)
+        outcomes = await asyncio.gather(*(send(t, indexes) for t, indexes in by_template.items()))
+        for indexes, outcome in zip(by_template.values(), outcomes):
+            for i, result in zip(indexes, outcome):
+                results[i] = result
+        return results
+
+    async def drain_once(self) -> int:
+        """Claim one batch, send it and record the outcome. Returns the batch size."""
+        token = uuid.uuid4().hex
+        rows = await self._claim(token)
+        if not rows:
+            return 0
+
+        results = await self._deliver(rows)
+
+        now = datetime.utcnow()
+        owned = EmailOutbox.claim_token == token
+        async with self.session_factory() as session:
+            sent_ids = [row.id for row, result in zip(rows, results) if result is None]
+            if sent_ids:
+                # The context may hold one-time codes; drop it once delivered
+                await session.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent_ids), owned)
+                    .values(status=OutboxStatus.SENT, sent_at=now, context={}, claim_token=None, last_error=None)
+                )
+                self.sent += len(sent_ids)
+
+            for row, result in zip(rows, results):
+                if result is None:
+                    continue
+                attempts = row.attempts + 1
+                permanent = isinstance(result, EmailDeliveryError) and not result.retryable
+                values: Dict[str, Any] = dict(attempts=attempts, claim_token=None, last_error=str(result)[:500])
+                if permanent or attempts >= self.max_attempts:
+                    values.update(status=OutboxStatus.DEAD, context={})
+                    self.dead += 1
+                    print(f"Email {row.id} ({row.template}) to {row.to_email} dead-lettered after {attempts} attempt(s): {result}")
+                else:
+                    values.update(next_attempt_at=now + self.retry_delay(attempts))
+                    self.retried += 1
+                await session.execute(update(EmailOutbox).where(EmailOutbox.id == row.id, owned).values(**values))
+            await session.commit()
+        return len(rows)
+
+    def notify(self) -> None:
+        """Wake the worker early; called after a commit that added outbox rows"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                drained = await self.drain_once()
+            except Exception as e:
+                print(f"Email outbox worker error: {e}")
+                drained = 0
+            if drained >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                await asyncio.sleep(self.coalesce)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def backlog(self) -> Dict[str, int]:
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+            )
+            return {status.value: count for status, count in result.all()}
+
+    def metrics(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "expired": self.expired,
+        }
+
+
+outbox_worker = OutboxWorker(AsyncSessionLocal)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_worker(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        outbox_worker.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
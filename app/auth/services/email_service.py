@@ -1,196 +1,171 @@
+import json
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from typing import Any, Dict, List, Optional, Tuple
+from markupsafe import Markup, escape
+from app.auth.services import email_transport as transport_module
+from app.auth.services.email_transport import EmailBatch, EmailMessage, EmailTransport, Recipient
+from app.auth.services.email_templates import Branding, email_templates
 import dotenv
 dotenv.load_dotenv()
 
 class EmailService:
     FROM_EMAIL = os.environ.get("FROM_EMAIL", "")
 
-    # Onboarding Mails
-    async def send_verification_email(self, to_email: str, verification_link: str):
-        """
-        Send an email verification link to users.
-        """
-        subject = "Verify Your Xentoba Account Email"
-        html_content = f"""
-        <strong>Verify Your Email Address</strong>
-        <p>Thank you for registering with us. Please click the link below to verify your email address:</p>
-        <p><a href="{verification_link}">{verification_link}</a></p>
-        <p>If you did not register for an account, please ignore this email.</p>
-        <p>Best regards,<br>The XenToba Team</p>
-        """
-        message = Mail(
-            from_email=self.FROM_EMAIL,
-            to_emails=to_email,
-            subject=subject,
-            html_content=html_content
-        )
+    # Template name -> subject, formatted with the template context
+    SUBJECTS = {
+        "verification": "Verify Your Xentoba Account Email",
+        "welcome": "Welcome to XenToba!",
+        "login_code": "Your One-Time Password (OTP) for Login",
+        "account_recovery": "Account Recovery Instructions",
+        "password_reset": "Password Reset",
+        "teammate_invitation": "You're Invited to Join {enterprise_name} on XenToba!",
+    }
+
+    # Context fields that differ per recipient. Messages of one template that
+    # agree on everything else share a single provider call.
+    RECIPIENT_FIELDS = {
+        "verification": ("verification_link",),
+        "welcome": (),
+        "login_code": ("otp_code",),
+        "account_recovery": ("otp_code", "recovery_link"),
+        "password_reset": ("reset_token",),
+        "teammate_invitation": ("invitation_link", "otp"),
+    }
 
+    def __init__(self, transport: Optional[EmailTransport] = None):
+        # Defaults to the process-wide transport (EMAIL_TRANSPORT)
+        self.transport = transport
+
+    def _transport(self) -> EmailTransport:
+        return self.transport or transport_module.email_transport
+
+    def render(self, template: str, **context: Any) -> Tuple[str, str]:
+        """Return (subject, html) for a template; `branding` may be a Branding or its dict snapshot"""
+        branding = context.pop("branding", None)
+        if isinstance(branding, dict):
+            branding = Branding(**branding)
+        subject = self.SUBJECTS[template].format(**context)
+        return subject, email_templates.render(template, branding, **context)
+
+    async def _send(self, template: str, to_email: str, **context: Any):
+        subject, html_content = self.render(template, **context)
         try:
-            sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-            print(message) # Debug
-            response = sg.send(message)
-            print(f"SendGrid Status Code: {response.status_code}")
+            await self._transport().send(EmailMessage(
+                to_email=to_email,
+                subject=subject,
+                html_content=html_content,
+                from_email=self.FROM_EMAIL,
+            ))
         except Exception as e:
             print(f"Failed to send email: {str(e)}")
             raise
 
+    async def send_many(self, template: str, messages: List[Tuple[str, Dict[str, Any]]]) -> List[Optional[Exception]]:
+        """
+        Send many messages of one template, as few provider calls as possible.
+        Returns the exception (or None) for each message, in order.
+        """
+        fields = self.RECIPIENT_FIELDS[template]
+        groups: Dict[str, List[int]] = {}
+        for index, (_, context) in enumerate(messages):
+            shared = {key: value for key, value in context.items() if key not in fields}
+            present = [field for field in fields if context.get(field) not in (None, "")]
+            groups.setdefault(json.dumps([shared, present], sort_keys=True, default=str), []).append(index)
+
+        transport = self._transport()
+        results: List[Optional[Exception]] = [None] * len(messages)
+        for indexes in groups.values():
+            for start in range(0, len(indexes), transport.max_batch_size):
+                chunk = indexes[start:start + transport.max_batch_size]
+                try:
+                    if len(chunk) == 1:
+                        to_email, context = messages[chunk[0]]
+                        await self._send(template, to_email, **context)
+                    else:
+                        # Per recipient, so only the messages that failed are retried
+                        outcome = await transport.send_batch(self._batch(template, [messages[i] for i in chunk]))
+                        for i, result in zip(chunk, outcome):
+                            results[i] = result
+                except Exception as e:
+                    if len(chunk) > 1:
+                        print(f"Failed to send {template} batch of {len(chunk)}: {str(e)}")
+                    for i in chunk:
+                        results[i] = e
+        return results
+
+    def _batch(self, template: str, messages: List[Tuple[str, Dict[str, Any]]]) -> EmailBatch:
+        # Render once with a placeholder per recipient field; values are escaped
+        # here because the provider substitutes them into the HTML verbatim
+        fields = self.RECIPIENT_FIELDS[template]
+        context = dict(messages[0][1])
+        present = [field for field in fields if context.get(field) not in (None, "")]
+        for field in present:
+            context[field] = Markup(f"%{field}%")
+        subject, html_content = self.render(template, **context)
+        recipients = tuple(
+            Recipient(to_email, {f"%{field}%": str(escape(values[field])) for field in present})
+            for to_email, values in messages
+        )
+        return EmailBatch(subject, html_content, self.FROM_EMAIL, recipients)
+
+    # Onboarding Mails
+    async def send_verification_email(self, to_email: str, verification_link: str):
+        """
+        Send an email verification link to users.
+        """
+        await self._send("verification", to_email, verification_link=verification_link)
+
     async def send_welcome_email(self, to_email: str):
         """
         Send a welcome email to newly registered users.
         """
-        subject = "Welcome to XenToba!"
-        html_content = """
-        <strong>Welcome to XenToba!</strong>
-        <p>Thank you for registering with us. We're excited to have you on board.</p>
-        <p>Best regards,<br>The XenToba Team</p>
-        """
-        message = Mail(
-            from_email=self.FROM_EMAIL,
-            to_emails=to_email,
-            subject=subject,
-            html_content=html_content
-        )
+        await self._send("welcome", to_email)
 
-        try:
-            sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-            response = sg.send(message)
-            print(f"SendGrid Status Code: {response.status_code}")
-        except Exception as e:
-            print(f"Failed to send email: {str(e)}")
-            raise
 
-    
     # Authentication Mails
     async def send_login_code_email(self, to_email: str, otp_code: str):
         """
         Send a one-time password (OTP) for login.
         """
-        subject = "Your One-Time Password (OTP) for Login"
-        html_content = f"""
-        <strong>Your One-Time Password (OTP)</strong>
-        <p>You have requested to log in. Please use the following OTP to complete your login:</p>
-        <h3>{otp_code}</h3>
-        <p>This OTP is valid for 10 minutes. Do not share it with anyone.</p>
-        <p>If you did not request this, please ignore this email.</p>
-        <p>Best regards,<br>The XenToba Team</p>
-        """
-        
+        await self._send("login_code", to_email, otp_code=otp_code)
+
     async def send_account_recovery_email(self, to_email: str, otp_code: str, recovery_link: str | None = None):
         """
         Send an account recovery email with OTP code and optional recovery link.
-        
+
         Args:
             to_email: Email address to send the recovery instructions to
             otp_code: The one-time password for account recovery
             recovery_link: Optional direct link to the recovery page with pre-filled values
         """
-        subject = "Account Recovery Instructions"
-        
-        recovery_link_html = ""
-        if recovery_link:
-            recovery_link_html = f"""
-            <p>Click the link below to reset your password:</p>
-            <p><a href="{recovery_link}">Reset Your Password</a></p>
-            """
-            
-        html_content = f"""
-        <strong>Account Recovery Instructions</strong>
-        <p>You have requested to recover your account. Please use the following verification code:</p>
-        <h2 style="font-family: monospace; background-color: #f0f0f0; padding: 10px; text-align: center;">{otp_code}</h2>
-        <p>This code is valid for 15 minutes and can be used to reset your password.</p>
-        {recovery_link_html}
-        <p>If you did not request account recovery, please ignore this email or contact our support team.</p>
-        <p>Best regards,<br>The XenToba Team</p>
-        """
-        
-        message = Mail(
-            from_email=self.FROM_EMAIL,
-            to_emails=to_email,
-            subject=subject,
-            html_content=html_content
-        )
-
-        try:
-            sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-            response = sg.send(message)
-            print(f"SendGrid Status Code: {response.status_code}")
-        except Exception as e:
-            print(f"Failed to send account recovery email: {str(e)}")
-            raise
-        message = Mail(
-            from_email=self.FROM_EMAIL,
-            to_emails=to_email,
-            subject=subject,
-            html_content=html_content
-        )
+        await self._send("account_recovery", to_email, otp_code=otp_code, recovery_link=recovery_link)
 
-        try:
-            sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-            response = sg.send(message)
-            print(f"SendGrid Status Code: {response.status_code}")
-        except Exception as e:
-            print(f"Failed to send email: {str(e)}")
-            raise
-    
     async def send_password_reset_email(self, to_email: str, reset_token: int):
         """
         Send a password reset email to users.
         """
-        subject = "Password Reset"
-        html_content = f"""
-        <strong>Password Reset</strong>
-        <p>You have requested a password reset. Please use the following token to reset your password:</p>
-        <h3>{reset_token}</h3>
-        <p>If you did not request a password reset, please ignore this email.</p>
-        <p>Best regards,<br>The XenToba Team</p>
-        """
-        message = Mail(
-            from_email=self.FROM_EMAIL,
-            to_emails=to_email,
-            subject=subject,
-            html_content=html_content
-        )
-
-        try:
-            sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-            response = sg.send(message)
-            print(f"SendGrid Status Code: {response.status_code}")
-        except Exception as e:
-            print(f"Failed to send email: {str(e)}")
-            raise
+        await self._send("password_reset", to_email, reset_token=reset_token)
 
     # Collaboration Mails
-    async def send_teammate_invitation_mail(self, to_email: str, inviter_name: str, enterprise_name: str, invitation_link: str, otp: str):
-        """
-        Send an invitation email to a new team member.
-        """
-        subject = f"You're Invited to Join {enterprise_name} on XenToba!"
-        html_content = f"""
-        <strong>You're Invited!</strong>
-        <p>Hello,</p>
-        <p>{inviter_name} has invited you to join their team, <strong>{enterprise_name}</strong>, on XenToba.</p>
-        <p>To accept the invitation and get started, please click the link below:</p>
-        <p><a href="{invitation_link}">Join {enterprise_name}</a></p>
-        <p>If you have any questions, feel free to reach out to {inviter_name}.</p>
-        <p>Use this one-time password (OTP) to login to your account: <strong>{otp}</strong></p>
-        <p>This OTP is valid for a limited time. Do not share it with anyone.</p>
-        <p>Dont forget to change your password after logging in.</p>
-        <p>If you did not request this, please ignore this email.</p>
-        <p>Best regards,<br>The XenToba Team</p>
-        """
-        message = Mail(
-            from_email=self.FROM_EMAIL,
-            to_emails=to_email,
-            subject=subject,
-            html_content=html_content
+    async def send_teammate_invitation_mail(
+        self,
+        to_email: str,
+        inviter_name: str,
+        enterprise_name: str,
+        invitation_link: str,
+        otp: str | None = None,
+        branding: dict | None = None,
+    ):
+        """
+        Send an invitation email to a team member, in the enterprise's branding when given.
+        The OTP section is only included for newly created accounts.
+        """
+        await self._send(
+            "teammate_invitation",
+            to_email,
+            inviter_name=inviter_name,
+            enterprise_name=enterprise_name,
+            invitation_link=invitation_link,
+            otp=otp,
+            branding=branding,
         )
-
-        try:
-            sg = SendGridAPIClient(os.environ.get('SENDGRID_API_KEY'))
-            response = sg.send(message)
-            print(f"SendGrid Status Code: {response.status_code}")
-        except Exception as e:
-            print(f"Failed to send invitation email: {str(e)}")
-            raise
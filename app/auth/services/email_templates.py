@@ -0,0 +1,92 @@
+import os
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urljoin
+
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template, select_autoescape
+
+load_dotenv()
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+# Logos are stored as paths like /logos/x.png; mail clients need absolute URLs
+EMAIL_ASSET_BASE_URL = os.getenv("EMAIL_ASSET_BASE_URL", "http://xenx.onrender.com/api/v1")
+
+DEFAULT_PRIMARY_COLOR = "#1f2937"
+DEFAULT_ACCENT_COLOR = "#2563eb"
+HEX_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3}){1,2}$")
+
+
+@dataclass(frozen=True)
+class Branding:
+    """
+    Branding applied to an email. Colors land in style attributes, which
+    autoescaping does not protect, so anything that isn't a hex code falls
+    back to the default.
+    """
+    name: str = "XenToba"
+    logo_url: Optional[str] = None
+    primary_color: str = DEFAULT_PRIMARY_COLOR
+    accent_color: str = DEFAULT_ACCENT_COLOR
+    footer_text: Optional[str] = None
+
+    def __post_init__(self):
+        if not HEX_COLOR.match(self.primary_color or ""):
+            object.__setattr__(self, "primary_color", DEFAULT_PRIMARY_COLOR)
+        if not HEX_COLOR.match(self.accent_color or ""):
+            object.__setattr__(self, "accent_color", DEFAULT_ACCENT_COLOR)
+        if self.logo_url and not self.logo_url.startswith(("http://", "https://")):
+            object.__setattr__(self, "logo_url", urljoin(EMAIL_ASSET_BASE_URL.rstrip("/") + "/", self.logo_url.lstrip("/")))
+
+    @classmethod
+    def from_enterprise(cls, enterprise) -> "Branding":
+        return cls(
+            name=enterprise.name,
+            logo_url=enterprise.logo_url,
+            primary_color=enterprise.primary_color,
+            accent_color=enterprise.accent_color,
+            footer_text=enterprise.footer_text,
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """JSON-safe snapshot, e.g. for an outbox row"""
+        return asdict(self)
+
+
+DEFAULT_BRANDING = Branding()
+
+
+class EmailTemplateRegistry:
+    """
+    Compiles every email template once, up front, and renders them with
+    autoescaping. Templates whose name starts with an underscore are layouts
+    and macros, not emails.
+    """
+
+    def __init__(self, directory: Path = TEMPLATE_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(["html"], default_for_string=True),
+            undefined=StrictUndefined,
+            auto_reload=False,
+            cache_size=-1,
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+        # Layouts and macros are compiled too, so renders never touch the filesystem
+        compiled = {name: self.env.get_template(name) for name in self.env.list_templates(extensions=["html"])}
+        self.templates: Dict[str, Template] = {
+            name[:-len(".html")]: template for name, template in compiled.items() if not name.startswith("_")
+        }
+
+    def render(self, name: str, branding: Optional[Branding] = None, **context: Any) -> str:
+        try:
+            template = self.templates[name]
+        except KeyError:
+            raise ValueError(f"Unknown email template: {name}") from None
+        return template.render(brand=branding or DEFAULT_BRANDING, **context)
+
+
+email_templates = EmailTemplateRegistry()
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# sendgrid | memory | file:///path/to/dir
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "sendgrid")
+SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
+SENDGRID_API_URL = os.getenv("SENDGRID_API_URL", "https://api.sendgrid.com/v3/mail/send")
+EMAIL_HTTP_TIMEOUT_SECONDS = float(os.getenv("EMAIL_HTTP_TIMEOUT_SECONDS", 10))
+EMAIL_HTTP_MAX_CONNECTIONS = int(os.getenv("EMAIL_HTTP_MAX_CONNECTIONS", 20))
+EMAIL_SEND_RETRIES = int(os.getenv("EMAIL_SEND_RETRIES", 3))
+# SendGrid accepts at most 1000 personalizations per request
+SENDGRID_MAX_PERSONALIZATIONS = int(os.getenv("SENDGRID_MAX_PERSONALIZATIONS", 1000))
+
+
+@dataclass(frozen=True, slots=True)
+class EmailMessage:
+    to_email: str
+    subject: str
+    html_content: str
+    from_email: str
+
+
+@dataclass(frozen=True, slots=True)
+class Recipient:
+    to_email: str
+    # placeholder -> already escaped value
+    substitutions: Dict[str, str]
+
+
+@dataclass(frozen=True, slots=True)
+class EmailBatch:
+    """One message body sent to many recipients, each with their own substitutions"""
+    subject: str
+    html_content: str
+    from_email: str
+    recipients: Tuple[Recipient, ...]
+
+    def messages(self) -> Iterator[EmailMessage]:
+        for recipient in self.recipients:
+            html_content = self.html_content
+            for placeholder, value in recipient.substitutions.items():
+                html_content = html_content.replace(placeholder, value)
+            yield EmailMessage(recipient.to_email, self.subject, html_content, self.from_email)
+
+
+class EmailDeliveryError(Exception):
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class EmailTransport(ABC):
+    # Most recipients send_batch accepts at once
+    max_batch_size = 100
+
+    @abstractmethod
+    async def send(self, message: EmailMessage) -> None:
+        """Deliver one message. Raises EmailDeliveryError on failure."""
+
+    async def send_batch(self, batch: EmailBatch) -> List[Optional[Exception]]:
+        """
+        Deliver a batch, returning the exception (or None) for each recipient.
+        Raising means nothing in the batch was delivered. Transports without a
+        bulk API send one message at a time, so a failure affects only its
+        own recipient.
+        """
+        results: List[Optional[Exception]] = []
+        for message in batch.messages():
+            try:
+                await self.send(message)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def aclose(self) -> None:
+        pass
+
+
+class SendGridTransport(EmailTransport):
+    """
+    SendGrid v3 API over one shared, pooled httpx.AsyncClient, so sends reuse
+    TLS connections and never block the event loop. Rate limits, 5xx responses
+    and network errors are retried with exponential backoff.
+    """
+
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        api_key: str,
+        api_url: str = SENDGRID_API_URL,
+        timeout: float = EMAIL_HTTP_TIMEOUT_SECONDS,
+        max_connections: int = EMAIL_HTTP_MAX_CONNECTIONS,
+        retries: int = EMAIL_SEND_RETRIES,
+        backoff: float = 0.5,
+        client: Optional[httpx.AsyncClient] = None,
+        max_batch_size: int = SENDGRID_MAX_PERSONALIZATIONS,
+    ):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self._client = client
+        self.max_batch_size = max_batch_size
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        return self._client
+
+    @staticmethod
+    def payload(message: EmailMessage) -> dict:
+        return {
+            "personalizations": [{"to": [{"email": message.to_email}]}],
+            "from": {"email": message.from_email},
+            "subject": message.subject,
+            "content": [{"type": "text/html", "value": message.html_content}],
+        }
+
+    @staticmethod
+    def batch_payload(batch: EmailBatch) -> dict:
+        return {
+            "personalizations": [
+                {"to": [{"email": recipient.to_email}], "substitutions": recipient.substitutions}
+                for recipient in batch.recipients
+            ],
+            "from": {"email": batch.from_email},
+            "subject": batch.subject,
+            "content": [{"type": "text/html", "value": batch.html_content}],
+        }
+
+    async def send(self, message: EmailMessage) -> None:
+        await self.post(self.payload(message))
+
+    async def send_batch(self, batch: EmailBatch) -> List[Optional[Exception]]:
+        """One API call for the whole batch, personalized per recipient by SendGrid; it succeeds or fails as a whole"""
+        if len(batch.recipients) > self.max_batch_size:
+            raise ValueError(f"Batch of {len(batch.recipients)} exceeds the {self.max_batch_size} personalization limit")
+        await self.post(self.batch_payload(batch))
+        return [None] * len(batch.recipients)
+
+    async def post(self, payload: dict) -> None:
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * (2 ** attempt)
+            try:
+                response = await self.client.post(self.api_url, json=payload)
+            except httpx.TransportError as e:
+                error = EmailDeliveryError(f"SendGrid request failed: {e}", retryable=True)
+            else:
+                if response.status_code < 300:
+                    return
+                retryable = response.status_code in self.RETRYABLE_STATUS
+                error = EmailDeliveryError(f"SendGrid returned {response.status_code}: {response.text[:200]}", retryable)
+                if not retryable:
+                    raise error
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+        raise error
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class InMemoryTransport(EmailTransport):
+    """Keeps sent messages in a list; for tests and local development"""
+
+    def __init__(self):
+        self.outbox: List[EmailMessage] = []
+        self.batches: List[EmailBatch] = []
+
+    async def send(self, message: EmailMessage) -> None:
+        self.outbox.append(message)
+
+    async def send_batch(self, batch: EmailBatch) -> List[Optional[Exception]]:
+        self.batches.append(batch)
+        return await super().send_batch(batch)
+
+
+class FileTransport(EmailTransport):
+    """Writes each message as a JSON file, off the event loop"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def _write(self, message: EmailMessage) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json"
+        path.write_text(json.dumps(asdict(message), indent=2))
+
+    async def send(self, message: EmailMessage) -> None:
+        await asyncio.to_thread(self._write, message)
+
+
+def create_email_transport(spec: str = EMAIL_TRANSPORT) -> EmailTransport:
+    if spec == "sendgrid":
+        return SendGridTransport(SENDGRID_API_KEY)
+    if spec == "memory":
+        return InMemoryTransport()
+    if spec.startswith("file://"):
+        return FileTransport(Path(spec[len("file://"):]))
+    raise ValueError(f"Unsupported EMAIL_TRANSPORT: {spec}")
+
+
+email_transport = create_email_transport()
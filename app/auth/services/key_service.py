@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock; the writer lock falls back to msvcrt byte locks
+    fcntl = None
+    import msvcrt
+
+SUPPORTED_ALGORITHMS = ("EdDSA", "ES256")
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: Any
+    created_at: float
+
+    @property
+    def public_key(self) -> Any:
+        return self.private_key.public_key()
+
+    def public_jwk(self) -> Dict[str, Any]:
+        if self.algorithm == "EdDSA":
+            jwk = OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            jwk = ECAlgorithm.to_jwk(self.public_key, as_dict=True)
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+def _lock_file(file, exclusive: bool) -> None:
+    """Take (or release) a lock on `file` that other processes respect"""
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_UN)
+        return
+    # Locks the first byte; LK_LOCK retries for about ten seconds before raising
+    file.seek(0)
+    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK if exclusive else msvcrt.LK_UNLCK, 1)
+
+
+def _generate_private_key(algorithm: str):
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+
+
+class KeyRing:
+    """
+    Asymmetric JWT signing keys stored as PEM files named `<created>-<kid>.pem`.
+
+    Several keys are valid at once: new tokens are signed with the newest key
+    that has been published for at least `activation_delay` seconds (so
+    downstream JWKS caches already know it), and older keys stay verifiable
+    until every token they signed has expired.
+
+    `keys_dir` is the source of truth for every worker sharing it. Creating
+    and deleting keys happens under an exclusive lock on `keys_dir/.lock`
+    after re-reading the directory, so only one worker generates each key.
+    Every worker re-reads the directory when its mtime changes (checked at
+    most every `reload_interval` seconds), so all of them sign with and
+    publish the same key set.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        keys_dir: Path,
+        rotation_interval: float,
+        retention: float,
+        activation_delay: float,
+        reload_interval: float = 10,
+    ):
+        if algorithm not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.keys_dir = keys_dir
+        self.rotation_interval = rotation_interval
+        self.retention = retention
+        self.activation_delay = activation_delay
+        self.reload_interval = reload_interval
+        self._keys: Dict[str, SigningKey] = {}
+        self._jwks: Optional[bytes] = None
+        self._last_reload = 0.0
+        self._mtime: Optional[int] = None
+
+    # Storage
+    def load(self) -> None:
+        """Read the keys in keys_dir, creating the first one if there are none"""
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        self._read()
+        if not self._keys:
+            with self._writer_lock():
+                self._read()
+                if not self._keys:
+                    self.generate()
+
+    @contextmanager
+    def _writer_lock(self) -> Iterator[None]:
+        """Exclusive across every process sharing keys_dir"""
+        with open(self.keys_dir / ".lock", "a") as lock:
+            _lock_file(lock, True)
+            try:
+                yield
+            finally:
+                _lock_file(lock, False)
+
+    def _read(self) -> None:
+        # Taken before listing, so a change made while reading triggers another read
+        mtime = self.keys_dir.stat().st_mtime_ns
+        keys = {}
+        for path in self.keys_dir.glob("*.pem"):
+            created, _, kid = path.stem.partition("-")
+            try:
+                pem = path.read_bytes()
+            except FileNotFoundError:
+                # Deleted by another worker's retention pass
+                continue
+            private_key = serialization.load_pem_private_key(pem, password=None)
+            algorithm = "EdDSA" if isinstance(private_key, ed25519.Ed25519PrivateKey) else "ES256"
+            if algorithm != self.algorithm:
+                continue
+            keys[kid] = SigningKey(kid=kid, algorithm=algorithm, private_key=private_key, created_at=float(created))
+        if keys.keys() != self._keys.keys():
+            self._jwks = None
+        self._keys = keys
+        self._mtime = mtime
+        self._last_reload = time.time()
+
+    def _refresh(self, max_age: float) -> None:
+        """Re-read keys_dir if it changed, checking at most every `max_age` seconds"""
+        now = time.time()
+        if now - self._last_reload < max_age:
+            return
+        self._last_reload = now
+        try:
+            mtime = self.keys_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            self._read()
+
+    def generate(self) -> SigningKey:
+        """Create, persist and publish a new key"""
+        key = SigningKey(
+            kid=secrets.token_urlsafe(12),
+            algorithm=self.algorithm,
+            private_key=_generate_private_key(self.algorithm),
+            created_at=time.time(),
+        )
+        pem = key.private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        # Written aside and renamed so other workers never read a partial file
+        temp_path = self.keys_dir / f".{key.kid}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem)
+        os.replace(temp_path, self.keys_dir / f"{key.created_at:.6f}-{key.kid}.pem")
+        self._keys[key.kid] = key
+        self._jwks = None
+        return key
+
+    # Lookup
+    def signing_key(self) -> SigningKey:
+        self._refresh(self.reload_interval)
+        now = time.time()
+        keys = sorted(self._keys.values(), key=lambda k: k.created_at, reverse=True)
+        for key in keys:
+            if key.created_at <= now - self.activation_delay:
+                return key
+        # Nothing published long enough yet (first boot), use the longest published
+        return keys[-1]
+
+    def verification_key(self, kid: Optional[str]) -> Optional[SigningKey]:
+        if kid is None:
+            return None
+        self._refresh(self.reload_interval)
+        key = self._keys.get(kid)
+        if key is None:
+            # Possibly created by another worker since the last check
+            self._refresh(0)
+            key = self._keys.get(kid)
+        return key
+
+    # Rotation
+    def rotate_if_due(self) -> bool:
+        """Add a key when the newest is older than the rotation interval and drop expired ones"""
+        with self._writer_lock():
+            # Decide on the shared state, so only one worker rotates
+            self._read()
+            now = time.time()
+            rotated = False
+            newest = max(self._keys.values(), key=lambda k: k.created_at, default=None)
+            if newest is None or now - newest.created_at >= self.rotation_interval:
+                self.generate()
+                rotated = True
+
+            # A key stops signing once its successor activates; keep it until its
+            # last tokens have expired.
+            ordered = sorted(self._keys.values(), key=lambda k: k.created_at)
+            for key, successor in zip(ordered, ordered[1:]):
+                retired_at = successor.created_at + self.activation_delay
+                if now - retired_at > self.retention:
+                    self._keys.pop(key.kid, None)
+                    for path in self.keys_dir.glob(f"*-{key.kid}.pem"):
+                        path.unlink(missing_ok=True)
+                    self._jwks = None
+            self._mtime = self.keys_dir.stat().st_mtime_ns
+        return rotated
+
+    async def run_rotation(self, check_interval: float = 3600) -> None:
+        """Background loop started by the application"""
+        while True:
+            try:
+                self.rotate_if_due()
+            except Exception as e:
+                print(f"JWT key rotation failed: {str(e)}")
+            await asyncio.sleep(check_interval)
+
+    # Publication
+    def jwks(self) -> bytes:
+        """Serialized JWKS document, rebuilt only when the key set changes"""
+        self._refresh(self.reload_interval)
+        if self._jwks is None:
+            keys: List[Dict[str, Any]] = [k.public_jwk() for k in sorted(self._keys.values(), key=lambda k: k.created_at)]
+            self._jwks = json.dumps({"keys": keys}).encode()
+        return self._jwks
@@ -0,0 +1,160 @@
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from abc import ABC, abstractmethod
+from typing import Dict
+
+from dotenv import load_dotenv
+from app.auth.services.token_service import SECRET_KEY
+
+load_dotenv()
+
+# memory:// keeps codes in this process only; use redis://host:port/db when
+# running more than one worker.
+OTP_STORE_URL = os.getenv("OTP_STORE_URL", "memory://")
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", 600))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+OTP_HMAC_KEY = os.getenv("OTP_HMAC_KEY") or SECRET_KEY
+
+
+class OTPStore(ABC):
+    """
+    Short-lived one-time codes keyed by subject (e.g. "user:42").
+
+    Only an HMAC digest of each code is stored. Codes expire after `ttl` seconds,
+    are single-use, and are discarded after `max_attempts` wrong guesses.
+    """
+
+    def __init__(self, hmac_key: str = OTP_HMAC_KEY, ttl: int = OTP_TTL_SECONDS, max_attempts: int = OTP_MAX_ATTEMPTS):
+        self._hmac_key = hmac_key.encode()
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+    def _digest(self, subject: str, code: str) -> str:
+        return hmac.new(self._hmac_key, f"{subject}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    async def issue(self, subject: str) -> str:
+        """Generate a new six-digit code for `subject`, replacing any previous one"""
+        code = "".join(str(secrets.randbelow(10)) for _ in range(6))
+        await self._put(subject, self._digest(subject, code))
+        return code
+
+    async def verify(self, subject: str, code: str) -> bool:
+        """Check a code and consume it on success"""
+        return await self._consume(subject, self._digest(subject, code))
+
+    async def clear(self, subject: str) -> None:
+        await self._delete(subject)
+
+    @abstractmethod
+    async def _put(self, subject: str, digest: str) -> None: ...
+
+    @abstractmethod
+    async def _consume(self, subject: str, digest: str) -> bool: ...
+
+    @abstractmethod
+    async def _delete(self, subject: str) -> None: ...
+
+
+class InMemoryOTPStore(OTPStore):
+    """Process-local store for development, tests and single-worker deployments"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # subject -> [digest, expires_at, attempts]
+        self._entries: Dict[str, list] = {}
+
+    def _prune(self, now: float) -> None:
+        expired = [s for s, entry in self._entries.items() if entry[1] <= now]
+        for subject in expired:
+            del self._entries[subject]
+
+    async def _put(self, subject: str, digest: str) -> None:
+        now = time.monotonic()
+        self._prune(now)
+        self._entries[subject] = [digest, now + self.ttl, 0]
+
+    async def _consume(self, subject: str, digest: str) -> bool:
+        entry = self._entries.get(subject)
+        if entry is None:
+            return False
+        if entry[1] <= time.monotonic():
+            del self._entries[subject]
+            return False
+
+        entry[2] += 1
+        if entry[2] > self.max_attempts:
+            del self._entries[subject]
+            return False
+        if hmac.compare_digest(entry[0], digest):
+            del self._entries[subject]
+            return True
+        if entry[2] >= self.max_attempts:
+            del self._entries[subject]
+        return False
+
+    async def _delete(self, subject: str) -> None:
+        self._entries.pop(subject, None)
+
+
+class RedisOTPStore(OTPStore):
+    """Redis-backed store shared by all workers; expiry is handled by Redis TTLs"""
+
+    def __init__(self, client, prefix: str = "otp:", **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, subject: str) -> str:
+        return f"{self.prefix}{subject}"
+
+    async def _put(self, subject: str, digest: str) -> None:
+        key = self._key(subject)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={"digest": digest, "attempts": 0})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def _consume(self, subject: str, digest: str) -> bool:
+        key = self._key(subject)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hget(key, "digest")
+            pipe.hincrby(key, "attempts", 1)
+            stored, attempts = await pipe.execute()
+
+        if stored is None:
+            # HINCRBY recreated an expired key without a TTL; drop it again
+            await self.client.delete(key)
+            return False
+        if isinstance(stored, bytes):
+            stored = stored.decode()
+
+        if attempts > self.max_attempts:
+            # Concurrent guesses may all have been counted before any deleted the key
+            await self.client.delete(key)
+            return False
+        if hmac.compare_digest(stored, digest):
+            # Only the request that actually deletes the key may use the code
+            return await self.client.delete(key) == 1
+        if attempts >= self.max_attempts:
+            await self.client.delete(key)
+        return False
+
+    async def _delete(self, subject: str) -> None:
+        await self.client.delete(self._key(subject))
+
+
+def create_otp_store(url: str = OTP_STORE_URL, **kwargs) -> OTPStore:
+    """Build an OTP store from a URL such as memory:// or redis://localhost:6379/0"""
+    if url.startswith("memory://"):
+        return InMemoryOTPStore(**kwargs)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        from redis.asyncio import Redis
+        return RedisOTPStore(Redis.from_url(url), **kwargs)
+    raise ValueError(f"Unsupported OTP_STORE_URL: {url}")
+
+
+otp_store: OTPStore = create_otp_store()
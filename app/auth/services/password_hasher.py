@@ -0,0 +1,97 @@
+import os
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+from app.auth.services.worker_pool import BoundedProcessPool
+
+load_dotenv()
+
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", os.cpu_count() or 1))
+HASH_QUEUE_DEPTH = int(os.getenv("HASH_QUEUE_DEPTH", 64))
+HASH_TIMEOUT_SECONDS = float(os.getenv("HASH_TIMEOUT_SECONDS", 5))
+
+# Hashing parameters, normally produced by `python -m app.auth.calibrate_hashing`.
+# The first scheme is used for new hashes; hashes made with any other scheme or
+# with different parameters are reported as stale by `needs_update`.
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 1))
+
+
+def build_crypt_context(
+    schemes: list[str],
+    bcrypt_rounds: int = BCRYPT_ROUNDS,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_memory_cost: int = ARGON2_MEMORY_COST,
+    argon2_parallelism: int = ARGON2_PARALLELISM,
+) -> CryptContext:
+    """Build a CryptContext that treats any other parameters as outdated"""
+    settings = {}
+    if "bcrypt" in schemes:
+        settings.update(
+            bcrypt__default_rounds=bcrypt_rounds,
+            bcrypt__min_rounds=bcrypt_rounds,
+            bcrypt__max_rounds=bcrypt_rounds,
+        )
+    if "argon2" in schemes:
+        settings.update(
+            argon2__rounds=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    # Keep bcrypt verifiable after switching the default to another scheme
+    if "bcrypt" not in schemes:
+        schemes = schemes + ["bcrypt"]
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+
+pwd_context = build_crypt_context(PASSWORD_SCHEMES)
+
+
+# Worker entry points. These run in the pool's child processes, so they must
+# stay module-level functions.
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """Async facade over passlib that keeps bcrypt off the event loop"""
+
+    def __init__(self, pool: BoundedProcessPool):
+        self.pool = pool
+
+    async def hash(self, password: str) -> str:
+        return await self.pool.run(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        if not hashed_password:
+            return False
+        return await self.pool.run(_verify, password, hashed_password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """Whether a stored hash uses an outdated scheme or cost. Cheap, runs inline."""
+        try:
+            return pwd_context.needs_update(hashed_password)
+        except ValueError:
+            return False
+
+    def metrics(self) -> dict:
+        return self.pool.metrics()
+
+    def shutdown(self) -> None:
+        self.pool.shutdown()
+
+
+password_hasher = PasswordHasher(
+    BoundedProcessPool(
+        name="password-hashing",
+        max_workers=HASH_POOL_SIZE,
+        max_queue=HASH_QUEUE_DEPTH,
+        timeout=HASH_TIMEOUT_SECONDS,
+    )
+)
@@ -0,0 +1,144 @@
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Mapping, Optional
+
+from dotenv import load_dotenv
+from app.auth.models.users import SubscriptionPlans, User
+from app.auth.services.cache import TTLCache
+
+load_dotenv()
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+# Upper bound on staleness in other workers after an invalidation
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+PRINCIPAL_CACHE_REDIS_URL = os.getenv("PRINCIPAL_CACHE_REDIS_URL")
+PRINCIPAL_CACHE_REDIS_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_REDIS_TTL_SECONDS", 300))
+
+
+@dataclass(frozen=True, slots=True)
+class AuthorizationClaims:
+    """Authorization data carried by claims-profile access tokens"""
+    is_superuser: bool
+    # enterprise id -> staff role for active memberships
+    memberships: Mapping[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> Optional["AuthorizationClaims"]:
+        if "ent" not in payload:
+            return None
+        return cls(
+            is_superuser=bool(payload.get("su", False)),
+            memberships={int(eid): role for eid, role in payload["ent"].items()},
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Immutable snapshot of the user fields the auth layer and routes read"""
+    id: int
+    email: str
+    username: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    phone_number: Optional[str]
+    subscription_plan: SubscriptionPlans
+    is_active: bool
+    is_superuser: bool
+    email_verified: bool
+    token_version: int = 0
+    # Per-token, never cached
+    claims: Optional[AuthorizationClaims] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,  # type: ignore
+            email=user.email,  # type: ignore
+            username=user.username,  # type: ignore
+            first_name=user.first_name,  # type: ignore
+            last_name=user.last_name,  # type: ignore
+            phone_number=user.phone_number,  # type: ignore
+            subscription_plan=SubscriptionPlans(user.subscription_plan or SubscriptionPlans.FREE),
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+            email_verified=bool(user.email_verified),
+            token_version=int(user.token_version or 0),
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data.pop("claims")
+        data["subscription_plan"] = self.subscription_plan.value
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "Principal":
+        data = json.loads(raw)
+        data["subscription_plan"] = SubscriptionPlans(data["subscription_plan"])
+        return cls(**data)
+
+
+class PrincipalCache:
+    """
+    Two-level cache of principals by user id: a per-process LRU in front of an
+    optional shared Redis. Writers that change cached fields must call
+    `invalidate` after committing.
+    """
+
+    def __init__(self, local: TTLCache[Principal], redis=None, redis_ttl: int = PRINCIPAL_CACHE_REDIS_TTL_SECONDS):
+        self.local = local
+        self.redis = redis
+        self.redis_ttl = redis_ttl
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"principal:{user_id}"
+
+    async def get(self, user_id: int) -> Optional[Principal]:
+        principal = self.local.get(user_id)
+        if principal is not None or self.redis is None:
+            return principal
+
+        try:
+            raw = await self.redis.get(self._key(user_id))
+        except Exception as e:
+            print(f"Principal cache read failed: {str(e)}")
+            return None
+        if raw is None:
+            return None
+        principal = Principal.from_json(raw)
+        self.local.set(user_id, principal)
+        return principal
+
+    async def set(self, principal: Principal) -> None:
+        self.local.set(principal.id, principal)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._key(principal.id), principal.to_json(), ex=self.redis_ttl)
+            except Exception as e:
+                print(f"Principal cache write failed: {str(e)}")
+
+    async def invalidate(self, user_id: int) -> None:
+        self.local.pop(user_id)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(self._key(user_id))
+            except Exception as e:
+                print(f"Principal cache invalidation failed: {str(e)}")
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), "redis": self.redis is not None}
+
+
+def _create_redis_client():
+    if not PRINCIPAL_CACHE_REDIS_URL:
+        return None
+    from redis.asyncio import Redis
+    return Redis.from_url(PRINCIPAL_CACHE_REDIS_URL)
+
+
+principal_cache = PrincipalCache(
+    TTLCache(max_size=PRINCIPAL_CACHE_SIZE, default_ttl=PRINCIPAL_CACHE_TTL_SECONDS),
+    redis=_create_redis_client(),
+)
@@ -3,6 +3,7 @@ from sqlalchemy.future import select
 from app.auth.models.users import User
 from app.auth.schemas.profile_schemas import UserUpdate
 from app.auth.services.auth_service import AuthService, PasswordPolicy
+from app.auth.services.principal_cache import principal_cache
 from fastapi import HTTPException, status
 
 class ProfileService:
@@ -20,7 +21,7 @@ class ProfileService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
         # Verify old password
-        if not self.auth_service.verify_password(old_password, user.password_hash):
+        if not await self.auth_service.verify_password(old_password, user.password_hash):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid old password")
 
         # Validate new password
@@ -29,8 +30,9 @@ class ProfileService:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
 
         # Hash and update new password
-        user.password_hash = self.auth_service.get_password_hash(new_password)
+        user.password_hash = await self.auth_service.get_password_hash(new_password)
         await self.session.commit()
+        await principal_cache.invalidate(user_id)
 
     async def update_user_profile(self, user_id: int, user_data: UserUpdate) -> tuple[User | None, str]:
         """Update user profile and ensure unique constraints are not violated"""
@@ -74,4 +76,5 @@ class ProfileService:
             user.phone_number = user_data.phone_number
 
         await self.session.commit()
+        await principal_cache.invalidate(user_id)
         return user, ''
\ No newline at end of file
@@ -0,0 +1,268 @@
+import hashlib
+import heapq
+import math
+import multiprocessing
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Tuple, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# memory:// keeps revocations in this process; use redis://host:port/db when
+# running more than one worker.
+REVOCATION_STORE_URL = os.getenv("REVOCATION_STORE_URL", "memory://")
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 1_000_000))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+REVOCATION_PRUNE_INTERVAL_SECONDS = int(os.getenv("REVOCATION_PRUNE_INTERVAL_SECONDS", 300))
+# How long each shared (Redis) filter generation is checked; at least the
+# longest revocation, which is a refresh token family
+REVOCATION_BLOOM_WINDOW_SECONDS = int(
+    os.getenv("REVOCATION_BLOOM_WINDOW_SECONDS", int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 1)) * 86400)
+)
+# Worker count that uvicorn and gunicorn read when --workers is not given
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+
+
+def _digest(token_id: str) -> bytes:
+    return hashlib.blake2b(token_id.encode(), digest_size=16).digest()
+
+
+def _bloom_dimensions(capacity: int, error_rate: float) -> Tuple[int, int]:
+    """(bits, hash count) for a Bloom filter holding `capacity` items at `error_rate`"""
+    size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+    return size, max(1, round(size / capacity * math.log(2)))
+
+
+def _bloom_positions(digest: bytes, size: int, hash_count: int) -> Iterator[int]:
+    # Double hashing over the two halves of the digest
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return ((h1 + i * h2) % size for i in range(hash_count))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 16-byte digests (double hashing)"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size, self.hash_count = _bloom_dimensions(capacity, error_rate)
+        self._bits = bytearray(math.ceil(self.size / 8))
+        self.count = 0
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        return _bloom_positions(digest, self.size, self.hash_count)
+
+    def add(self, digest: bytes) -> None:
+        for pos in self._positions(digest):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+class RedisBloomFilter:
+    """
+    Bloom filter kept in Redis bitmaps, so every worker sees every revocation.
+
+    Time is split into windows of `window` seconds and each window has its own
+    bitmap (a generation), which Redis drops once the window ends. A revocation
+    is written to the current and the next generation, and to any later one it
+    outlives, so the current generation holds every revocation made since the
+    previous window began. It is only trusted once it has been collecting for
+    that long; until then every check goes to the store.
+    """
+
+    def __init__(self, client, capacity: int, error_rate: float, window: int = REVOCATION_BLOOM_WINDOW_SECONDS,
+                 prefix: str = "revoked-bloom:"):
+        self.client = client
+        self.size, self.hash_count = _bloom_dimensions(capacity, error_rate)
+        self.window = max(1, window)
+        self.prefix = prefix
+
+    def _key(self, generation: int) -> str:
+        return f"{self.prefix}{generation}"
+
+    def _opened_key(self, generation: int) -> str:
+        # Window in which the generation started collecting revocations
+        return f"{self.prefix}{generation}:opened"
+
+    def _open(self, pipe, generation: int, current: int) -> None:
+        expires_at = (generation + 1) * self.window + 1
+        pipe.set(self._opened_key(generation), current, nx=True, exat=expires_at)
+        pipe.expireat(self._key(generation), expires_at)
+
+    async def add(self, digest: bytes, expires_at: float) -> None:
+        current = int(time.time() // self.window)
+        last = max(current + 1, int(expires_at // self.window))
+        async with self.client.pipeline(transaction=False) as pipe:
+            for generation in range(current, last + 1):
+                key = self._key(generation)
+                for pos in _bloom_positions(digest, self.size, self.hash_count):
+                    pipe.setbit(key, pos, 1)
+                self._open(pipe, generation, current)
+            await pipe.execute()
+
+    async def might_contain(self, digest: bytes) -> bool:
+        """False only if `digest` was certainly never revoked (or has expired)"""
+        current = int(time.time() // self.window)
+        key = self._key(current)
+        async with self.client.pipeline(transaction=False) as pipe:
+            # Start the next generation even if nothing is revoked this window
+            self._open(pipe, current + 1, current)
+            pipe.get(self._opened_key(current))
+            for pos in _bloom_positions(digest, self.size, self.hash_count):
+                pipe.getbit(key, pos)
+            results = await pipe.execute()
+        opened, bits = results[2], results[3:]
+        if opened is None or int(opened) >= current:
+            return True
+        return all(bits)
+
+
+class RevocationStore(ABC):
+    """Exact record of revoked token ids, kept until the tokens expire"""
+
+    # True when every revocation passes through this process, so a negative
+    # Bloom filter answer can be trusted without asking the store
+    is_local = False
+
+    @abstractmethod
+    async def add(self, digest: bytes, expires_at: float) -> bool:
+        """Record a revocation. Returns False if it was already revoked."""
+
+    @abstractmethod
+    async def contains(self, digest: bytes) -> bool: ...
+
+    async def prune(self) -> List[bytes]:
+        """Drop expired entries and return the live ones"""
+        return []
+
+
+class InMemoryRevocationStore(RevocationStore):
+    is_local = True
+
+    def __init__(self):
+        self._expiry: Dict[bytes, float] = {}
+        self._heap: List[Tuple[float, bytes]] = []
+
+    async def add(self, digest: bytes, expires_at: float) -> bool:
+        if digest in self._expiry and self._expiry[digest] > time.time():
+            return False
+        self._expiry[digest] = expires_at
+        heapq.heappush(self._heap, (expires_at, digest))
+        return True
+
+    async def contains(self, digest: bytes) -> bool:
+        expires_at = self._expiry.get(digest)
+        return expires_at is not None and expires_at > time.time()
+
+    async def prune(self) -> List[bytes]:
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, digest = heapq.heappop(self._heap)
+            if self._expiry.get(digest) == expires_at:
+                del self._expiry[digest]
+        return list(self._expiry)
+
+
+class RedisRevocationStore(RevocationStore):
+    """Shared store; Redis expires entries at the token's own expiry"""
+
+    def __init__(self, client, prefix: str = "revoked:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def add(self, digest: bytes, expires_at: float) -> bool:
+        key = self.prefix + digest.hex()
+        return bool(await self.client.set(key, 1, nx=True, exat=max(int(expires_at) + 1, int(time.time()) + 1)))
+
+    async def contains(self, digest: bytes) -> bool:
+        return bool(await self.client.exists(self.prefix + digest.hex()))
+
+
+class RevocationIndex:
+    """
+    Revocation checks with a Bloom filter in front of an exact store.
+
+    Most checks are for tokens that were never revoked; the filter answers
+    those without touching the store. Possible hits are confirmed against the
+    store. With the in-memory store the filter lives in this process; expired
+    entries are pruned periodically and the filter is rebuilt from what
+    remains, so it does not fill up over time. A shared store needs a shared
+    filter (RedisBloomFilter), which expires by itself; a process-local filter
+    cannot see other workers' revocations and is not consulted.
+    """
+
+    def __init__(self, store: RevocationStore, bloom: Union[BloomFilter, RedisBloomFilter],
+                 prune_interval: float = REVOCATION_PRUNE_INTERVAL_SECONDS):
+        self.store = store
+        self.bloom = bloom
+        self.prune_interval = prune_interval
+        self._next_prune = time.time() + prune_interval
+
+    async def revoke(self, token_id: str, expires_at: float) -> bool:
+        """Revoke a token id until `expires_at`. Returns False if it was already revoked."""
+        await self._maybe_prune()
+        digest = _digest(token_id)
+        added = await self.store.add(digest, expires_at)
+        if isinstance(self.bloom, RedisBloomFilter):
+            await self.bloom.add(digest, expires_at)
+        elif self.store.is_local:
+            self.bloom.add(digest)
+        return added
+
+    async def is_revoked(self, token_id: str) -> bool:
+        digest = _digest(token_id)
+        if isinstance(self.bloom, RedisBloomFilter):
+            if not await self.bloom.might_contain(digest):
+                return False
+        elif self.store.is_local and digest not in self.bloom:
+            return False
+        return await self.store.contains(digest)
+
+    async def _maybe_prune(self) -> None:
+        if not self.store.is_local or time.time() < self._next_prune:
+            return
+        self._next_prune = time.time() + self.prune_interval
+        live = await self.store.prune()
+        self.bloom.clear()
+        for digest in live:
+            self.bloom.add(digest)
+
+
+def create_revocation_index(url: str = REVOCATION_STORE_URL) -> RevocationIndex:
+    if url.startswith("memory://"):
+        return RevocationIndex(InMemoryRevocationStore(), BloomFilter(REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        from redis.asyncio import Redis
+        client = Redis.from_url(url)
+        return RevocationIndex(
+            RedisRevocationStore(client), RedisBloomFilter(client, REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE)
+        )
+    raise ValueError(f"Unsupported REVOCATION_STORE_URL: {url}")
+
+
+def check_revocation_store(index: RevocationIndex, workers: int = WEB_CONCURRENCY) -> None:
+    """
+    Refuse a process-local store when several workers serve requests: each
+    would only see its own revocations, so a reused refresh token would go
+    unnoticed whenever it reached a different worker.
+    """
+    if not index.store.is_local:
+        return
+    message = "REVOCATION_STORE_URL=memory:// keeps revocations in one worker; use redis:// with multiple workers."
+    if workers > 1:
+        raise RuntimeError(f"{message} (WEB_CONCURRENCY={workers})")
+    if multiprocessing.parent_process() is not None:
+        # Started by a process manager, e.g. `uvicorn --workers N`, which may run more than one of us
+        print(f"WARNING: {message}")
+
+
+revocation_index = create_revocation_index()
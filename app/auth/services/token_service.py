@@ -1,46 +1,88 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 # from fastapi.security import OAuth2PasswordBearer, OAuth2AuthorizationCodeBearer
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
 from fastapi import Depends, HTTPException, status
-from app.auth.models.users import User
-from app.auth.database import get_db
+from app.auth.models.users import Staff, User
+from app.auth.database import AsyncSessionLocal, get_read_db
+from app.auth.services.cache import TTLCache
+from app.auth.services.principal_cache import AuthorizationClaims, Principal, principal_cache
+from app.auth.services.key_service import KeyRing, SUPPORTED_ALGORITHMS
 
 from dotenv import load_dotenv
+from sqlalchemy import select
+import dataclasses
+import hashlib
 import os
+import secrets
+from pathlib import Path
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "secret-key-for-jwt-tokens")
 
+# HS256 signs with SECRET_KEY. EdDSA or ES256 sign with rotating key pairs
+# published at /.well-known/jwks.json so other services can verify locally.
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 20))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 1))
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "keys/jwt")
+JWT_KEY_ROTATION_DAYS = float(os.getenv("JWT_KEY_ROTATION_DAYS", 30))
+JWKS_CACHE_SECONDS = int(os.getenv("JWKS_CACHE_SECONDS", 3600))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+# "minimal" tokens carry only the user id; "claims" tokens also embed superuser
+# status and enterprise memberships so permission checks need no queries.
+ACCESS_TOKEN_PROFILE = os.getenv("ACCESS_TOKEN_PROFILE", "minimal")
+
+# Payloads of tokens that already passed signature verification, keyed by a
+# digest of the raw token and dropped at the token's own `exp`.
+verified_token_cache: TTLCache[dict] = TTLCache(max_size=TOKEN_CACHE_SIZE)
+
+key_ring: Optional[KeyRing] = None
+if ALGORITHM in SUPPORTED_ALGORITHMS:
+    key_ring = KeyRing(
+        algorithm=ALGORITHM,
+        keys_dir=Path(JWT_KEYS_DIR),
+        rotation_interval=JWT_KEY_ROTATION_DAYS * 86400,
+        retention=REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+        # Publish new keys for one JWKS cache lifetime before signing with them
+        activation_delay=JWKS_CACHE_SECONDS,
+    )
+    key_ring.load()
+
+
+def hash_token(token: str) -> str:
+    """SHA-256 of an opaque one-time token; only the digest is stored and looked up"""
+    return hashlib.sha256(token.encode()).hexdigest()
 
 # oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 bearer_scheme = HTTPBearer()
 
 class TokenService:
     @staticmethod
-    def create_access_token(user_id: int) -> str:
+    def create_access_token(user_id: int, claims: Optional[Dict[str, Any]] = None) -> str:
         """Create a new access token for a user"""
         expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         expire = datetime.now(timezone.utc) + expires_delta
         
         to_encode = {
+            **(claims or {}),
             "sub": str(user_id),
             # "role": role.value,
             "exp": expire.timestamp(),
             "type": "access"
         }
         
-        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        return TokenService.encode_token(to_encode)
     
     @staticmethod
-    def create_refresh_token(user_id: int) -> str:
-        """Create a new refresh token for a user"""
+    def create_refresh_token(user_id: int, family: Optional[str] = None) -> str:
+        """
+        Create a new refresh token for a user. Every token has its own `jti`;
+        `fam` identifies the chain of rotated tokens descending from one login.
+        """
         expires_delta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         expire = datetime.now(timezone.utc) + expires_delta
         
@@ -48,17 +90,43 @@ class TokenService:
             "sub": str(user_id),
             # "role": role.value,
             "exp": expire.timestamp(),
-            "type": "refresh"
+            "type": "refresh",
+            "jti": secrets.token_urlsafe(16),
+            "fam": family or secrets.token_urlsafe(16),
         }
         
-        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        return TokenService.encode_token(to_encode)
     
+    @staticmethod
+    def encode_token(payload: Dict[str, Any]) -> str:
+        """Sign a payload with the configured algorithm"""
+        if key_ring is None:
+            return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+        key = key_ring.signing_key()
+        return jwt.encode(payload, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    @staticmethod
+    def _verify_signature(token: str) -> dict:
+        if key_ring is None:
+            return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise jwt.InvalidKeyError("Unknown signing key")
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
     @staticmethod
     def decode_token(token: str) -> dict:
-        """Decode a JWT token"""
+        """Decode a JWT token, skipping verification for recently verified tokens"""
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = verified_token_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
+            payload = TokenService._verify_signature(token)
+            if "exp" in payload:
+                verified_token_cache.set(cache_key, payload, expires_at=float(payload["exp"]))
+            return dict(payload)
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -88,25 +156,140 @@ class TokenService:
         return payload
         
     @staticmethod
-    def create_tokens_for_user(user: User) -> Dict[str, str]:
+    def create_tokens_for_user(user: User, claims: Optional[Dict[str, Any]] = None, family: Optional[str] = None) -> Dict[str, str]:
         """Create both access and refresh tokens for a user"""
-        access_token = TokenService.create_access_token(user.id)
-        refresh_token = TokenService.create_refresh_token(user.id)
+        access_token = TokenService.create_access_token(user.id, claims)
+        refresh_token = TokenService.create_refresh_token(user.id, family)
         
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer"
         }
+
+    @staticmethod
+    async def build_access_claims(db: AsyncSession, user: User) -> Optional[Dict[str, Any]]:
+        """Authorization claims for the claims token profile, None for minimal tokens"""
+        if ACCESS_TOKEN_PROFILE != "claims":
+            return None
+        result = await db.execute(
+            select(Staff.enterprise_id, Staff.role).where(Staff.user_id == user.id, Staff.is_active == True)
+        )
+        return {
+            "su": bool(user.is_superuser),
+            "ent": {str(enterprise_id): role.value for enterprise_id, role in result.all()},
+            "ver": int(user.token_version or 0),
+        }
+
+    @staticmethod
+    async def issue_tokens_for_user(db: AsyncSession, user: User, family: Optional[str] = None) -> Dict[str, str]:
+        """Create tokens, embedding authorization claims when that profile is enabled"""
+        claims = await TokenService.build_access_claims(db, user)
+        return TokenService.create_tokens_for_user(user, claims, family)
     
 
     @staticmethod
-    async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: AsyncSession = Depends(get_db)) -> User:
+    async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: AsyncSession = Depends(get_read_db)) -> Principal:
         '''Get the current user from the token'''
         token = creds.credentials
         payload = TokenService.verify_token(token)
         user_id = int(payload.get("sub"))
-        user = await db.get(User, user_id)
-        if not user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-        return user
\ No newline at end of file
+
+        claims = AuthorizationClaims.from_payload(payload)
+        token_version = int(payload.get("ver", 0))
+
+        principal = await principal_cache.get(user_id)
+        # A token newer than the cached snapshot means this worker's copy is stale
+        if principal is None or (claims is not None and token_version > principal.token_version):
+            user = await db.get(User, user_id)
+            if user is None or (claims is not None and token_version > user.token_version):
+                # The replica has not caught up with the write this token was issued
+                # after (or with the user's creation, e.g. right after signup)
+                async with AsyncSessionLocal() as primary:
+                    user = await primary.get(User, user_id)
+            if not user:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+            principal = Principal.from_user(user)
+            await principal_cache.set(principal)
+
+        if claims is None:
+            return principal
+
+        # Memberships changed since this token was issued
+        if token_version != principal.token_version:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token is outdated, please refresh",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return dataclasses.replace(principal, claims=claims)
+
+    @staticmethod
+    async def introspect_tokens(db: AsyncSession, tokens: List[str]) -> List[Dict[str, Any]]:
+        """
+        Validate many access tokens at once. Signatures are checked in one pass
+        and all principals not already cached are loaded with a single IN query.
+        """
+        payloads: Dict[str, Optional[dict]] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+        for token in dict.fromkeys(tokens):
+            try:
+                payloads[token] = TokenService.verify_token(token)
+            except HTTPException as e:
+                status_name = "expired" if e.detail == "Token has expired" else "invalid"
+                results[token] = {"active": False, "status": status_name}
+
+        user_ids = {int(p["sub"]) for p in payloads.values() if p}
+        principals: Dict[int, Principal] = {}
+        missing = []
+        for user_id in user_ids:
+            principal = await principal_cache.get(user_id)
+            if principal is None:
+                missing.append(user_id)
+            else:
+                principals[user_id] = principal
+        if missing:
+            rows = await db.execute(select(User).where(User.id.in_(missing)))
+            for user in rows.scalars():
+                principal = Principal.from_user(user)
+                principals[principal.id] = principal
+                await principal_cache.set(principal)
+
+        # A token newer than the cached (or replica) snapshot means the snapshot
+        # is stale, not the token; a user the replica lacks may not have reached
+        # it yet. Re-read those users from the primary
+        stale = {user_id for user_id in user_ids if user_id not in principals} | {
+            int(p["sub"]) for p in payloads.values()
+            if p and "ent" in p and int(p["sub"]) in principals
+            and int(p.get("ver", 0)) > principals[int(p["sub"])].token_version
+        }
+        if stale:
+            async with AsyncSessionLocal() as primary:
+                rows = await primary.execute(select(User).where(User.id.in_(stale)))
+                for user in rows.scalars():
+                    principal = Principal.from_user(user)
+                    principals[principal.id] = principal
+                    await principal_cache.set(principal)
+
+        for token, payload in payloads.items():
+            base = {"sub": payload["sub"], "exp": payload.get("exp")}
+            principal = principals.get(int(payload["sub"]))
+            claims = AuthorizationClaims.from_payload(payload)
+            if principal is None:
+                results[token] = {**base, "active": False, "status": "user_not_found"}
+            elif not principal.is_active:
+                results[token] = {**base, "active": False, "status": "user_inactive"}
+            elif claims is not None and int(payload.get("ver", 0)) != principal.token_version:
+                results[token] = {**base, "active": False, "status": "outdated"}
+            else:
+                results[token] = {
+                    **base,
+                    "active": True,
+                    "status": "active",
+                    "principal": {
+                        **dataclasses.asdict(principal),
+                        "memberships": dict(claims.memberships) if claims else None,
+                    },
+                }
+
+        return [results[token] for token in tokens]
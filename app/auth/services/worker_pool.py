@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+
+class WorkerPoolBusy(HTTPException):
+    """Raised when a pool is saturated or a job does not finish in time"""
+    def __init__(self, pool_name: str, detail: str):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{pool_name}: {detail}",
+            headers={"Retry-After": "1"},
+        )
+
+
+class BoundedProcessPool:
+    """
+    A process pool for CPU-bound work that must not run on the event loop.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may wait
+    for a free worker. Submissions beyond that are rejected immediately instead
+    of piling up behind a saturated pool.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # Counters
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so every uvicorn worker gets its own pool after forking
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` in a worker process and await its result"""
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise WorkerPoolBusy(self.name, "Too many requests in progress, try again shortly")
+
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            job = executor.submit(fn, *args)
+        except BaseException as e:
+            # The job never started, so no callback will free its slot
+            self._in_flight -= 1
+            self._failed += 1
+            if isinstance(e, BrokenProcessPool):
+                self._discard(executor)
+            raise
+        # The slot is held until the process finishes the job (or it is cancelled
+        # before starting), not just until the caller stops waiting
+        job.add_done_callback(lambda _: self._release_from(loop))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.timeout)
+            self._completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            raise WorkerPoolBusy(self.name, "Request timed out, try again shortly")
+        except BrokenProcessPool:
+            # A worker died; its jobs fail and the next call starts a new pool
+            self._failed += 1
+            self._discard(executor)
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        # Another job may already have replaced the broken pool
+        if self._executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _release_from(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Runs on the executor's thread; counters belong to the event loop
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # Loop already closed; nothing is waiting on the counter
+            pass
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of pool saturation counters"""
+        running = min(self._in_flight, self.max_workers)
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "running": running,
+            "queued": self._in_flight - running,
+            "peak_in_flight": self._peak_in_flight,
+            "saturation": round(self._in_flight / (self.max_workers + self.max_queue), 3),
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
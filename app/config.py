@@ -0,0 +1,44 @@
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class DatabaseSettings(BaseSettings):
+    """Database connection settings, read from the environment or `.env`"""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # postgresql://, postgresql+asyncpg://, sqlite:/// or sqlite+aiosqlite:///
+    database_url: str = "sqlite+aiosqlite:///./auth.db"
+    db_echo: bool = False
+    # Startup check against the Alembic head: "strict", "warn" or "off"
+    db_schema_check: str = "strict"
+
+    # Read replicas, comma separated. Read-only routes use these when set.
+    database_replica_urls: str = ""
+    db_replica_retry_seconds: float = 30  # how long a failed replica is skipped
+    db_replica_fallback_to_primary: bool = True
+
+    # Connection pool (ignored for in-memory SQLite)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+
+    # PostgreSQL
+    db_statement_timeout_ms: int = 0  # 0 disables the server-side limit
+    db_prepared_statement_cache_size: int = 256
+
+    # SQLite
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
+
+@lru_cache
+def get_database_settings() -> DatabaseSettings:
+    return DatabaseSettings()
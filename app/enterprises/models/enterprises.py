@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SQLAEnum, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Enum as SQLAEnum, ForeignKey
 from sqlalchemy.orm import relationship
 from app.auth.database import Base
 import enum
@@ -14,7 +14,7 @@ class Enterprise(Base):
     __tablename__ = "enterprises"
 
     id = Column(Integer, primary_key=True, index=True)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String, unique=True, index=True)
     email = Column(String, nullable=False)
     type = Column(SQLAEnum(EnterpriseType), nullable=False)
@@ -28,6 +28,7 @@ class Enterprise(Base):
 
     # Branding
     logo_url = Column(String, nullable=True)  # URL or path to the logo image
+    logo_renditions = Column(JSON, nullable=True)  # {rendition: {format: url}} resized copies of the logo
     primary_color = Column(String, nullable=True)  # Hex code for the primary brand color
     accent_color = Column(String, nullable=True)  # Hex code for the accent brand color
     footer_text = Column(String, nullable=True)  # Text to display in the footer of exported documents
@@ -1,19 +1,15 @@
-import os
-import shutil
-from pathlib import Path
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.auth.database import get_db
-from app.auth.models.users import User
+from app.auth.database import get_db, get_read_db
+from app.auth.services.principal_cache import Principal
 from app.auth.services.token_service import TokenService
 from app.enterprises.models.enterprises import Enterprise
+from app.enterprises.services.branding_cache import branding_cache, cache_branding, etag_matches
 from app.enterprises.services.enterprise_service import EnterpriseService
 from app.enterprises.schemas.branding_schemas import BrandingUpdate, BrandingResponse
-
-# Create uploads directory if it doesn't exist
-UPLOAD_DIR = Path("uploads/logos")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+from app.enterprises.services.image_pipeline import image_pipeline
+from app.enterprises.services.upload_service import logo_uploads
 
 branding_router = APIRouter(prefix="/enterprises", tags=["Enterprise Branding"])
 
@@ -23,7 +19,7 @@ async def update_branding(
     branding_data: Optional[str] = Form(None),
     logo: Optional[UploadFile] = File(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(TokenService.get_current_user),
+    current_user: Principal = Depends(TokenService.get_current_user),
 ):
     """
     Update branding information for the enterprise, optionally including a logo image.
@@ -32,13 +28,11 @@ async def update_branding(
     import json
     enterprise_service = EnterpriseService(db)
 
-    # Get enterprise by ID
-    enterprise, error = await enterprise_service.get_enterprise_by_id(enterprise_id)
-    if error:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error)
-
-    # Verify user has permission to update this enterprise
-    if not await enterprise_service.has_permission(enterprise, current_user.id):
+    # Get the enterprise and check permission in one query
+    enterprise, allowed = await enterprise_service.get_enterprise_for_user(enterprise_id, current_user)
+    if enterprise is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Enterprise not found")
+    if not allowed:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to update this enterprise"
@@ -51,32 +45,17 @@ async def update_branding(
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid branding_data: {e}")
 
-    # If a logo is provided, process and save it
+    # If a logo is provided, stream it to blob storage; replaced blobs are left to logo garbage collection
     if logo:
-        allowed_extensions = {".jpg", ".jpeg", ".png", ".gif", ".svg"}
-        filename = logo.filename or ""
-        file_ext = os.path.splitext(filename)[1].lower()
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
-            )
-        # Create a unique filename
-        filename = f"enterprise_{enterprise_id}{file_ext}"
-        file_path: Path = UPLOAD_DIR / filename
         try:
-            # Delete existing logo if it exists
-            if enterprise is not None and getattr(enterprise, "logo_url", None) is not None:
-                old_file_path = Path(enterprise.logo_url.replace("/logos/", "uploads/logos/"))
-                if old_file_path.exists():
-                    os.remove(old_file_path)
-            # Save the new logo
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(logo.file, buffer)
-            # Update the logo_url in the branding update
-            branding_update["logo_url"] = f"/logos/{filename}"
+            name = await logo_uploads.save(logo)
+            renditions = await image_pipeline.create_renditions(name)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Logo upload failed: {e}")
+        branding_update["logo_url"] = logo_uploads.url_for(name)
+        branding_update["logo_renditions"] = renditions
 
     # Update the branding in the database
     enterprise, error = await enterprise_service.update_enterprise_branding(
@@ -91,41 +70,46 @@ async def update_branding(
 @branding_router.get("/{enterprise_id}/branding", status_code=status.HTTP_200_OK, response_model=BrandingResponse)
 async def get_branding(
     enterprise_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(TokenService.get_current_user),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(TokenService.get_current_user),
 ):
     """
     Get branding information for the enterprise.
-    Requires permission
+    Requires permission. Supports If-None-Match; unchanged branding gets a 304.
     """
     enterprise_service = EnterpriseService(db)
-    
-    # Get enterprise by ID
-    enterprise, error = await enterprise_service.get_enterprise_by_id(enterprise_id)
-    if error:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error)
-    
-    # Verify user has permission to view this enterprise
-    if not await enterprise_service.has_permission(enterprise, current_user.id): # type: ignore
+
+    # Served from the branding cache when possible; the enterprise is only loaded on a miss
+    cached = branding_cache.get(enterprise_id)
+    if cached is None:
+        # Get the enterprise and check permission in one query
+        enterprise, allowed = await enterprise_service.get_enterprise_for_user(enterprise_id, current_user)
+        if enterprise is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Enterprise not found")
+        cached = cache_branding(enterprise)
+    else:
+        allowed = await enterprise_service.can_manage(enterprise_id, cached.owner_id, current_user.id, current_user.claims)
+    if not allowed:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to view this enterprise"
         )
-    
-    # Return the branding information
-    return BrandingResponse(
-        logo_url=enterprise.logo_url,
-        primary_color=enterprise.primary_color,
-        accent_color=enterprise.accent_color,
-        footer_text=enterprise.footer_text
-    )
+
+    # Clients may keep it but must revalidate, since access can be revoked
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return cached.branding
 
 @branding_router.post("/{enterprise_id}/branding/logo", status_code=status.HTTP_200_OK)
 async def upload_logo(
     enterprise_id: int,
     logo: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(TokenService.get_current_user),
+    current_user: Principal = Depends(TokenService.get_current_user),
 ):
     """
     Upload a logo for the enterprise.
@@ -133,56 +117,36 @@ async def upload_logo(
     """
     enterprise_service = EnterpriseService(db)
     
-    # Get enterprise by ID
-    enterprise, error = await enterprise_service.get_enterprise_by_id(enterprise_id)
-    if error:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error)
-    
-    # Verify user has permission to update this enterprise
-    if not await enterprise_service.has_permission(enterprise, current_user.id): # type: ignore
+    # Get the enterprise and check permission in one query
+    enterprise, allowed = await enterprise_service.get_enterprise_for_user(enterprise_id, current_user)
+    if enterprise is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Enterprise not found")
+    if not allowed:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to update this enterprise"
         )
     
-    # Check file type (allow common image formats)
-    allowed_extensions = {".jpg", ".jpeg", ".png", ".gif", ".svg"}
-    filename = logo.filename or "" # Potential bug
-    file_ext = os.path.splitext(filename)[1].lower() # refactor for better processing
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
-        )
-    
-    # Create a unique filename
-    filename = f"enterprise_{enterprise_id}{file_ext}"
-    file_path: Path = UPLOAD_DIR / filename
-    
     # Save the file
     try:
-        # Delete existing logo if it exists
-        if enterprise is not None and getattr(enterprise, "logo_url", None) is not None:
-            old_file_path = Path(enterprise.logo_url.replace("/logos/", "uploads/logos/"))
-            if old_file_path.exists():
-                os.remove(old_file_path)
-        
-        # Save the new logo
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(logo.file, buffer)
-        
+        # Streamed to blob storage; rejected early if too large or not an image
+        name = await logo_uploads.save(logo)
+        renditions = await image_pipeline.create_renditions(name)
+
         # Update the database with the logo URL
-        logo_url = f"/logos/{filename}"
+        logo_url = logo_uploads.url_for(name)
         enterprise, error = await enterprise_service.update_enterprise_branding(
             enterprise_id=enterprise_id, 
-            branding_data={"logo_url": logo_url}
+            branding_data={"logo_url": logo_url, "logo_renditions": renditions}
         )
         
         if error:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
             
-        return {"message": "Logo uploaded successfully", "logo_url": logo_url}
+        return {"message": "Logo uploaded successfully", "logo_url": logo_url, "logo_renditions": renditions}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -190,7 +154,7 @@ async def upload_logo(
 async def delete_logo(
     enterprise_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(TokenService.get_current_user),
+    current_user: Principal = Depends(TokenService.get_current_user),
 ):
     """
     Delete the enterprise logo.
@@ -198,13 +162,11 @@ async def delete_logo(
     """
     enterprise_service = EnterpriseService(db)
 
-    # Get enterprise by ID
-    enterprise, error = await enterprise_service.get_enterprise_by_id(enterprise_id)
-    if error:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error)
-    
-    # Verify user has permission to update this enterprise
-    if not await enterprise_service.has_permission(enterprise, current_user.id): # type: ignore
+    # Get the enterprise and check permission in one query
+    enterprise, allowed = await enterprise_service.get_enterprise_for_user(enterprise_id, current_user)
+    if enterprise is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Enterprise not found")
+    if not allowed:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to update this enterprise"
@@ -217,16 +179,12 @@ async def delete_logo(
             detail="No logo found for this enterprise"
         )
     
-    # Delete the logo file
+    # Unreference the logo; its files are removed by logo garbage collection
     try:
-        file_path = Path(enterprise.logo_url.replace("/logos/", "uploads/logos/"))
-        if file_path.exists():
-            os.remove(file_path)
-        
         # Update the database to remove the logo URL
         enterprise, error = await enterprise_service.update_enterprise_branding(
             enterprise_id=enterprise_id, 
-            branding_data={"logo_url": None}
+            branding_data={"logo_url": None, "logo_renditions": None}
         )
         
         if error:
@@ -234,6 +192,8 @@ async def delete_logo(
             
         return {"message": "Logo deleted successfully"}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
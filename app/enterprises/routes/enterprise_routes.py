@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.database import get_db
 from app.auth.services.token_service import TokenService
-from app.auth.models.users import User
+from app.auth.services.principal_cache import Principal
 from app.enterprises.schemas.enterprise_schemas import EnterpriseCreate, EnterpriseResponse
 from app.enterprises.services.enterprise_service import EnterpriseService
 from app.auth.services.auth_service import AuthService
@@ -19,7 +19,7 @@ enterprise_router = APIRouter(prefix="/enterprises", tags=["Enterprises"])
 async def create_enterprise(
     enterprise_data: EnterpriseCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(TokenService.get_current_user)
+    current_user: Principal = Depends(TokenService.get_current_user)
 ) -> EnterpriseResponse:
     """
     Create a new firm for the current user.
@@ -41,7 +41,7 @@ async def create_enterprise(
 # async def get_enterprise(
 #     enterprise_id: int,
 #     db: AsyncSession = Depends(get_db),
-#     current_user: User = Depends(TokenService.get_current_user)
+#     current_user: Principal = Depends(TokenService.get_current_user)
 # ) -> EnterpriseResponse:
 #     """
 #     Get details of a specific firm.
@@ -64,7 +64,7 @@ async def invite_assistant_to_enterprise(
     enterprise_id: int,
     invitation_data: StaffInvitation,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(TokenService.get_current_user),
+    current_user: Principal = Depends(TokenService.get_current_user),
 ):
     """
     Invite a single teammate to a firm.
@@ -77,7 +77,8 @@ async def invite_assistant_to_enterprise(
         enterprise_id=enterprise_id,
         inviter=current_user,
         invitation_data=invitation_data,
-        hashed_otp=auth_service.get_password_hash(otp)  # Set the OTP as the user's password
+        hashed_otp=await auth_service.get_password_hash(otp),  # Set the OTP as the user's password
+        otp=otp,
     )
     if error:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
@@ -88,7 +89,7 @@ async def invite_multiple_assistants_to_enterprise(
     enterprise_id: int,
     invitation_data: MultipleStaffInvitations,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(TokenService.get_current_user),
+    current_user: Principal = Depends(TokenService.get_current_user),
 ):
     """
     Invite multiple teammates to a firm in a single request.
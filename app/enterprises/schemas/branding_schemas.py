@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel, Field
 
 class BrandingUpdate(BaseModel):
@@ -18,6 +18,8 @@ class BrandingUpdate(BaseModel):
 
 class BrandingResponse(BaseModel):
     logo_url: Optional[str] = None
+    # e.g. {"thumbnail": {"webp": "/logos/...webp", "avif": "/logos/...avif"}, "header": {...}, "print": {...}}
+    logo_renditions: Optional[Dict[str, Dict[str, str]]] = None
     primary_color: Optional[str] = None
     accent_color: Optional[str] = None
     footer_text: Optional[str] = None
@@ -0,0 +1,319 @@
+import asyncio
+import mimetypes
+import os
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from starlette.types import ASGIApp
+
+from app.middleware.static_files import IMMUTABLE_CACHE_CONTROL, ImmutableStaticFiles, PresignedRedirect
+
+load_dotenv()
+
+# local | s3
+BLOB_STORAGE = os.getenv("BLOB_STORAGE", "local")
+LOGO_UPLOAD_DIR = Path(os.getenv("LOGO_UPLOAD_DIR", "uploads/logos"))
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+# Set for S3-compatible services (MinIO, R2, ...); unset for AWS
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+S3_PRESIGN_EXPIRES_SECONDS = int(os.getenv("S3_PRESIGN_EXPIRES_SECONDS", 3600))
+# S3 requires every part but the last to be at least 5 MiB
+S3_MULTIPART_CHUNK_SIZE = max(5 * 1024 * 1024, int(os.getenv("S3_MULTIPART_CHUNK_SIZE", 8 * 1024 * 1024)))
+
+Listing = List[Tuple[str, float]]
+
+
+class BlobWriter(ABC):
+    """Receives a blob in chunks; nothing is visible until commit"""
+
+    @abstractmethod
+    async def write(self, chunk: bytes) -> None: ...
+
+    @abstractmethod
+    async def commit(self, name: str) -> None:
+        """Publish under `name`. If it already exists (same content), keep it and refresh its timestamp."""
+
+    @abstractmethod
+    async def abort(self) -> None: ...
+
+
+class BlobStorage(ABC):
+    """Flat namespace of immutable, content-addressed blobs"""
+
+    @abstractmethod
+    async def writer(self) -> BlobWriter: ...
+
+    @abstractmethod
+    async def read(self, name: str) -> bytes: ...
+
+    @abstractmethod
+    async def delete(self, name: str) -> None: ...
+
+    @abstractmethod
+    async def list(self) -> Listing:
+        """(name, last modified as a unix timestamp) for every blob"""
+
+    @abstractmethod
+    def asgi_app(self) -> ASGIApp:
+        """App that serves GET /<name>"""
+
+    async def put(self, name: str, data: bytes) -> None:
+        writer = await self.writer()
+        try:
+            await writer.write(data)
+            await writer.commit(name)
+        except BaseException:
+            await writer.abort()
+            raise
+
+
+def publish(temp_path: Path, final_path: Path) -> None:
+    """Move a finished temp file to its content-addressed name"""
+    try:
+        # Same content is already stored; refresh it so garbage collection keeps it
+        os.utime(final_path)
+    except FileNotFoundError:
+        os.replace(temp_path, final_path)
+    else:
+        temp_path.unlink()
+
+
+class LocalBlobWriter(BlobWriter):
+    def __init__(self, directory: Path, fd: int, temp_path: Path):
+        self.directory = directory
+        self.temp_path = temp_path
+        self.file = os.fdopen(fd, "wb")
+
+    async def write(self, chunk: bytes) -> None:
+        await asyncio.to_thread(self.file.write, chunk)
+
+    def _commit(self, final_path: Path) -> None:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        publish(self.temp_path, final_path)
+
+    async def commit(self, name: str) -> None:
+        await asyncio.to_thread(self._commit, self.directory / name)
+
+    def _abort(self) -> None:
+        self.file.close()
+        self.temp_path.unlink(missing_ok=True)
+
+    async def abort(self) -> None:
+        await asyncio.to_thread(self._abort)
+
+
+class LocalBlobStorage(BlobStorage):
+    """Blobs as files in one directory, written to a temp file and renamed into place"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    async def writer(self) -> LocalBlobWriter:
+        await asyncio.to_thread(self.directory.mkdir, parents=True, exist_ok=True)
+        fd, temp_name = await asyncio.to_thread(tempfile.mkstemp, dir=self.directory, prefix=".upload-", suffix=".part")
+        return LocalBlobWriter(self.directory, fd, Path(temp_name))
+
+    async def read(self, name: str) -> bytes:
+        return await asyncio.to_thread((self.directory / name).read_bytes)
+
+    async def delete(self, name: str) -> None:
+        await asyncio.to_thread((self.directory / name).unlink, missing_ok=True)
+
+    def _list(self) -> Listing:
+        if not self.directory.is_dir():
+            return []
+        return [(path.name, path.stat().st_mtime) for path in self.directory.iterdir() if path.is_file()]
+
+    async def list(self) -> Listing:
+        return await asyncio.to_thread(self._list)
+
+    def asgi_app(self) -> ASGIApp:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return ImmutableStaticFiles(directory=self.directory)
+
+
+class S3BlobWriter(BlobWriter):
+    """
+    Streams to a temporary key with a multipart upload (a single PUT when the
+    blob fits in one part), then copies it to its final key server-side.
+    """
+
+    def __init__(self, storage: "S3BlobStorage"):
+        self.storage = storage
+        self.client = storage.client
+        self.temp_key = storage.key(f".upload-{uuid.uuid4().hex}")
+        self.buffer = bytearray()
+        self.upload_id: Optional[str] = None
+        self.parts: List[dict] = []
+
+    async def _upload_part(self, data: bytes) -> None:
+        if self.upload_id is None:
+            response = await asyncio.to_thread(
+                self.client.create_multipart_upload, Bucket=self.storage.bucket, Key=self.temp_key
+            )
+            self.upload_id = response["UploadId"]
+        number = len(self.parts) + 1
+        response = await asyncio.to_thread(
+            self.client.upload_part,
+            Bucket=self.storage.bucket, Key=self.temp_key, UploadId=self.upload_id, PartNumber=number, Body=data,
+        )
+        self.parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    async def write(self, chunk: bytes) -> None:
+        self.buffer.extend(chunk)
+        while len(self.buffer) >= self.storage.part_size:
+            part = bytes(self.buffer[:self.storage.part_size])
+            del self.buffer[:self.storage.part_size]
+            await self._upload_part(part)
+
+    async def commit(self, name: str) -> None:
+        bucket, final_key = self.storage.bucket, self.storage.key(name)
+        if await self.storage.exists(name):
+            await self.abort()
+            await self.storage.touch(name)
+            return
+
+        if self.upload_id is None:
+            # Small blob: one PUT straight to the final key
+            await asyncio.to_thread(
+                self.client.put_object, Bucket=bucket, Key=final_key, Body=bytes(self.buffer), **self.storage.object_args(name)
+            )
+            return
+
+        if self.buffer:
+            await self._upload_part(bytes(self.buffer))
+            self.buffer.clear()
+        await asyncio.to_thread(
+            self.client.complete_multipart_upload,
+            Bucket=bucket, Key=self.temp_key, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts},
+        )
+        self.upload_id = None
+        await asyncio.to_thread(
+            self.client.copy_object,
+            Bucket=bucket, Key=final_key, CopySource={"Bucket": bucket, "Key": self.temp_key},
+            MetadataDirective="REPLACE", **self.storage.object_args(name),
+        )
+        await asyncio.to_thread(self.client.delete_object, Bucket=bucket, Key=self.temp_key)
+
+    async def abort(self) -> None:
+        if self.upload_id is not None:
+            await asyncio.to_thread(
+                self.client.abort_multipart_upload,
+                Bucket=self.storage.bucket, Key=self.temp_key, UploadId=self.upload_id,
+            )
+            self.upload_id = None
+        self.buffer.clear()
+
+
+class S3BlobStorage(BlobStorage):
+    """
+    Blobs in an S3-compatible bucket. Reads are redirected to presigned URLs,
+    so blob bytes never pass through the app. boto3 is synchronous; calls
+    run in worker threads.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client: Any = None,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        region: Optional[str] = S3_REGION,
+        presign_expires: int = S3_PRESIGN_EXPIRES_SECONDS,
+        part_size: int = S3_MULTIPART_CHUNK_SIZE,
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.presign_expires = presign_expires
+        self.part_size = part_size
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("s3", endpoint_url=self.endpoint_url, region_name=self.region)
+        return self._client
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def object_args(self, name: str) -> dict:
+        args = {
+            "ContentType": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "CacheControl": IMMUTABLE_CACHE_CONTROL,
+        }
+        if name.lower().endswith(".svg"):
+            # Never rendered as a document if opened directly; <img> ignores it
+            args["ContentDisposition"] = "attachment"
+        return args
+
+    async def writer(self) -> S3BlobWriter:
+        return S3BlobWriter(self)
+
+    async def exists(self, name: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.key(name))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def touch(self, name: str) -> None:
+        """Refresh LastModified so garbage collection keeps the blob"""
+        await asyncio.to_thread(
+            self.client.copy_object,
+            Bucket=self.bucket, Key=self.key(name), CopySource={"Bucket": self.bucket, "Key": self.key(name)},
+            MetadataDirective="REPLACE", **self.object_args(name),
+        )
+
+    async def read(self, name: str) -> bytes:
+        response = await asyncio.to_thread(self.client.get_object, Bucket=self.bucket, Key=self.key(name))
+        return await asyncio.to_thread(response["Body"].read)
+
+    async def delete(self, name: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.key(name))
+
+    def _list(self) -> Listing:
+        blobs: Listing = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                name = item["Key"][len(self.prefix):]
+                if name and "/" not in name:
+                    blobs.append((name, item["LastModified"].timestamp()))
+        return blobs
+
+    async def list(self) -> Listing:
+        return await asyncio.to_thread(self._list)
+
+    def presigned_url(self, name: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self.key(name)}, ExpiresIn=self.presign_expires
+        )
+
+    def asgi_app(self) -> ASGIApp:
+        return PresignedRedirect(self.presigned_url, max_age=self.presign_expires // 2)
+
+
+def create_blob_storage(backend: str = BLOB_STORAGE, directory: Path = LOGO_UPLOAD_DIR, prefix: str = "logos") -> BlobStorage:
+    if backend == "local":
+        return LocalBlobStorage(directory)
+    if backend == "s3":
+        if not S3_BUCKET:
+            raise ValueError("BLOB_STORAGE=s3 requires S3_BUCKET")
+        return S3BlobStorage(S3_BUCKET, prefix)
+    raise ValueError(f"Unsupported BLOB_STORAGE: {backend}")
+
+
+logo_storage = create_blob_storage()
@@ -0,0 +1,87 @@
+import os
+from dataclasses import dataclass
+from typing import Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.auth.services.cache import TTLCache
+from app.enterprises.models.enterprises import Enterprise
+from app.enterprises.schemas.branding_schemas import BrandingResponse
+
+load_dotenv()
+
+BRANDING_CACHE_SIZE = int(os.getenv("BRANDING_CACHE_SIZE", 10000))
+# Upper bound on how long other workers may serve branding that changed elsewhere
+BRANDING_CACHE_TTL_SECONDS = int(os.getenv("BRANDING_CACHE_TTL_SECONDS", 60))
+
+
+@dataclass(frozen=True)
+class CachedBranding:
+    etag: str
+    owner_id: int
+    branding: BrandingResponse
+
+
+# enterprise_id -> branding as of the enterprise's updated_at
+branding_cache: TTLCache[CachedBranding] = TTLCache(max_size=BRANDING_CACHE_SIZE, default_ttl=BRANDING_CACHE_TTL_SECONDS)
+
+_PENDING_KEY = "branding_cache_invalidations"
+
+
+def branding_etag(enterprise: Enterprise) -> str:
+    """Strong ETag for an enterprise's branding; changes whenever updated_at does"""
+    version = f"{enterprise.updated_at:%Y%m%d%H%M%S%f}" if enterprise.updated_at else "0"
+    return f'"{enterprise.id}-{version}"'
+
+
+def cache_branding(enterprise: Enterprise) -> CachedBranding:
+    cached = CachedBranding(
+        etag=branding_etag(enterprise),
+        owner_id=enterprise.owner_id,
+        branding=BrandingResponse(
+            logo_url=enterprise.logo_url,
+            logo_renditions=enterprise.logo_renditions,
+            primary_color=enterprise.primary_color,
+            accent_color=enterprise.accent_color,
+            footer_text=enterprise.footer_text,
+        ),
+    )
+    branding_cache.set(enterprise.id, cached)
+    return cached
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def invalidate_branding(enterprise_id: int) -> None:
+    branding_cache.pop(enterprise_id)
+
+
+def _enterprise_changed(mapper, connection, target: Enterprise) -> None:
+    invalidate_branding(target.id)
+    # Drop it again once committed, in case a concurrent request re-cached the old row
+    session = object_session(target)
+    if session is not None:
+        pending: Set[int] = session.info.setdefault(_PENDING_KEY, set())
+        pending.add(target.id)
+
+
+for _event in ("after_update", "after_delete"):
+    event.listen(Enterprise, _event, _enterprise_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for enterprise_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_branding(enterprise_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -1,13 +1,21 @@
 from datetime import datetime, timedelta, timezone
+import asyncio
 import secrets
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_
 from sqlalchemy.future import select
-from app.auth.services.email_service import EmailService
+from app.auth.services.email_outbox import enqueue_email
+from app.auth.services.email_templates import Branding
+from app.auth.services.password_hasher import password_hasher
 from app.enterprises.models.enterprises import Enterprise
 from app.enterprises.schemas.enterprise_schemas import EnterpriseCreate, EnterpriseResponse
 from app.enterprises.schemas.staff_schemas import StaffInvitation
 from app.auth.models.users import Staff, User
+from app.auth.services.principal_cache import AuthorizationClaims, Principal, principal_cache
+from app.auth.services.token_service import hash_token
+from app.enterprises.services.branding_cache import cache_branding
+from app.enterprises.services.permission_cache import permission_cache
 
 class EnterpriseService:
     def __init__(self, db: AsyncSession):
@@ -40,7 +48,7 @@ class EnterpriseService:
         except Exception as e:
             return None, str(e)
 
-    async def invite_teammate(self, enterprise_id: int, inviter: User, invitation_data: StaffInvitation, hashed_otp: str):
+    async def invite_teammate(self, enterprise_id: int, inviter: Principal, invitation_data: StaffInvitation, hashed_otp: str, otp: str):
         try:
             # Check if the enterprise exists
             enterprise = await self.db.get(Enterprise, enterprise_id)
@@ -91,9 +99,12 @@ class EnterpriseService:
                     password_hash=hashed_otp,  # Use OTP as a temporary password
                 )
                 self.db.add(new_user)
-                await self.db.commit()
-                await self.db.refresh(new_user)
+                await self.db.flush()
                 user = new_user
+                # Only new accounts get the one-time password; existing users keep theirs
+                invite_otp = otp
+            else:
+                invite_otp = None
 
             # Generate an invitation token
             invite_token = secrets.token_urlsafe(32)
@@ -105,38 +116,45 @@ class EnterpriseService:
                 enterprise_id=enterprise_id,
                 role=invitation_data.role,
                 inviter_id=inviter.id,
-                invite_token=invite_token,
+                invite_token_hash=hash_token(invite_token),
                 invite_token_expires_at=invite_token_expires_at,
             )
             self.db.add(new_staff)
-            await self.db.commit()
 
-            # Send the invitation email
-            email_service = EmailService()
+            # Queue the invitation email; it commits with the user and staff rows
             invitation_link = f"http://xenx.onrender.com/accept-invitation?token={invite_token}"
-
-            await email_service.send_teammate_invitation_mail(
-                to_email=invitation_data.email,
+            await enqueue_email(
+                self.db,
+                "teammate_invitation",
+                invitation_data.email,
+                expires_at=invite_token_expires_at,
                 inviter_name=f"{inviter.first_name} {inviter.last_name}",
                 enterprise_name=enterprise.name,
                 invitation_link=invitation_link,
-                otp=hashed_otp
+                otp=invite_otp,
+                branding=Branding.from_enterprise(enterprise).as_dict(),
             )
+            await self.db.commit()
 
             return new_staff, None
         except Exception as e:
+            await self.db.rollback()
             return None, str(e)
             
-    async def invite_multiple_teammates(self, enterprise_id: int, inviter: User, invitations: list, auth_service):
+    async def invite_multiple_teammates(self, enterprise_id: int, inviter: Principal, invitations: list, auth_service):
         """
         Invite multiple teammates to an enterprise.
-        
+
+        Existing users and memberships are resolved with one query, OTPs are
+        hashed in parallel for new users only, all rows are written in a single
+        transaction, and invitation emails are handed to the email queue.
+
         Args:
             enterprise_id: The ID of the enterprise
             inviter: The user sending the invitations
             invitations: List of StaffInvitationItem objects
             auth_service: AuthService instance for password hashing
-            
+
         Returns:
             Tuple containing a list of successfully invited staff members and error message if any
         """
@@ -145,112 +163,126 @@ class EnterpriseService:
             enterprise = await self.db.get(Enterprise, enterprise_id)
             if not enterprise:
                 return None, "Enterprise not found"
-                
+
             # Check if the inviter is part of the enterprise
             if enterprise.owner_id != inviter.id:
-                # check if inviter is a staff member
-                async with self.db.begin():
-                    result = await self.db.execute(
-                        select(Staff).filter_by(user_id=inviter.id, enterprise_id=enterprise_id)
-                    )
-                    existing_staff = result.scalar_one_or_none()
-                    if not existing_staff:
-                        return None, "You do not have permission to invite users to this enterprise"
-            
-            # List to track successful invitations
-            successful_invitations = []
+                result = await self.db.execute(
+                    select(Staff.id).filter_by(user_id=inviter.id, enterprise_id=enterprise_id)
+                )
+                if result.first() is None:
+                    return None, "You do not have permission to invite users to this enterprise"
+
             failed_invitations = []
-            
-            email_service = EmailService()
-            
+            pending = {}
             for invitation in invitations:
-                try:
-                    # Skip if user tries to invite themselves
-                    if inviter.email == invitation.email:
-                        failed_invitations.append({"email": invitation.email, "reason": "Cannot invite yourself"})
-                        continue
-                    
-                    # Check if the user is already a staff member
-                    async with self.db.begin():
-                        result = await self.db.execute(
-                            select(User).filter_by(email=invitation.email)
-                        )
-                        user = result.scalar_one_or_none()
-
-                        if user:
-                            result = await self.db.execute(
-                                select(Staff).filter_by(user_id=user.id, enterprise_id=enterprise_id)
-                            )
-                            existing_staff = result.scalar_one_or_none()
-                            if existing_staff:
-                                failed_invitations.append({"email": invitation.email, "reason": "User is already a member of this enterprise"})
-                                continue
-
-                    # Generate OTP for this invitation
-                    otp = secrets.token_hex(4)
-                    hashed_otp = auth_service.get_password_hash(otp)
-                    
-                    # If user does not exist, create a new user
-                    if not user:
-                        # Create a new user with the provided email and OTP as password
-                        new_user = User(
-                            email=invitation.email,
-                            username=invitation.email.split('@')[0],  # Use email prefix as username
-                            is_active=False,
-                            password_hash=hashed_otp,  # Use OTP as a temporary password
-                        )
-                        self.db.add(new_user)
-                        await self.db.commit()
-                        await self.db.refresh(new_user)
-                        user = new_user
-
-                    # Generate an invitation token
-                    invite_token = secrets.token_urlsafe(32)
-                    invite_token_expires_at = datetime.now(timezone.utc) + timedelta(days=7)
-
-                    # Create a new staff record
-                    new_staff = Staff(
-                        user_id=user.id,
-                        enterprise_id=enterprise_id,
-                        role=invitation.role,
-                        inviter_id=inviter.id,
-                        invite_token=invite_token,
-                        invite_token_expires_at=invite_token_expires_at,
-                    )
-                    self.db.add(new_staff)
-                    await self.db.commit()
-
-                    # Send the invitation email
-                    invitation_link = f"http://xenx.onrender.com/accept-invitation?token={invite_token}"
-
-                    await email_service.send_teammate_invitation_mail(
-                        to_email=invitation.email,
-                        inviter_name=f"{inviter.first_name} {inviter.last_name}",
-                        enterprise_name=enterprise.name,
-                        invitation_link=invitation_link,
-                        otp=otp
-                    )
-
-                    successful_invitations.append(new_staff)
-                except Exception as e:
-                    # If there's an error with one invitation, log it and continue with others
-                    failed_invitations.append({"email": invitation.email, "reason": str(e)})
-            
-            # Return success if any invitations succeeded, or error if all failed
-            if successful_invitations:
-                return {"successful": successful_invitations, "failed": failed_invitations}, None
-            else:
+                email = invitation.email.lower()
+                if email == (inviter.email or "").lower():
+                    failed_invitations.append({"email": invitation.email, "reason": "Cannot invite yourself"})
+                elif email in pending:
+                    failed_invitations.append({"email": invitation.email, "reason": "Duplicate email in request"})
+                else:
+                    pending[email] = invitation
+            if not pending:
                 return None, "All invitations failed"
-                
+
+            # Existing users and their membership in this enterprise, in one query
+            result = await self.db.execute(
+                select(User, Staff.id)
+                .outerjoin(Staff, and_(Staff.user_id == User.id, Staff.enterprise_id == enterprise_id))
+                .where(User.email.in_([invitation.email for invitation in pending.values()]))
+            )
+            existing_users = {}
+            for user, staff_id in result.all():
+                email = user.email.lower()
+                if staff_id is not None:
+                    invitation = pending.pop(email)
+                    failed_invitations.append({"email": invitation.email, "reason": "User is already a member of this enterprise"})
+                else:
+                    existing_users[email] = user
+
+            new_emails = [email for email in pending if email not in existing_users]
+            usernames = await self._unique_usernames([email.split('@')[0] for email in new_emails])
+
+            # Hash temporary passwords in parallel, without queueing more than the pool can run
+            otps = {email: secrets.token_hex(4) for email in new_emails}
+            limit = asyncio.Semaphore(password_hasher.pool.max_workers)
+
+            async def hash_otp(otp: str) -> str:
+                async with limit:
+                    return await auth_service.get_password_hash(otp)
+
+            hashed_otps = await asyncio.gather(*(hash_otp(otps[email]) for email in new_emails))
+
+            new_users = {
+                email: User(
+                    email=pending[email].email,
+                    username=username,
+                    is_active=False,
+                    password_hash=hashed_otp,  # Use OTP as a temporary password
+                )
+                for email, username, hashed_otp in zip(new_emails, usernames, hashed_otps)
+            }
+            self.db.add_all(new_users.values())
+            await self.db.flush()
+
+            invite_tokens = {}
+            successful_invitations = []
+            invite_token_expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+            for email, invitation in pending.items():
+                user = existing_users.get(email) or new_users[email]
+                invite_tokens[email] = secrets.token_urlsafe(32)
+                successful_invitations.append(Staff(
+                    user_id=user.id,
+                    enterprise_id=enterprise_id,
+                    role=invitation.role,
+                    inviter_id=inviter.id,
+                    invite_token_hash=hash_token(invite_tokens[email]),
+                    invite_token_expires_at=invite_token_expires_at,
+                ))
+            self.db.add_all(successful_invitations)
+
+            branding = Branding.from_enterprise(enterprise).as_dict()
+            for email, invitation in pending.items():
+                await enqueue_email(
+                    self.db,
+                    "teammate_invitation",
+                    invitation.email,
+                    expires_at=invite_token_expires_at,
+                    inviter_name=f"{inviter.first_name} {inviter.last_name}",
+                    enterprise_name=enterprise.name,
+                    invitation_link=f"http://xenx.onrender.com/accept-invitation?token={invite_tokens[email]}",
+                    otp=otps.get(email),  # existing users keep their password
+                    branding=branding,
+                )
+            await self.db.commit()
+
+            return {"successful": successful_invitations, "failed": failed_invitations}, None
+
         except Exception as e:
+            await self.db.rollback()
             return None, str(e)
 
+    async def _unique_usernames(self, candidates: List[str]) -> List[str]:
+        """Pick a free username for each candidate, unique among themselves and existing users"""
+        if not candidates:
+            return []
+        result = await self.db.execute(select(User.username).where(User.username.in_(set(candidates))))
+        taken = set(result.scalars())
+        usernames = []
+        for base in candidates:
+            username = base
+            while username in taken:
+                username = f"{base}{secrets.token_hex(2)}"
+            taken.add(username)
+            usernames.append(username)
+        return usernames
+
     async def accept_invitation(self, token: str):
         try:
             async with self.db.begin():
                 # Find the staff record with the given token
                 result = await self.db.execute(
-                    select(Staff).filter_by(invite_token=token)
+                    select(Staff).filter_by(invite_token_hash=hash_token(token))
                 )
                 staff = result.scalar_one_or_none()
 
@@ -263,15 +295,18 @@ class EnterpriseService:
 
                 # Activate the staff and the user
                 staff.is_active = True
-                staff.invite_token = None
+                staff.invite_token_hash = None
                 staff.invite_token_expires_at = None
 
                 user = await self.db.get(User, staff.user_id)
                 if user:
                     user.is_active = True
+                    # New membership, claims in outstanding tokens are stale
+                    user.token_version = (user.token_version or 0) + 1
 
                 await self.db.commit()
 
+            await principal_cache.invalidate(staff.user_id)
             return staff, None
         except Exception as e:
             return None, str(e)
@@ -289,39 +324,71 @@ class EnterpriseService:
         except Exception as e:
             return None, str(e)
             
-    async def has_permission(self, enterprise: Enterprise, user_id: int) -> bool:
+    async def _resolve_access(self, enterprise_id: int, user_id: int) -> Tuple[Optional[Enterprise], bool]:
         """
-        Check if a user has permission to update an enterprise.
+        Load an enterprise and decide whether the user may manage it in one query:
+        ownership, the user's superuser flag and any active staff role come back
+        in the same row. The decision is cached per (user, enterprise).
         """
-        try:
-            # Check if user is a superuser
-            user = await self.db.get(User, user_id)
-            if user and getattr(user, "is_superuser", False):
-                return True
+        result = await self.db.execute(
+            select(Enterprise, User.is_superuser, Staff.role)
+            .select_from(Enterprise)
+            .outerjoin(User, User.id == user_id)
+            .outerjoin(Staff, and_(
+                Staff.enterprise_id == Enterprise.id,
+                Staff.user_id == user_id,
+                Staff.is_active == True,
+            ))
+            .where(Enterprise.id == enterprise_id)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None, False
+        enterprise, is_superuser, role = row
+        # For now, any active staff member can manage branding
+        # In the future, this would be enhanced with role-based permissions
+        allowed = bool(is_superuser) or enterprise.owner_id == user_id or role is not None
+        permission_cache.set((user_id, enterprise_id), allowed)
+        return enterprise, allowed
+
+    async def get_enterprise_for_user(self, enterprise_id: int, user: Principal) -> Tuple[Optional[Enterprise], bool]:
+        """
+        Get an enterprise and whether `user` has permission to manage it.
+        Returns (None, False) if the enterprise does not exist.
+        """
+        if user.claims is None and permission_cache.get((user.id, enterprise_id)) is None:
+            return await self._resolve_access(enterprise_id, user.id)
 
-            # Check if user is the owner
-            if enterprise.owner_id == user_id:
-                return True
-                
-            # Check if user is staff with proper permissions
-            result = await self.db.execute(
-                select(Staff).filter_by(
-                    user_id=user_id,
-                    enterprise_id=enterprise.id,
-                    is_active=True
-                )
+        enterprise = await self.db.get(Enterprise, enterprise_id)
+        if enterprise is None:
+            return None, False
+        return enterprise, await self.has_permission(enterprise, user.id, user.claims)
+
+    async def has_permission(self, enterprise: Enterprise, user_id: int, claims: Optional[AuthorizationClaims] = None) -> bool:
+        """
+        Check if a user has permission to update an enterprise.
+        When the access token carried authorization claims, no queries are made.
+        """
+        return await self.can_manage(enterprise.id, enterprise.owner_id, user_id, claims)
+
+    async def can_manage(self, enterprise_id: int, owner_id: int, user_id: int, claims: Optional[AuthorizationClaims] = None) -> bool:
+        """has_permission for callers that know the enterprise's owner but have not loaded it"""
+        if claims is not None:
+            return (
+                claims.is_superuser
+                or owner_id == user_id
+                or enterprise_id in claims.memberships
             )
-            staff = result.scalar_one_or_none()
-            
-            # For now, any active staff member can update branding
-            # In the future, this would be enhanced with role-based permissions
-            if staff:
-                return True
-                
-            return False
+
+        allowed = permission_cache.get((user_id, enterprise_id))
+        if allowed is not None:
+            return allowed
+        try:
+            _, allowed = await self._resolve_access(enterprise_id, user_id)
+            return allowed
         except Exception:
             return False
-            
+
     async def update_enterprise_branding(
         self, 
         enterprise_id: int, 
@@ -345,6 +412,9 @@ class EnterpriseService:
             
             await self.db.commit()
             await self.db.refresh(enterprise)
+            # Commit dropped the cached branding; refill it from the primary so
+            # a lagging replica cannot put the old version back
+            cache_branding(enterprise)
             
             return enterprise, None
         except Exception as e:
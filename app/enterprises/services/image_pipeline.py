@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import io
+import os
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from app.auth.services.worker_pool import BoundedProcessPool
+from app.enterprises.services.upload_service import UploadService, logo_uploads
+
+load_dotenv()
+
+IMAGE_POOL_SIZE = int(os.getenv("IMAGE_POOL_SIZE", 2))
+IMAGE_QUEUE_DEPTH = int(os.getenv("IMAGE_QUEUE_DEPTH", 16))
+IMAGE_TIMEOUT_SECONDS = float(os.getenv("IMAGE_TIMEOUT_SECONDS", 30))
+# Refuse to decode anything larger; guards against decompression bombs
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+
+# Rendition name -> bounding box. Images are scaled down to fit, never up.
+RENDITIONS = {
+    "thumbnail": (128, 128),
+    "header": (480, 120),
+    "print": (1600, 1600),
+}
+
+# Format -> Pillow save options; AVIF only where this Pillow build supports it
+RENDITION_FORMATS = {"webp": {"quality": 85, "method": 4}}
+if features.check("avif"):
+    RENDITION_FORMATS["avif"] = {"quality": 60}
+
+Renditions = Dict[str, Dict[str, str]]
+
+
+def _render(source: bytes, max_pixels: int = IMAGE_MAX_PIXELS) -> Dict[str, Dict[str, bytes]]:
+    """
+    Decode `source` and encode every rendition. Runs in a worker process.
+    Returns {rendition: {format: encoded bytes}}.
+    """
+    # Pillow itself only raises above twice MAX_IMAGE_PIXELS; below that it just warns
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    encoded: Dict[str, Dict[str, bytes]] = {}
+    with Image.open(io.BytesIO(source)) as image:
+        # open() only reads the header, so this runs before anything is decoded
+        if image.width * image.height > max_pixels:
+            raise Image.DecompressionBombError(
+                f"Image size ({image.width * image.height} pixels) exceeds limit of {max_pixels} pixels"
+            )
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P", "PA") else "RGB")
+        for name, size in RENDITIONS.items():
+            rendition = image.copy()
+            rendition.thumbnail(size, Image.Resampling.LANCZOS)
+            for extension, options in RENDITION_FORMATS.items():
+                buffer = io.BytesIO()
+                rendition.save(buffer, format=extension.upper(), **options)
+                encoded.setdefault(name, {})[extension] = buffer.getvalue()
+    return encoded
+
+
+class ImagePipeline:
+    """Produces resized WebP/AVIF renditions of uploaded logos in a process pool"""
+
+    def __init__(self, pool: BoundedProcessPool, uploads: UploadService):
+        self.pool = pool
+        self.uploads = uploads
+
+    async def create_renditions(self, name: str) -> Optional[Renditions]:
+        """Rendition URLs for an uploaded image blob; None for SVGs, which scale on their own"""
+        if name.endswith(".svg"):
+            return None
+        source = await self.uploads.storage.read(name)
+        try:
+            encoded = await self.pool.run(_render, source)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Could not process image: {e}"
+            )
+
+        # Store under content-addressed names, like the original upload
+        blobs = {
+            (rendition, extension): f"{hashlib.sha256(data).hexdigest()[:32]}.{extension}"
+            for rendition, formats in encoded.items() for extension, data in formats.items()
+        }
+        await asyncio.gather(*(
+            self.uploads.storage.put(blob, encoded[rendition][extension])
+            for (rendition, extension), blob in blobs.items()
+        ))
+        urls: Renditions = {}
+        for (rendition, extension), blob in blobs.items():
+            urls.setdefault(rendition, {})[extension] = self.uploads.url_for(blob)
+        return urls
+
+    def shutdown(self) -> None:
+        self.pool.shutdown()
+
+
+image_pipeline = ImagePipeline(
+    BoundedProcessPool(
+        name="image-processing",
+        max_workers=IMAGE_POOL_SIZE,
+        max_queue=IMAGE_QUEUE_DEPTH,
+        timeout=IMAGE_TIMEOUT_SECONDS,
+    ),
+    logo_uploads,
+)
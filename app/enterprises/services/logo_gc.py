@@ -0,0 +1,55 @@
+import asyncio
+import os
+from typing import Callable, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.database import AsyncSessionLocal
+from app.enterprises.models.enterprises import Enterprise
+from app.enterprises.services.upload_service import UploadService, logo_uploads
+
+load_dotenv()
+
+LOGO_GC_INTERVAL_SECONDS = float(os.getenv("LOGO_GC_INTERVAL_SECONDS", 3600))
+# Blobs younger than this are never collected, so an upload whose branding
+# update has not committed yet is safe
+LOGO_GC_GRACE_SECONDS = float(os.getenv("LOGO_GC_GRACE_SECONDS", 3600))
+
+
+async def referenced_logo_urls(session: AsyncSession) -> Set[str]:
+    result = await session.execute(
+        select(Enterprise.logo_url, Enterprise.logo_renditions)
+        .where(or_(Enterprise.logo_url.is_not(None), Enterprise.logo_renditions.is_not(None)))
+    )
+    urls: Set[str] = set()
+    for logo_url, renditions in result.all():
+        if logo_url:
+            urls.add(logo_url)
+        for formats in (renditions or {}).values():
+            urls.update(formats.values())
+    return urls
+
+
+async def collect_logo_garbage(
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    uploads: UploadService = logo_uploads,
+    grace_seconds: float = LOGO_GC_GRACE_SECONDS,
+) -> int:
+    """Delete logo blobs no enterprise references any more. Returns how many were removed."""
+    # Read from the primary; a lagging replica could miss a new reference
+    async with session_factory() as session:
+        referenced = await referenced_logo_urls(session)
+    return await uploads.collect_garbage(referenced, grace_seconds)
+
+
+async def run_logo_gc(interval: float = LOGO_GC_INTERVAL_SECONDS) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await collect_logo_garbage()
+            if removed:
+                print(f"Logo garbage collection removed {removed} file(s)")
+        except Exception as e:
+            print(f"Logo garbage collection failed: {e}")
@@ -0,0 +1,49 @@
+import os
+from typing import Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.auth.models.users import Staff
+from app.auth.services.cache import TTLCache
+
+load_dotenv()
+
+PERMISSION_CACHE_SIZE = int(os.getenv("PERMISSION_CACHE_SIZE", 50000))
+# Upper bound on how long other workers may act on a revoked membership
+PERMISSION_CACHE_TTL_SECONDS = int(os.getenv("PERMISSION_CACHE_TTL_SECONDS", 30))
+
+# (user_id, enterprise_id) -> may manage the enterprise
+permission_cache: TTLCache[bool] = TTLCache(max_size=PERMISSION_CACHE_SIZE, default_ttl=PERMISSION_CACHE_TTL_SECONDS)
+
+_PENDING_KEY = "permission_cache_invalidations"
+
+
+def invalidate_permission(user_id: int, enterprise_id: int) -> None:
+    permission_cache.pop((user_id, enterprise_id))
+
+
+def _staff_changed(mapper, connection, target: Staff) -> None:
+    key = (target.user_id, target.enterprise_id)
+    invalidate_permission(*key)
+    # Drop it again once committed, in case a concurrent request re-cached the old row
+    session = object_session(target)
+    if session is not None:
+        pending: Set[Tuple[int, int]] = session.info.setdefault(_PENDING_KEY, set())
+        pending.add(key)
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Staff, _event, _staff_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for key in session.info.pop(_PENDING_KEY, ()):
+        invalidate_permission(*key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import time
+from pathlib import PurePosixPath
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile, status
+
+from app.enterprises.services.blob_storage import BlobStorage, logo_storage
+
+load_dotenv()
+
+LOGO_URL_PREFIX = "/logos/"
+LOGO_MAX_BYTES = int(os.getenv("LOGO_MAX_BYTES", 2 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 64 * 1024))
+# Whole request limit for logo uploads: the file plus multipart framing and other form fields
+LOGO_REQUEST_MAX_BYTES = LOGO_MAX_BYTES + 64 * 1024
+
+# Leading bytes of each accepted image format
+IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+]
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Extension for the image format `head` starts with, or None"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if (text.startswith(b"<?xml") or text.startswith(b"<svg")) and b"<svg" in text:
+        return ".svg"
+    return None
+
+
+class UploadService:
+    """
+    Streams uploads into blob storage. The first chunk is sniffed before
+    anything is written and the size limit is enforced while streaming;
+    the blob only becomes visible once it is complete.
+
+    Blobs are named after a hash of their content, so a stored blob never
+    changes and identical uploads share one blob. Nothing is deleted on
+    replacement; collect_garbage removes blobs no longer referenced.
+    """
+
+    def __init__(self, storage: BlobStorage, max_bytes: int, url_prefix: str, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.url_prefix = url_prefix
+        self.chunk_size = chunk_size
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum size is {self.max_bytes // 1024} KiB"
+        )
+
+    async def save(self, upload: UploadFile) -> str:
+        """Store an image upload as `<content hash><ext>`, the extension coming from its content. Returns the blob name."""
+        if upload.size is not None and upload.size > self.max_bytes:
+            raise self._too_large()
+
+        first = await upload.read(self.chunk_size)
+        extension = sniff_image_type(first)
+        if extension is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Invalid file type. Allowed types: PNG, JPEG, GIF, SVG"
+            )
+
+        writer = await self.storage.writer()
+        digest = hashlib.sha256()
+        try:
+            written = 0
+            chunk = first
+            while chunk:
+                written += len(chunk)
+                if written > self.max_bytes:
+                    raise self._too_large()
+                digest.update(chunk)
+                await writer.write(chunk)
+                chunk = await upload.read(self.chunk_size)
+            name = f"{digest.hexdigest()[:32]}{extension}"
+            await writer.commit(name)
+            return name
+        except BaseException:
+            await writer.abort()
+            raise
+
+    def url_for(self, name: str) -> str:
+        return f"{self.url_prefix}{name}"
+
+    def name_for(self, url: str) -> Optional[str]:
+        """Blob behind a URL from url_for; None for anything else"""
+        if not url or not url.startswith(self.url_prefix):
+            return None
+        name = PurePosixPath(url[len(self.url_prefix):]).name
+        return name or None
+
+    async def collect_garbage(self, referenced_urls: Iterable[str], grace_seconds: float) -> int:
+        """
+        Delete blobs no URL in `referenced_urls` points at. Blobs touched in the
+        last `grace_seconds` are kept, so uploads whose database change has not
+        committed yet (and in-progress temp blobs) survive.
+        """
+        keep = {name for name in map(self.name_for, referenced_urls) if name is not None}
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for name, modified in await self.storage.list():
+            if name in keep or modified > cutoff:
+                continue
+            await self.storage.delete(name)
+            removed += 1
+        return removed
+
+
+logo_uploads = UploadService(logo_storage, LOGO_MAX_BYTES, LOGO_URL_PREFIX)
@@ -0,0 +1,5 @@
+from fastapi import APIRouter, Depends
+from app.microservices.token_verifier import get_token_claims
+
+# Every CRM endpoint requires a gateway-issued access token, verified locally
+crm_router = APIRouter(prefix="/crm", tags=["CRM"], dependencies=[Depends(get_token_claims)])
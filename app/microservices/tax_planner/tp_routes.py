@@ -0,0 +1,5 @@
+from fastapi import APIRouter, Depends
+from app.microservices.token_verifier import get_token_claims
+
+# Every tax planner endpoint requires a gateway-issued access token, verified locally
+tp_router = APIRouter(prefix="/tax-planner", tags=["Tax Planner"], dependencies=[Depends(get_token_claims)])
@@ -0,0 +1,126 @@
+'''
+Local access token verification for downstream services (crm, tax_planner).
+
+Public keys are fetched from the gateway's JWKS endpoint and cached, so a
+service verifies each request without calling back into the gateway. Requires
+the gateway to sign with EdDSA or ES256.
+'''
+
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GATEWAY_JWKS_URL = os.getenv("GATEWAY_JWKS_URL", "http://localhost:8000/.well-known/jwks.json")
+JWKS_CACHE_SECONDS = int(os.getenv("JWKS_CACHE_SECONDS", 3600))
+# Least time between refetches triggered by an unknown kid
+JWKS_MIN_REFRESH_SECONDS = int(os.getenv("JWKS_MIN_REFRESH_SECONDS", 30))
+JWKS_HTTP_TIMEOUT_SECONDS = float(os.getenv("JWKS_HTTP_TIMEOUT_SECONDS", 5))
+
+bearer_scheme = HTTPBearer()
+
+
+class JWKSCache:
+    """
+    The gateway's key set, fetched with a shared httpx.AsyncClient so a refresh
+    never blocks the event loop. Refetched when it is older than `lifespan` or
+    a token names an unknown kid (at most once per `min_refresh`), and only
+    one request fetches at a time.
+    """
+
+    def __init__(
+        self,
+        url: str = GATEWAY_JWKS_URL,
+        lifespan: float = JWKS_CACHE_SECONDS,
+        min_refresh: float = JWKS_MIN_REFRESH_SECONDS,
+        timeout: float = JWKS_HTTP_TIMEOUT_SECONDS,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.url = url
+        self.lifespan = lifespan
+        self.min_refresh = min_refresh
+        self.timeout = timeout
+        self._client = client
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout))
+        return self._client
+
+    async def _refresh(self, fetched_at: float) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._fetched_at != fetched_at:
+                # Another request refreshed while this one waited
+                return
+            response = await self.client.get(self.url)
+            response.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(response.json())
+            self._keys = {key.key_id: key for key in key_set.keys if key.key_id}
+            self._fetched_at = time.monotonic()
+
+    async def get_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        fetched_at, age = self._fetched_at, time.monotonic() - self._fetched_at
+        if age >= self.lifespan or (kid not in self._keys and age >= self.min_refresh):
+            try:
+                await self._refresh(fetched_at)
+            except (httpx.HTTPError, ValueError, jwt.PyJWKSetError) as e:
+                # Keep serving the keys we have if the gateway is briefly unreachable
+                print(f"JWKS refresh from {self.url} failed: {e}")
+        if kid not in self._keys:
+            raise jwt.InvalidKeyError(f"Unknown signing key {kid!r}")
+        return self._keys[kid]
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+jwks_cache = JWKSCache()
+
+
+async def verify_access_token(token: str) -> dict:
+    """Verify a gateway-issued access token and return its claims"""
+    try:
+        signing_key = await jwks_cache.get_key(jwt.get_unverified_header(token).get("kid"))
+        payload = jwt.decode(token, signing_key.key, algorithms=["EdDSA", "ES256"])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has expired",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except jwt.PyJWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if payload.get("type") != "access":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token type",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+async def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
+    """Auth dependency for downstream services: the verified access token's claims"""
+    return await verify_access_token(credentials.credentials)
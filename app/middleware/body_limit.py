@@ -0,0 +1,68 @@
+import re
+
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class BodyTooLarge(HTTPException):
+    """Raised from receive(); FastAPI passes HTTPExceptions from body parsing through as-is"""
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request body too large. Maximum size is {max_bytes // 1024} KiB",
+        )
+
+
+class BodySizeLimit:
+    """
+    Caps request bodies on matching paths. Starlette spools a whole multipart
+    body to disk before a handler runs, so a size check in the handler cannot
+    stop a client from sending more. Here a Content-Length over the limit is
+    refused before anything is read, and bodies without one are cut off once
+    they pass it.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, path_pattern: str):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_pattern = re.compile(path_pattern)
+
+    def _too_large(self) -> JSONResponse:
+        error = BodyTooLarge(self.max_bytes)
+        return JSONResponse({"detail": error.detail}, status_code=error.status_code)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.path_pattern.search(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                await self._too_large()(scope, receive, send)
+                return
+
+        received = 0
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise BodyTooLarge(self.max_bytes)
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLarge:
+            if started:
+                raise
+            await self._too_large()(scope, receive, send)
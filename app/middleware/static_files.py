@@ -0,0 +1,74 @@
+import os
+import re
+from pathlib import Path
+from typing import Callable
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, RedirectResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Names produced by content-addressed storage: <32 hex chars>.<ext>
+CONTENT_HASH_NAME = re.compile(r"^([0-9a-f]{32})\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# SVGs can carry script. Served from the API's origin they must never run as a
+# document; <img> tags ignore both headers.
+SVG_HEADERS = {
+    "content-security-policy": "default-src 'none'; style-src 'unsafe-inline'",
+    "content-disposition": "attachment",
+    "x-content-type-options": "nosniff",
+}
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles for content-addressed files. A file named by its content hash
+    never changes, so it is served with a year-long immutable Cache-Control and
+    a strong ETag (the hash itself), and If-None-Match gets a 304. Other files
+    keep Starlette's default handling and must be revalidated.
+    """
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        name = Path(full_path).name
+        match = CONTENT_HASH_NAME.match(name)
+        if match is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers["cache-control"] = "no-cache"
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+            response.headers["etag"] = f'"{match.group(1)}"'
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        if name.lower().endswith(".svg"):
+            response.headers.update(SVG_HEADERS)
+        if match is not None and self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class PresignedRedirect:
+    """
+    Serves GET /<name> by redirecting to a presigned URL from `sign`, for blobs
+    kept in object storage. The redirect itself may be cached for `max_age`,
+    which must stay below the URL's expiry.
+    """
+
+    def __init__(self, sign: Callable[[str], str], max_age: int):
+        self.sign = sign
+        self.max_age = max_age
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = scope["path"].rsplit("/", 1)[-1]
+        if scope["method"] not in ("GET", "HEAD"):
+            response: Response = PlainTextResponse("Method Not Allowed", status_code=405)
+        elif not name or name.startswith("."):
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            response = RedirectResponse(self.sign(name), status_code=307)
+            response.headers["cache-control"] = f"private, max-age={self.max_age}"
+        await response(scope, receive, send)
@@ -5,7 +5,15 @@ Temporal routes to aid development and testing
 from typing import List
 from fastapi import APIRouter
 
+from app.auth.database import replica_router
 from app.auth.models.users import User
+from app.auth.services.password_hasher import password_hasher
+from app.auth.services.email_outbox import outbox_worker
+from app.auth.services.token_service import verified_token_cache
+from app.auth.services.principal_cache import principal_cache
+from app.enterprises.services.branding_cache import branding_cache
+from app.enterprises.services.image_pipeline import image_pipeline
+from app.enterprises.services.permission_cache import permission_cache
 
 
 admin_router = APIRouter(prefix="/dev", tags=["Admin"])
@@ -15,6 +23,14 @@ GET /dev/users/{user_id}
 POST /dev/users/create
 PUT /dev/users/update/{user_id}
 DELETE /dev/users/delete/{user_id}
+GET /dev/metrics/password-hashing
+GET /dev/metrics/token-cache
+GET /dev/metrics/principal-cache
+GET /dev/metrics/permission-cache
+GET /dev/metrics/branding-cache
+GET /dev/metrics/read-replicas
+GET /dev/metrics/email-outbox
+GET /dev/metrics/image-processing
 '''
 
 @admin_router.get("/users/all")
@@ -49,3 +65,35 @@ async def delete_user(user_id: int):
 @admin_router.post("/users/{user_id}/subscription")
 async def update_user_subscription(user_id: int):
     pass
+
+@admin_router.get("/metrics/password-hashing")
+async def get_password_hashing_metrics():
+    return password_hasher.metrics()
+
+@admin_router.get("/metrics/token-cache")
+async def get_token_cache_metrics():
+    return verified_token_cache.stats()
+
+@admin_router.get("/metrics/principal-cache")
+async def get_principal_cache_metrics():
+    return principal_cache.stats()
+
+@admin_router.get("/metrics/permission-cache")
+async def get_permission_cache_metrics():
+    return permission_cache.stats()
+
+@admin_router.get("/metrics/branding-cache")
+async def get_branding_cache_metrics():
+    return branding_cache.stats()
+
+@admin_router.get("/metrics/read-replicas")
+async def get_read_replica_metrics():
+    return replica_router.metrics()
+
+@admin_router.get("/metrics/email-outbox")
+async def get_email_outbox_metrics():
+    return {**outbox_worker.metrics(), "backlog": await outbox_worker.backlog()}
+
+@admin_router.get("/metrics/image-processing")
+async def get_image_processing_metrics():
+    return image_pipeline.pool.metrics()
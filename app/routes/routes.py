@@ -4,6 +4,6 @@ ROUTE REGISTRY
 '''
 
 from ..auth.routes import auth_routes, password_reset_routes
-from ..auth.routes import profile_routes
+from ..auth.routes import profile_routes, jwks_routes
 from ..enterprises.routes import enterprise_routes, branding_routes
 from . import admin_routes
\ No newline at end of file
@@ -0,0 +1,47 @@
+'''
+Startup check that the database schema matches the latest Alembic migration.
+Migrations themselves are applied out of band with `alembic upgrade head`.
+'''
+
+from pathlib import Path
+from typing import Set
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def head_revisions() -> Set[str]:
+    return set(ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_heads())
+
+
+async def current_revisions(engine: AsyncEngine) -> Set[str]:
+    async with engine.connect() as conn:
+        heads = await conn.run_sync(lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads())
+    return set(heads)
+
+
+async def check_schema_version(engine: AsyncEngine, mode: str = "strict") -> None:
+    """
+    Compare the database's alembic_version with the migration heads.
+    mode: "strict" raises SchemaVersionError, "warn" prints, "off" skips.
+    """
+    if mode == "off":
+        return
+    expected, current = head_revisions(), await current_revisions(engine)
+    if current == expected:
+        return
+    message = (
+        f"Database schema is at {sorted(current) or 'no revision'}, expected {sorted(expected)}. "
+        "Run `alembic upgrade head`."
+    )
+    if mode == "strict":
+        raise SchemaVersionError(message)
+    print(f"WARNING: {message}")
@@ -1,18 +1,28 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.routes.routes import *
-from app.auth.database import engine, Base
+from app.auth.database import engine
+from app.config import get_database_settings
+from app.schema_version import check_schema_version
+from app.auth.services.password_hasher import password_hasher
+from app.auth.services.email_outbox import outbox_worker, EMAIL_OUTBOX_WORKER
+from app.auth.services.email_transport import email_transport
+from app.auth.services.revocation_service import check_revocation_store, revocation_index
+from app.auth.services.token_service import key_ring
+from app.enterprises.services.image_pipeline import image_pipeline
+from app.enterprises.services.logo_gc import run_logo_gc
+from app.enterprises.services.blob_storage import logo_storage
+from app.enterprises.services.upload_service import LOGO_REQUEST_MAX_BYTES
+from app.middleware.body_limit import BodySizeLimit
+import asyncio
 
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-LOGOS_DIR = Path("uploads/logos")
-LOGOS_DIR.mkdir(parents=True, exist_ok=True)
 
 app = FastAPI(title="XenToba Gateway & User Management System", 
               version="0.1.0", 
-              summary="XenToba GMS. Note: DB is not persistent at the moment.", 
+              summary="XenToba GMS.", 
               root_path="/api/v1")
 
 # Include routers
@@ -22,17 +32,47 @@ app.include_router(profile_routes.profile_router)
 app.include_router(enterprise_routes.enterprise_router)
 app.include_router(branding_routes.branding_router)
 app.include_router(admin_routes.admin_router)
+app.include_router(jwks_routes.jwks_router)
+
+# Refuse oversized logo uploads before Starlette spools the form to disk
+app.add_middleware(BodySizeLimit, max_bytes=LOGO_REQUEST_MAX_BYTES, path_pattern=r"/enterprises/\d+/branding(/logo)?$")
 
 # sync tables
-# Mount the uploads directory to make logos accessible
-app.mount("/logos", StaticFiles(directory="uploads/logos"), name="logos")
+# Serve logos from blob storage: from disk with year-long caching, or by redirect to presigned S3 URLs
+app.mount("/logos", logo_storage.asgi_app(), name="logos")
 
 @app.on_event("startup")
 async def startup_event():
-    # Create database tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
+    # Schema changes are applied with `alembic upgrade head`, not at startup
+    await check_schema_version(engine, get_database_settings().db_schema_check)
+
+    # Refresh token reuse is only caught if every worker shares the revocation store
+    check_revocation_store(revocation_index)
+
+    # Scheduled signing key rotation
+    if key_ring is not None:
+        app.state.key_rotation_task = asyncio.create_task(key_ring.run_rotation())
+
+    # Remove logo files that no enterprise references any more
+    app.state.logo_gc_task = asyncio.create_task(run_logo_gc())
+
+    # Deliver queued emails; disable with EMAIL_OUTBOX_WORKER=false to run it elsewhere
+    if EMAIL_OUTBOX_WORKER:
+        outbox_worker.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop the background loops first so none is mid-job when the pools go away
+    tasks = [getattr(app.state, name, None) for name in ("key_rotation_task", "logo_gc_task")]
+    tasks = [task for task in tasks if task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    await outbox_worker.stop()
+    await email_transport.aclose()
+    password_hasher.shutdown()
+    image_pipeline.shutdown()
 
 @app.get("/")
 def index():
@@ -0,0 +1,81 @@
+"""hashed tokens and membership indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 02:02:13.745987
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _hash_existing(table: str, plain: str, hashed: str) -> None:
+    """Carry outstanding tokens over so links already emailed keep working"""
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(f"SELECT id, {plain} FROM {table} WHERE {plain} IS NOT NULL")).all()
+    for row_id, token in rows:
+        conn.execute(
+            sa.text(f"UPDATE {table} SET {hashed} = :digest WHERE id = :id"),
+            {"digest": hashlib.sha256(token.encode()).hexdigest(), "id": row_id},
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('verification_token_hash', sa.String(length=64), nullable=True))
+    with op.batch_alter_table('staff', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('invite_token_hash', sa.String(length=64), nullable=True))
+
+    _hash_existing('users', 'verification_token', 'verification_token_hash')
+    _hash_existing('staff', 'invite_token', 'invite_token_hash')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_verification_token_hash'), ['verification_token_hash'], unique=True)
+        batch_op.drop_column('verification_token')
+
+    with op.batch_alter_table('staff', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_staff_user_id'))
+        batch_op.create_index(batch_op.f('ix_staff_invite_token_hash'), ['invite_token_hash'], unique=True)
+        batch_op.create_index('ix_staff_user_enterprise_active', ['user_id', 'enterprise_id', 'is_active'], unique=False)
+        batch_op.drop_column('invite_token')
+
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_clients_user_id'))
+        batch_op.create_index('ix_clients_user_enterprise_active', ['user_id', 'enterprise_id', 'is_active'], unique=False)
+
+    with op.batch_alter_table('enterprises', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_enterprises_owner_id'), ['owner_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema. Outstanding verification and invitation tokens are lost."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('verification_token', sa.VARCHAR(), nullable=True))
+        batch_op.drop_index(batch_op.f('ix_users_verification_token_hash'))
+        batch_op.drop_column('verification_token_hash')
+
+    with op.batch_alter_table('staff', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('invite_token', sa.VARCHAR(), nullable=True))
+        batch_op.drop_index('ix_staff_user_enterprise_active')
+        batch_op.drop_index(batch_op.f('ix_staff_invite_token_hash'))
+        batch_op.create_index(batch_op.f('ix_staff_user_id'), ['user_id'], unique=False)
+        batch_op.drop_column('invite_token_hash')
+
+    with op.batch_alter_table('enterprises', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_enterprises_owner_id'))
+
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.drop_index('ix_clients_user_enterprise_active')
+        batch_op.create_index(batch_op.f('ix_clients_user_id'), ['user_id'], unique=False)
+
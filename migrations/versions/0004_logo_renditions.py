@@ -0,0 +1,30 @@
+"""logo renditions
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 02:17:32.230066
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('enterprises', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('logo_renditions', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('enterprises', schema=None) as batch_op:
+        batch_op.drop_column('logo_renditions')
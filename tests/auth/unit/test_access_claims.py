@@ -0,0 +1,92 @@
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.database import Base
+from app.auth.models.users import Staff, StaffRole, User
+from app.auth.services import token_service
+from app.auth.services.principal_cache import principal_cache
+from app.auth.services.token_service import TokenService
+from app.enterprises.models.enterprises import Enterprise, EnterpriseType
+from app.enterprises.services.enterprise_service import EnterpriseService
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def member(session):
+    owner = User(email="owner@example.com", username="owner", password_hash="x")
+    staff_user = User(email="staff@example.com", username="staff", password_hash="x")
+    session.add_all([owner, staff_user])
+    await session.flush()
+    enterprise = Enterprise(
+        owner_id=owner.id, name="Acme", email="acme@example.com", type=EnterpriseType.BUSINESS,
+        default_tax_year=2025, country="NG", city="Lagos",
+    )
+    session.add(enterprise)
+    await session.flush()
+    session.add(Staff(user_id=staff_user.id, enterprise_id=enterprise.id, role=StaffRole.CPA, is_active=True))
+    await session.commit()
+    await principal_cache.invalidate(staff_user.id)
+    return staff_user, enterprise
+
+
+def bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.mark.asyncio
+async def test_minimal_profile_has_no_claims(session, member, monkeypatch):
+    monkeypatch.setattr(token_service, "ACCESS_TOKEN_PROFILE", "minimal")
+    user, _ = member
+    assert await TokenService.build_access_claims(session, user) is None
+
+
+@pytest.mark.asyncio
+async def test_claims_token_authorizes_without_queries(session, member, monkeypatch):
+    monkeypatch.setattr(token_service, "ACCESS_TOKEN_PROFILE", "claims")
+    user, enterprise = member
+    tokens = await TokenService.issue_tokens_for_user(session, user)
+
+    payload = TokenService.verify_token(tokens["access_token"])
+    assert payload["ent"] == {str(enterprise.id): "cpa"}
+    assert payload["su"] is False
+
+    principal = await TokenService.get_current_user(bearer(tokens["access_token"]), session)
+    assert principal.claims is not None
+    assert principal.claims.memberships == {enterprise.id: "cpa"}
+
+    # No session: any query would fail
+    service = EnterpriseService(None)  # type: ignore
+    assert await service.has_permission(enterprise, user.id, principal.claims)
+    other = Enterprise(id=enterprise.id + 1, owner_id=enterprise.owner_id)
+    assert not await service.has_permission(other, user.id, principal.claims)
+
+
+@pytest.mark.asyncio
+async def test_bumping_token_version_forces_refresh(session, member, monkeypatch):
+    monkeypatch.setattr(token_service, "ACCESS_TOKEN_PROFILE", "claims")
+    user, _ = member
+    tokens = await TokenService.issue_tokens_for_user(session, user)
+    await TokenService.get_current_user(bearer(tokens["access_token"]), session)
+
+    user.token_version += 1
+    await session.commit()
+    await principal_cache.invalidate(user.id)
+
+    with pytest.raises(HTTPException) as exc:
+        await TokenService.get_current_user(bearer(tokens["access_token"]), session)
+    assert exc.value.status_code == 401
+
+    fresh = await TokenService.issue_tokens_for_user(session, user)
+    principal = await TokenService.get_current_user(bearer(fresh["access_token"]), session)
+    assert principal.token_version == user.token_version
@@ -0,0 +1,151 @@
+import io
+from datetime import datetime, timezone
+import pytest
+from botocore.exceptions import ClientError
+from httpx import ASGITransport, AsyncClient
+from app.enterprises.services.blob_storage import LocalBlobStorage, S3BlobStorage
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 S3 client calls the storage uses"""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+
+    def _record(self, name, **kwargs):
+        self.calls.append((name, kwargs.get("Key")))
+
+    def put_object(self, Bucket, Key, Body, **meta):
+        self._record("put_object", Key=Key)
+        self.objects[Key] = {"Body": bytes(Body), "LastModified": datetime.now(timezone.utc), **meta}
+        return {}
+
+    def head_object(self, Bucket, Key):
+        self._record("head_object", Key=Key)
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key]["Body"])}
+
+    def delete_object(self, Bucket, Key):
+        self._record("delete_object", Key=Key)
+        self.objects.pop(Key, None)
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective, **meta):
+        self._record("copy_object", Key=Key)
+        body = self.objects[CopySource["Key"]]["Body"]
+        self.objects[Key] = {"Body": body, "LastModified": datetime.now(timezone.utc), **meta}
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._record("upload_part", Key=Key)
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        body = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+        self.objects[Key] = {"Body": body, "LastModified": datetime.now(timezone.utc)}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+
+    def get_paginator(self, operation):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                yield {"Contents": [
+                    {"Key": key, "LastModified": obj["LastModified"]}
+                    for key, obj in client.objects.items() if key.startswith(Prefix)
+                ]}
+        return Paginator()
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://bucket.example.com/{Params['Key']}?expires={ExpiresIn}"
+
+
+def s3_storage(**kwargs):
+    return S3BlobStorage("logos-bucket", prefix="logos", client=FakeS3(), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_s3_small_blobs_are_a_single_put():
+    storage = s3_storage()
+    await storage.put("abc.png", b"png")
+    stored = storage.client.objects["logos/abc.png"]
+    assert stored["Body"] == b"png"
+    assert stored["ContentType"] == "image/png" and "immutable" in stored["CacheControl"]
+    assert [call for call, _ in storage.client.calls] == ["head_object", "put_object"]
+    assert await storage.read("abc.png") == b"png"
+
+
+@pytest.mark.asyncio
+async def test_s3_large_blobs_stream_as_multipart_upload():
+    storage = s3_storage(part_size=4)
+    writer = await storage.writer()
+    for chunk in [b"ab", b"cdef", b"ghij"]:
+        await writer.write(chunk)
+    # Parts go out while streaming, not at commit
+    assert [call for call, _ in storage.client.calls] == ["upload_part", "upload_part"]
+    await writer.commit("big.png")
+
+    assert storage.client.objects["logos/big.png"]["Body"] == b"abcdefghij"
+    # The temporary key is gone once the blob has its final name
+    assert list(storage.client.objects) == ["logos/big.png"]
+    assert [name for name, _ in await storage.list()] == ["big.png"]
+
+
+@pytest.mark.asyncio
+async def test_s3_existing_blob_is_kept_and_touched():
+    storage = s3_storage(part_size=4)
+    await storage.put("same.png", b"0123456789")
+    storage.client.objects["logos/same.png"]["LastModified"] = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    await storage.put("same.png", b"0123456789")
+    assert not storage.client.uploads
+    assert list(storage.client.objects) == ["logos/same.png"]
+    [(_, modified)] = await storage.list()
+    assert modified > datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.mark.asyncio
+async def test_s3_abort_cancels_the_multipart_upload():
+    storage = s3_storage(part_size=4)
+    writer = await storage.writer()
+    await writer.write(b"0123456789")
+    assert storage.client.uploads
+    await writer.abort()
+    assert not storage.client.uploads and not storage.client.objects
+
+
+@pytest.mark.asyncio
+async def test_s3_reads_redirect_to_presigned_urls():
+    storage = s3_storage(presign_expires=600)
+    transport = ASGITransport(app=storage.asgi_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/abc.png")
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://bucket.example.com/logos/abc.png?expires=600"
+        assert response.headers["cache-control"] == "private, max-age=300"
+
+        assert (await client.get("/.upload-123")).status_code == 404
+        assert (await client.post("/abc.png")).status_code == 405
+
+
+@pytest.mark.asyncio
+async def test_local_abort_leaves_nothing_behind(tmp_path):
+    storage = LocalBlobStorage(tmp_path)
+    writer = await storage.writer()
+    await writer.write(b"partial")
+    await writer.abort()
+    assert list(tmp_path.iterdir()) == []
+    assert await storage.list() == []
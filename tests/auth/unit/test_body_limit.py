@@ -0,0 +1,49 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from httpx import ASGITransport, AsyncClient
+from app.middleware.body_limit import BodySizeLimit
+
+
+def make_app(seen):
+    app = FastAPI()
+
+    @app.post("/enterprises/{enterprise_id}/branding/logo")
+    async def upload(enterprise_id: int, logo: UploadFile = File(...)):
+        seen.append(logo.filename)
+        return {"size": len(await logo.read())}
+
+    @app.post("/other")
+    async def other(logo: UploadFile = File(...)):
+        return {"size": len(await logo.read())}
+
+    app.add_middleware(BodySizeLimit, max_bytes=1024, path_pattern=r"/enterprises/\d+/branding(/logo)?$")
+    return app
+
+
+@pytest.mark.asyncio
+async def test_oversized_uploads_are_refused_before_the_handler():
+    seen = []
+    transport = ASGITransport(app=make_app(seen))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        small = await client.post("/enterprises/1/branding/logo", files={"logo": ("a.png", b"x" * 100)})
+        assert small.status_code == 200 and small.json() == {"size": 100}
+
+        big = await client.post("/enterprises/1/branding/logo", files={"logo": ("b.png", b"x" * 4096)})
+        assert big.status_code == 413
+        assert seen == ["a.png"]
+
+        # Bodies without a Content-Length are cut off while streaming
+        async def chunks():
+            yield b'--abc\r\nContent-Disposition: form-data; name="logo"; filename="d.png"\r\n\r\n'
+            for _ in range(8):
+                yield b"x" * 512
+            yield b"\r\n--abc--\r\n"
+        streamed = await client.post(
+            "/enterprises/1/branding/logo", content=chunks(),
+            headers={"content-type": "multipart/form-data; boundary=abc"},
+        )
+        assert streamed.status_code == 413
+
+        # Other routes are not limited
+        other = await client.post("/other", files={"logo": ("c.png", b"x" * 4096)})
+        assert other.status_code == 200
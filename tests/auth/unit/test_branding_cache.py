@@ -0,0 +1,113 @@
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.database import Base, get_db, get_read_db
+from app.auth.models.users import User
+from app.auth.services.principal_cache import Principal
+from app.auth.services.token_service import TokenService
+from app.enterprises.models.enterprises import Enterprise, EnterpriseType
+from app.enterprises.routes.branding_routes import branding_router
+from app.enterprises.services.branding_cache import branding_cache, etag_matches
+from app.enterprises.services.enterprise_service import EnterpriseService
+from app.enterprises.services.permission_cache import permission_cache
+
+
+@pytest_asyncio.fixture
+async def setup():
+    branding_cache.clear()
+    permission_cache.clear()
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        owner = User(email="owner@example.com", username="owner", password_hash="x")
+        outsider = User(email="outsider@example.com", username="outsider", password_hash="x")
+        session.add_all([owner, outsider])
+        await session.flush()
+        enterprise = Enterprise(
+            owner_id=owner.id, name="Acme", email="acme@example.com", type=EnterpriseType.BUSINESS,
+            default_tax_year=2025, country="NG", city="Lagos", primary_color="#112233",
+        )
+        session.add(enterprise)
+        await session.commit()
+        principals = {"owner": Principal.from_user(owner), "outsider": Principal.from_user(outsider)}
+
+    async def db():
+        async with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(branding_router)
+    app.dependency_overrides[get_db] = db
+    app.dependency_overrides[get_read_db] = db
+    current = {"user": principals["owner"]}
+    app.dependency_overrides[TokenService.get_current_user] = lambda: current["user"]
+    statements.clear()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client, session_factory, enterprise, principals, current, statements
+    await engine.dispose()
+    branding_cache.clear()
+    permission_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_branding_is_a_cache_read_and_a_304(setup):
+    client, _, enterprise, _, _, statements = setup
+    url = f"/enterprises/{enterprise.id}/branding"
+
+    first = await client.get(url)
+    assert first.status_code == 200 and first.json()["primary_color"] == "#112233"
+    etag = first.headers["etag"]
+    queries = len(statements)
+
+    again = await client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    # Branding and the owner's permission both came from cache
+    assert len(statements) == queries
+
+    plain = await client.get(url)
+    assert plain.status_code == 200 and plain.headers["etag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_branding_update_changes_the_etag(setup):
+    client, session_factory, enterprise, _, _, _ = setup
+    url = f"/enterprises/{enterprise.id}/branding"
+    etag = (await client.get(url)).headers["etag"]
+
+    async with session_factory() as session:
+        _, error = await EnterpriseService(session).update_enterprise_branding(enterprise.id, {"primary_color": "#445566"})
+    assert error is None
+
+    changed = await client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["primary_color"] == "#445566"
+    assert changed.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_cached_branding_still_checks_permission(setup):
+    client, _, enterprise, principals, current, _ = setup
+    url = f"/enterprises/{enterprise.id}/branding"
+    etag = (await client.get(url)).headers["etag"]
+
+    current["user"] = principals["outsider"]
+    denied = await client.get(url, headers={"If-None-Match": etag})
+    assert denied.status_code == 403
+    assert (await client.get("/enterprises/9999/branding")).status_code == 404
+
+
+def test_etag_matching():
+    assert etag_matches('"1-2", "1-3"', '"1-3"')
+    assert etag_matches('W/"1-3"', '"1-3"')
+    assert etag_matches("*", '"1-3"')
+    assert not etag_matches(None, '"1-3"')
+    assert not etag_matches('"1-2"', '"1-3"')
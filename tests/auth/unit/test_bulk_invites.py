@@ -0,0 +1,84 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.database import Base
+from app.auth.models.email_outbox import EmailOutbox
+from app.auth.models.users import Staff, StaffRole, User
+from app.auth.services.principal_cache import Principal
+from app.enterprises.models.enterprises import Enterprise, EnterpriseType
+from app.enterprises.schemas.staff_schemas import StaffInvitationItem
+from app.enterprises.services.enterprise_service import EnterpriseService
+
+
+class FakeHasher:
+    def __init__(self):
+        self.hashed = []
+
+    async def get_password_hash(self, password):
+        self.hashed.append(password)
+        return f"hashed:{password}"
+
+
+@pytest_asyncio.fixture
+async def setup():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        owner = User(email="owner@example.com", username="owner", password_hash="x", first_name="O", last_name="W")
+        member = User(email="member@example.com", username="member", password_hash="x")
+        outsider = User(email="outsider@example.com", username="outsider", password_hash="x")
+        squatter = User(email="someone@else.com", username="new1", password_hash="x")
+        session.add_all([owner, member, outsider, squatter])
+        await session.flush()
+        enterprise = Enterprise(
+            owner_id=owner.id, name="Acme", email="acme@example.com", type=EnterpriseType.BUSINESS,
+            default_tax_year=2025, country="NG", city="Lagos",
+        )
+        session.add(enterprise)
+        await session.flush()
+        session.add(Staff(user_id=member.id, enterprise_id=enterprise.id, role=StaffRole.CPA, is_active=True))
+        await session.commit()
+        statements.clear()
+        yield session, Principal.from_user(owner), enterprise, statements
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_bulk_invite_resolves_users_in_bulk_and_reports_per_email(setup):
+    session, owner, enterprise, statements = setup
+    hasher = FakeHasher()
+    invitations = [StaffInvitationItem(email=email, role=StaffRole.ASSISTANT) for email in [
+        "owner@example.com", "member@example.com", "outsider@example.com",
+        "new1@example.com", "new1@other.com", "new2@example.com", "new2@example.com",
+    ]]
+
+    result, error = await EnterpriseService(session).invite_multiple_teammates(enterprise.id, owner, invitations, hasher)
+    # Users + memberships, then usernames; nothing per email
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 2
+
+    assert error is None
+    assert {f["email"]: f["reason"] for f in result["failed"]} == {
+        "owner@example.com": "Cannot invite yourself",
+        "member@example.com": "User is already a member of this enterprise",
+        "new2@example.com": "Duplicate email in request",
+    }
+    assert len(result["successful"]) == 4
+    # OTPs only for the three new accounts
+    assert len(hasher.hashed) == 3
+
+    usernames = (await session.execute(select(User.username).where(User.email.like("new%")))).scalars().all()
+    assert len(set(usernames)) == 3 and "new1" not in usernames
+    staff = (await session.execute(select(Staff).where(Staff.enterprise_id == enterprise.id))).scalars().all()
+    assert len(staff) == 5
+
+    # Invitation emails are committed to the outbox with the memberships
+    outbox = (await session.execute(select(EmailOutbox))).scalars().all()
+    assert {row.template for row in outbox} == {"teammate_invitation"}
+    sent = {row.to_email: row.context["otp"] for row in outbox}
+    assert set(sent) == {"outsider@example.com", "new1@example.com", "new1@other.com", "new2@example.com"}
+    assert sent["outsider@example.com"] is None
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from app.auth.database import create_engine_from_settings, normalize_database_url
+from app.config import DatabaseSettings
+
+
+def test_plain_urls_use_async_drivers():
+    assert normalize_database_url("postgres://u:p@db/app").drivername == "postgresql+asyncpg"
+    assert normalize_database_url("postgresql://u:p@db/app").drivername == "postgresql+asyncpg"
+    assert normalize_database_url("sqlite:///./auth.db").drivername == "sqlite+aiosqlite"
+
+
+def test_postgres_engine_is_pooled_with_statement_cache():
+    settings = DatabaseSettings(db_pool_size=7, db_statement_timeout_ms=5000)
+    engine = create_engine_from_settings(settings, "postgresql://u:p@localhost/app")
+    assert isinstance(engine.pool, AsyncAdaptedQueuePool)
+    assert engine.pool.size() == 7
+    assert engine.url.query["prepared_statement_cache_size"] == "256"
+    assert engine.echo is False
+
+
+@pytest.mark.asyncio
+async def test_sqlite_file_engine_applies_pragmas(tmp_path):
+    settings = DatabaseSettings(sqlite_mmap_size=1024 * 1024)
+    engine = create_engine_from_settings(settings, f"sqlite:///{tmp_path / 'test.db'}")
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1
+        assert (await conn.execute(text("PRAGMA mmap_size"))).scalar() == 1024 * 1024
+    await engine.dispose()
+
+
+def test_memory_sqlite_skips_pool_options():
+    engine = create_engine_from_settings(DatabaseSettings(), "sqlite+aiosqlite://")
+    assert isinstance(engine.pool, StaticPool)
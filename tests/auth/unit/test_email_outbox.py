@@ -0,0 +1,142 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.database import Base
+from app.auth.models.email_outbox import EmailOutbox, OutboxStatus
+from app.auth.services.email_outbox import OutboxWorker, enqueue_email
+from app.auth.services.email_service import EmailService
+from app.auth.services.email_transport import EmailDeliveryError, InMemoryTransport
+
+
+class FailingTransport(InMemoryTransport):
+    def __init__(self, retryable):
+        super().__init__()
+        self.retryable = retryable
+
+    async def send(self, message):
+        raise EmailDeliveryError("provider down", self.retryable)
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def rows(session_factory):
+    async with session_factory() as session:
+        return (await session.execute(select(EmailOutbox))).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_emails_are_sent_only_after_commit(session_factory):
+    transport = InMemoryTransport()
+    worker = OutboxWorker(session_factory, EmailService(transport))
+    async with session_factory() as session:
+        await enqueue_email(session, "login_code", "a@example.com", otp_code="111111")
+        await session.rollback()
+        await enqueue_email(session, "login_code", "b@example.com", otp_code="222222")
+        await session.commit()
+
+    assert await worker.drain_once() == 1
+    [sent] = transport.outbox
+    assert sent.to_email == "b@example.com" and "222222" in sent.html_content
+    [row] = await rows(session_factory)
+    assert row.status == OutboxStatus.SENT and row.context == {}
+    assert await worker.drain_once() == 0
+
+
+@pytest.mark.asyncio
+async def test_dedup_key_drops_repeats(session_factory):
+    async with session_factory() as session:
+        for _ in range(2):
+            await enqueue_email(session, "welcome", "a@example.com", dedup_key="welcome:1")
+            await session.commit()
+    assert len(await rows(session_factory)) == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_back_off_then_dead_letter(session_factory):
+    worker = OutboxWorker(session_factory, EmailService(FailingTransport(retryable=True)), max_attempts=2, backoff=60)
+    async with session_factory() as session:
+        await enqueue_email(session, "welcome", "a@example.com")
+        await session.commit()
+
+    assert await worker.drain_once() == 1
+    [row] = await rows(session_factory)
+    assert row.status == OutboxStatus.PENDING and row.attempts == 1
+    assert row.next_attempt_at > datetime.utcnow()
+    # Not due yet
+    assert await worker.drain_once() == 0
+
+    async with session_factory() as session:
+        (await session.get(EmailOutbox, row.id)).next_attempt_at = datetime.utcnow()
+        await session.commit()
+    assert await worker.drain_once() == 1
+    [row] = await rows(session_factory)
+    assert row.status == OutboxStatus.DEAD and row.attempts == 2
+    assert worker.metrics()["dead"] == 1
+
+
+@pytest.mark.asyncio
+async def test_permanent_errors_dead_letter_immediately(session_factory):
+    worker = OutboxWorker(session_factory, EmailService(FailingTransport(retryable=False)))
+    async with session_factory() as session:
+        await enqueue_email(session, "welcome", "a@example.com")
+        await session.commit()
+
+    await worker.drain_once()
+    [row] = await rows(session_factory)
+    assert row.status == OutboxStatus.DEAD and row.last_error == "provider down"
+
+
+@pytest.mark.asyncio
+async def test_dead_letters_do_not_keep_one_time_codes(session_factory):
+    worker = OutboxWorker(session_factory, EmailService(FailingTransport(retryable=False)))
+    async with session_factory() as session:
+        await enqueue_email(session, "login_code", "a@example.com", otp_code="123456")
+        await session.commit()
+
+    await worker.drain_once()
+    [row] = await rows(session_factory)
+    assert row.status == OutboxStatus.DEAD and row.context == {}
+
+
+@pytest.mark.asyncio
+async def test_expired_codes_are_dropped_unsent(session_factory):
+    transport = InMemoryTransport()
+    worker = OutboxWorker(session_factory, EmailService(transport))
+    async with session_factory() as session:
+        await enqueue_email(session, "login_code", "old@example.com",
+                            expires_at=datetime.utcnow() - timedelta(seconds=1), otp_code="111111")
+        await enqueue_email(session, "login_code", "new@example.com",
+                            expires_at=datetime.utcnow() + timedelta(minutes=10), otp_code="222222")
+        await session.commit()
+
+    assert await worker.drain_once() == 1
+    assert [message.to_email for message in transport.outbox] == ["new@example.com"]
+    expired = next(row for row in await rows(session_factory) if row.to_email == "old@example.com")
+    assert expired.status == OutboxStatus.DEAD and expired.context == {}
+    assert worker.metrics()["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_same_template_rows_share_a_provider_call(session_factory):
+    transport = InMemoryTransport()
+    worker = OutboxWorker(session_factory, EmailService(transport))
+    async with session_factory() as session:
+        for i in range(3):
+            await enqueue_email(session, "verification", f"u{i}@example.com", verification_link=f"https://x/{i}")
+        await enqueue_email(session, "welcome", "w@example.com")
+        await session.commit()
+
+    assert await worker.drain_once() == 4
+    [batch] = transport.batches
+    assert [r.to_email for r in batch.recipients] == ["u0@example.com", "u1@example.com", "u2@example.com"]
+    assert {message.to_email for message in transport.outbox} == {"u0@example.com", "u1@example.com", "u2@example.com", "w@example.com"}
+    assert all(row.status == OutboxStatus.SENT for row in await rows(session_factory))
@@ -0,0 +1,48 @@
+import pytest
+from app.auth.services.email_service import EmailService
+from app.auth.services.email_templates import Branding, EmailTemplateRegistry, email_templates
+from app.auth.services.email_transport import InMemoryTransport
+
+
+def test_every_email_template_is_registered():
+    assert set(email_templates.templates) == set(EmailService.SUBJECTS) == set(EmailService.RECIPIENT_FIELDS)
+
+
+def test_templates_are_compiled_once(monkeypatch):
+    registry = EmailTemplateRegistry()
+
+    def no_reload(*args):
+        raise AssertionError("template source loaded at render time")
+
+    monkeypatch.setattr(registry.env.loader, "get_source", no_reload)
+    registry.render("welcome")
+    registry.render("login_code", Branding(name="Acme"), otp_code="123456")
+
+
+def test_context_is_autoescaped():
+    html = email_templates.render("login_code", otp_code="<script>alert(1)</script>")
+    assert "<script>" not in html and "&lt;script&gt;" in html
+
+
+def test_missing_context_fails_loudly():
+    with pytest.raises(Exception):
+        email_templates.render("verification")
+
+
+def test_branding_rejects_unsafe_values():
+    branding = Branding(name="Acme", logo_url="/logos/acme.png", primary_color="red; background:url(x)", accent_color="#0f766e")
+    assert branding.primary_color == "#1f2937"
+    assert branding.accent_color == "#0f766e"
+    assert branding.logo_url.startswith("http") and branding.logo_url.endswith("/logos/acme.png")
+
+
+@pytest.mark.asyncio
+async def test_invitation_uses_enterprise_branding():
+    transport = InMemoryTransport()
+    branding = Branding(name="Acme", primary_color="#0f766e", footer_text="Acme Ltd, Lagos").as_dict()
+    await EmailService(transport).send_teammate_invitation_mail(
+        "a@example.com", "Ada", "Acme", "https://example.com/join", otp=None, branding=branding
+    )
+    [sent] = transport.outbox
+    assert "#0f766e" in sent.html_content and "Acme Ltd, Lagos" in sent.html_content
+    assert "one-time password" not in sent.html_content
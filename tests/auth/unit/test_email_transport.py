@@ -0,0 +1,113 @@
+import json
+import httpx
+import pytest
+from app.auth.services.email_service import EmailService
+from app.auth.services.email_transport import (
+    EmailDeliveryError,
+    EmailMessage,
+    FileTransport,
+    InMemoryTransport,
+    SendGridTransport,
+)
+
+MESSAGE = EmailMessage(to_email="a@example.com", subject="Hi", html_content="<p>Hi</p>", from_email="noreply@example.com")
+
+
+def sendgrid_with(statuses):
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        return httpx.Response(statuses[min(len(calls), len(statuses)) - 1])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return SendGridTransport("key", retries=2, backoff=0, client=client), calls
+
+
+@pytest.mark.asyncio
+async def test_sendgrid_retries_transient_failures():
+    transport, calls = sendgrid_with([503, 429, 202])
+    await transport.send(MESSAGE)
+    assert len(calls) == 3
+    assert calls[0]["personalizations"] == [{"to": [{"email": "a@example.com"}]}]
+    await transport.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sendgrid_does_not_retry_client_errors():
+    transport, calls = sendgrid_with([400])
+    with pytest.raises(EmailDeliveryError) as exc:
+        await transport.send(MESSAGE)
+    assert not exc.value.retryable
+    assert len(calls) == 1
+    await transport.aclose()
+
+
+@pytest.mark.asyncio
+async def test_file_transport_writes_messages(tmp_path):
+    await FileTransport(tmp_path).send(MESSAGE)
+    [written] = list(tmp_path.iterdir())
+    assert json.loads(written.read_text())["to_email"] == "a@example.com"
+
+
+@pytest.mark.asyncio
+async def test_login_code_email_is_sent():
+    transport = InMemoryTransport()
+    await EmailService(transport).send_login_code_email("a@example.com", "123456")
+    [sent] = transport.outbox
+    assert sent.to_email == "a@example.com" and "123456" in sent.html_content
+
+
+def invitations(count, otp=None):
+    return [
+        (f"user{i}@example.com", {
+            "inviter_name": "Ada", "enterprise_name": "Acme & Co",
+            "invitation_link": f"https://example.com/join?token={i}&x=1", "otp": otp, "branding": None,
+        })
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sendgrid_sends_a_batch_in_one_call():
+    transport, calls = sendgrid_with([202])
+    results = await EmailService(transport).send_many("teammate_invitation", invitations(3))
+    assert results == [None, None, None]
+    [call] = calls
+    assert [p["to"][0]["email"] for p in call["personalizations"]] == [f"user{i}@example.com" for i in range(3)]
+    assert call["personalizations"][1]["substitutions"] == {"%invitation_link%": "https://example.com/join?token=1&amp;x=1"}
+    assert "%invitation_link%" in call["content"][0]["value"]
+    await transport.aclose()
+
+
+@pytest.mark.asyncio
+async def test_batches_respect_the_provider_limit_and_differing_content():
+    transport = InMemoryTransport()
+    transport.max_batch_size = 2
+    messages = invitations(5) + invitations(2, otp="a1b2")
+    results = await EmailService(transport).send_many("teammate_invitation", messages)
+    assert results == [None] * 7
+    assert [len(batch.recipients) for batch in transport.batches] == [2, 2, 2]
+    # The fifth invitation without an OTP is sent on its own
+    assert len(transport.outbox) == 7
+    personalized = {message.to_email: message.html_content for message in transport.outbox}
+    assert 'href="https://example.com/join?token=3&amp;x=1"' in personalized["user3@example.com"]
+    assert "a1b2" in personalized["user1@example.com"] and "%otp%" not in personalized["user1@example.com"]
+
+
+class FlakyTransport(InMemoryTransport):
+    """Fails the third message it is asked to send"""
+
+    async def send(self, message):
+        if len(self.outbox) == 2 and not getattr(self, "failed", False):
+            self.failed = True
+            raise EmailDeliveryError("mailbox unavailable", retryable=True)
+        await super().send(message)
+
+
+@pytest.mark.asyncio
+async def test_one_failure_in_a_looped_batch_fails_only_that_message():
+    transport = FlakyTransport()
+    results = await EmailService(transport).send_many("teammate_invitation", invitations(4))
+    assert [result is None for result in results] == [True, True, False, True]
+    assert [message.to_email for message in transport.outbox] == ["user0@example.com", "user1@example.com", "user3@example.com"]
@@ -0,0 +1,71 @@
+import io
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from app.auth.services.worker_pool import BoundedProcessPool
+from app.enterprises.services.blob_storage import LocalBlobStorage
+from app.enterprises.services.image_pipeline import RENDITION_FORMATS, RENDITIONS, ImagePipeline, _render
+from app.enterprises.services.upload_service import UploadService
+
+
+def logo_bytes(size=(2000, 500), mode="RGBA", format="PNG"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def test_render_fits_each_rendition_in_its_box():
+    encoded = _render(logo_bytes())
+
+    assert set(encoded) == set(RENDITIONS)
+    for name, formats in encoded.items():
+        assert set(formats) == set(RENDITION_FORMATS)
+        for extension, data in formats.items():
+            with Image.open(io.BytesIO(data)) as image:
+                assert image.format == extension.upper()
+                assert image.width <= RENDITIONS[name][0] and image.height <= RENDITIONS[name][1]
+                assert image.mode == "RGBA"
+
+
+def test_render_never_upscales():
+    encoded = _render(logo_bytes(size=(40, 20), mode="RGB", format="JPEG"))
+    with Image.open(io.BytesIO(encoded["print"]["webp"])) as image:
+        assert image.size == (40, 20)
+
+
+def test_render_refuses_images_over_the_pixel_limit():
+    # Just over the limit, where Pillow on its own would only warn
+    with pytest.raises(Image.DecompressionBombError):
+        _render(logo_bytes(size=(150, 100)), max_pixels=10_000)
+    _render(logo_bytes(size=(100, 100)), max_pixels=10_000)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stores_renditions_and_returns_their_urls(tmp_path):
+    storage = LocalBlobStorage(tmp_path)
+    pool = BoundedProcessPool("test-images", max_workers=1, max_queue=1, timeout=60)
+    pipeline = ImagePipeline(pool, UploadService(storage, max_bytes=10**7, url_prefix="/logos/"))
+    try:
+        await storage.put("logo.png", logo_bytes())
+        renditions = await pipeline.create_renditions("logo.png")
+        header = renditions["header"]["webp"]
+        assert header.startswith("/logos/") and header.endswith(".webp")
+        assert (tmp_path / header[len("/logos/"):]).exists()
+        assert not list(tmp_path.glob(".*.part"))
+
+        await storage.put("broken.png", b"\x89PNG\r\n\x1a\n garbage")
+        with pytest.raises(HTTPException) as exc:
+            await pipeline.create_renditions("broken.png")
+        assert exc.value.status_code == 415
+
+        # Over IMAGE_MAX_PIXELS but under twice it; 1-bit keeps the file small
+        huge = io.BytesIO()
+        Image.new("1", (7000, 6000)).save(huge, format="PNG")
+        await storage.put("huge.png", huge.getvalue())
+        with pytest.raises(HTTPException) as exc:
+            await pipeline.create_renditions("huge.png")
+        assert exc.value.status_code == 415
+
+        assert await pipeline.create_renditions("logo.svg") is None
+    finally:
+        pipeline.shutdown()
@@ -0,0 +1,87 @@
+import json
+import time
+import jwt
+import pytest
+from fastapi import HTTPException
+from app.auth.services import token_service
+from app.auth.services.key_service import KeyRing
+from app.auth.services.token_service import TokenService, verified_token_cache
+
+
+def make_ring(tmp_path, algorithm="EdDSA", **overrides) -> KeyRing:
+    options = dict(rotation_interval=3600, retention=600, activation_delay=0)
+    options.update(overrides)
+    ring = KeyRing(algorithm=algorithm, keys_dir=tmp_path, **options)
+    ring.load()
+    return ring
+
+
+@pytest.mark.parametrize("algorithm", ["EdDSA", "ES256"])
+def test_tokens_carry_kid_and_verify_against_jwks(tmp_path, monkeypatch, algorithm):
+    ring = make_ring(tmp_path, algorithm)
+    monkeypatch.setattr(token_service, "key_ring", ring)
+    verified_token_cache.clear()
+
+    token = TokenService.create_access_token(5)
+    header = jwt.get_unverified_header(token)
+    assert header["alg"] == algorithm
+    assert header["kid"] == ring.signing_key().kid
+    assert TokenService.verify_token(token)["sub"] == "5"
+
+    # A downstream service only needs the published JWKS
+    jwks = json.loads(ring.jwks())
+    public_key = jwt.PyJWK(jwks["keys"][0]).key
+    assert jwt.decode(token, public_key, algorithms=[algorithm])["sub"] == "5"
+
+
+def test_keys_persist_across_reloads(tmp_path):
+    first = make_ring(tmp_path)
+    second = make_ring(tmp_path)
+    assert first.signing_key().kid == second.signing_key().kid
+
+
+def test_rotation_keeps_old_keys_until_their_tokens_expire(tmp_path, monkeypatch):
+    ring = make_ring(tmp_path, rotation_interval=0, retention=600)
+    monkeypatch.setattr(token_service, "key_ring", ring)
+    verified_token_cache.clear()
+    old_token = TokenService.create_access_token(1)
+    old_kid = ring.signing_key().kid
+
+    time.sleep(0.01)
+    assert ring.rotate_if_due()
+    assert ring.signing_key().kid != old_kid
+    assert len(json.loads(ring.jwks())["keys"]) == 2
+    assert TokenService.verify_token(old_token)["sub"] == "1"
+
+    ring.retention = 0
+    ring.rotation_interval = 3600
+    ring.rotate_if_due()
+    assert ring.verification_key(old_kid) is None
+    verified_token_cache.clear()
+    with pytest.raises(HTTPException):
+        TokenService.verify_token(old_token)
+
+
+def test_new_keys_are_published_before_signing(tmp_path):
+    ring = make_ring(tmp_path, activation_delay=3600)
+    first_kid = ring.signing_key().kid
+    new_key = ring.generate()
+    assert new_key.kid in ring.jwks().decode()
+    assert ring.signing_key().kid == first_kid
+
+
+def test_workers_sharing_a_directory_agree_on_keys(tmp_path):
+    first = make_ring(tmp_path, rotation_interval=0.5, reload_interval=0)
+    second = make_ring(tmp_path, rotation_interval=0.5, reload_interval=0)
+    # The second worker found the first one's key instead of creating its own
+    assert len(list(tmp_path.glob("*.pem"))) == 1
+
+    # Both are due to rotate; the second sees the first one's new key and skips
+    time.sleep(0.6)
+    assert first.rotate_if_due()
+    assert not second.rotate_if_due()
+    assert len(list(tmp_path.glob("*.pem"))) == 2
+
+    # Both sign with and publish the same set, including keys the other created
+    assert first.signing_key().kid == second.signing_key().kid
+    assert first.jwks() == second.jwks()
@@ -0,0 +1,69 @@
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.database import Base, LazySession
+from app.auth.models.users import User
+from app.auth.services.principal_cache import Principal, principal_cache
+from app.auth.services.token_service import TokenService
+
+
+@pytest_asyncio.fixture
+async def factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    checkouts = []
+    event.listen(engine.sync_engine.pool, "checkout", lambda *args: checkouts.append(1))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    opened = []
+
+    def open_session():
+        opened.append(1)
+        return session_factory()
+
+    yield open_session, opened, checkouts
+    await engine.dispose()
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.mark.asyncio
+async def test_rejected_token_never_opens_a_session(factory):
+    open_session, opened, checkouts = factory
+    session = LazySession(open_session)
+    with pytest.raises(HTTPException):
+        await TokenService.get_current_user(bearer("garbage"), session)
+    await session.close()
+    assert opened == [] and checkouts == []
+
+
+@pytest.mark.asyncio
+async def test_cached_principal_never_opens_a_session(factory):
+    open_session, opened, checkouts = factory
+    await principal_cache.set(Principal(
+        id=4242, email="c@example.com", username="c", first_name=None, last_name=None,
+        phone_number=None, subscription_plan=None, is_active=True, is_superuser=False, email_verified=True,
+    ))
+    session = LazySession(open_session)
+    principal = await TokenService.get_current_user(bearer(TokenService.create_access_token(4242)), session)
+    assert principal.id == 4242
+    assert opened == [] and checkouts == []
+    await principal_cache.invalidate(4242)
+
+
+@pytest.mark.asyncio
+async def test_session_opens_on_first_use(factory):
+    open_session, opened, checkouts = factory
+    session = LazySession(open_session)
+    assert not session.in_transaction()
+    session.add(User(email="a@example.com", username="a", password_hash="x"))
+    assert session.materialized and session.in_transaction()
+    await session.commit()
+    assert await session.get(User, 1) is not None
+    await session.close()
+    assert opened == [1] and checkouts
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.auth.database import Base
+from app.auth.models import users, email_outbox  # noqa: F401
+from app.enterprises.models import enterprises, subscriptions  # noqa: F401
+from app.schema_version import ALEMBIC_INI, SchemaVersionError, check_schema_version
+
+
+def alembic_config(url):
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def test_migrations_match_models_and_pass_startup_check(tmp_path):
+    path = tmp_path / "migrated.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    with pytest.raises(SchemaVersionError):
+        asyncio.run(check_schema_version(engine))
+
+    command.upgrade(alembic_config(f"sqlite:///{path}"), "head")
+
+    sync_engine = create_engine(f"sqlite:///{path}")
+    with sync_engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    sync_engine.dispose()
+
+    async def check():
+        await check_schema_version(engine)
+        await engine.dispose()
+    asyncio.run(check())
+
+
+def test_migrations_downgrade_cleanly(tmp_path):
+    config = alembic_config(f"sqlite:///{tmp_path / 'roundtrip.db'}")
+    command.upgrade(config, "head")
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
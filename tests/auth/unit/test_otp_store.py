@@ -0,0 +1,92 @@
+import pytest
+import pytest_asyncio
+from fakeredis import FakeAsyncRedis
+from app.auth.services.otp_store import InMemoryOTPStore, RedisOTPStore, create_otp_store
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def store(request):
+    if request.param == "memory":
+        yield InMemoryOTPStore(hmac_key="test-key", ttl=60, max_attempts=3)
+    else:
+        client = FakeAsyncRedis()
+        yield RedisOTPStore(client, hmac_key="test-key", ttl=60, max_attempts=3)
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_code_is_single_use(store):
+    code = await store.issue("user:1")
+    assert len(code) == 6 and code.isdigit()
+    assert await store.verify("user:1", code)
+    assert not await store.verify("user:1", code)
+
+
+@pytest.mark.asyncio
+async def test_codes_are_scoped_to_subject(store):
+    code = await store.issue("user:1")
+    assert not await store.verify("user:2", code)
+    assert await store.verify("user:1", code)
+
+
+@pytest.mark.asyncio
+async def test_reissue_replaces_previous_code(store):
+    first = await store.issue("user:1")
+    second = await store.issue("user:1")
+    if first != second:
+        assert not await store.verify("user:1", first)
+    assert await store.verify("user:1", second)
+
+
+@pytest.mark.asyncio
+async def test_code_is_discarded_after_max_attempts(store):
+    code = await store.issue("user:1")
+    wrong = "000000" if code != "000000" else "111111"
+    for _ in range(3):
+        assert not await store.verify("user:1", wrong)
+    assert not await store.verify("user:1", code)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_rejects_correct_code_once_attempts_are_used_up():
+    client = FakeAsyncRedis()
+    store = RedisOTPStore(client, hmac_key="test-key", ttl=60, max_attempts=3)
+    code = await store.issue("user:1")
+    # Concurrent wrong guesses were counted, but none has deleted the key yet
+    await client.hset("otp:user:1", "attempts", 3)
+
+    assert not await store.verify("user:1", code)
+    assert not await client.exists("otp:user:1")
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_clear_removes_code(store):
+    code = await store.issue("user:1")
+    await store.clear("user:1")
+    assert not await store.verify("user:1", code)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_sets_ttl_and_stores_only_digest():
+    client = FakeAsyncRedis()
+    store = RedisOTPStore(client, hmac_key="test-key", ttl=60)
+    code = await store.issue("user:1")
+
+    assert 0 < await client.ttl("otp:user:1") <= 60
+    stored = await client.hget("otp:user:1", "digest")
+    assert code.encode() not in stored
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_codes():
+    store = InMemoryOTPStore(hmac_key="test-key", ttl=0)
+    code = await store.issue("user:1")
+    assert not await store.verify("user:1", code)
+
+
+def test_create_otp_store_rejects_unknown_scheme():
+    assert isinstance(create_otp_store("memory://"), InMemoryOTPStore)
+    with pytest.raises(ValueError):
+        create_otp_store("mongodb://localhost")
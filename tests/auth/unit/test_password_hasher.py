@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from app.auth.services.password_hasher import PasswordHasher, build_crypt_context
+from app.auth.services.worker_pool import BoundedProcessPool, WorkerPoolBusy
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_round_trip():
+    hasher = PasswordHasher(BoundedProcessPool("test-hashing", max_workers=1, max_queue=4, timeout=30))
+    try:
+        hashed = await hasher.hash("Test@123")
+        assert hashed != "Test@123"
+        assert await hasher.verify("Test@123", hashed)
+        assert not await hasher.verify("Wrong@123", hashed)
+        metrics = hasher.metrics()
+        assert metrics["completed"] == 3
+        assert metrics["running"] == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_rejects_excess_work():
+    hasher = PasswordHasher(BoundedProcessPool("test-hashing", max_workers=1, max_queue=0, timeout=30))
+    try:
+        results = await asyncio.gather(
+            hasher.hash("Test@123"),
+            hasher.hash("Test@123"),
+            return_exceptions=True,
+        )
+        assert any(isinstance(r, WorkerPoolBusy) for r in results)
+        assert any(isinstance(r, str) for r in results)
+        assert hasher.metrics()["rejected"] == 1
+    finally:
+        hasher.shutdown()
+
+
+def test_build_crypt_context_flags_outdated_hashes():
+    old_context = build_crypt_context(["bcrypt"], bcrypt_rounds=4)
+    new_context = build_crypt_context(["bcrypt"], bcrypt_rounds=5)
+    stale_hash = old_context.hash("Test@123")
+
+    assert not old_context.needs_update(stale_hash)
+    assert new_context.needs_update(stale_hash)
+    # Stale hashes must still verify so they can be upgraded on login
+    assert new_context.verify("Test@123", stale_hash)
+
+
+@pytest.mark.asyncio
+async def test_timed_out_job_keeps_its_slot_until_it_finishes():
+    pool = BoundedProcessPool("test-timeouts", max_workers=1, max_queue=0, timeout=0.3)
+    try:
+        # Start the worker process so the slow job is running, not queued
+        await pool.run(abs, -1)
+        with pytest.raises(WorkerPoolBusy):
+            await pool.run(time.sleep, 1.5)
+        # The job is still running in the worker, so the pool is still full
+        with pytest.raises(WorkerPoolBusy):
+            await pool.run(abs, -1)
+        assert pool.metrics()["rejected"] == 1
+
+        for _ in range(50):
+            if pool.metrics()["running"] == 0:
+                break
+            await asyncio.sleep(0.1)
+        assert await pool.run(abs, -1) == 1
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_crashed_worker_frees_its_slot_and_the_pool_recovers():
+    pool = BoundedProcessPool("test-crashes", max_workers=1, max_queue=0, timeout=30)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(os._exit, 1)
+        assert await pool.run(abs, -1) == 1
+
+        # Submitting to a pool that was shut down underneath us fails without leaking the slot
+        pool._executor.shutdown()
+        with pytest.raises(RuntimeError):
+            await pool.run(abs, -1)
+        assert pool.metrics()["running"] == 0
+        assert pool.metrics()["failed"] == 2
+    finally:
+        pool.shutdown()
@@ -0,0 +1,68 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.database import Base
+from app.auth.models.users import Staff, StaffRole, User
+from app.auth.services.principal_cache import Principal
+from app.enterprises.models.enterprises import Enterprise, EnterpriseType
+from app.enterprises.services.enterprise_service import EnterpriseService
+from app.enterprises.services.permission_cache import permission_cache
+
+
+@pytest_asyncio.fixture
+async def setup():
+    permission_cache.clear()
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        owner = User(email="owner@example.com", username="owner", password_hash="x")
+        staff_user = User(email="staff@example.com", username="staff", password_hash="x")
+        session.add_all([owner, staff_user])
+        await session.flush()
+        enterprise = Enterprise(
+            owner_id=owner.id, name="Acme", email="acme@example.com", type=EnterpriseType.BUSINESS,
+            default_tax_year=2025, country="NG", city="Lagos",
+        )
+        session.add(enterprise)
+        await session.flush()
+        session.add(Staff(user_id=staff_user.id, enterprise_id=enterprise.id, role=StaffRole.CPA, is_active=False))
+        await session.commit()
+        statements.clear()
+        yield session, Principal.from_user(owner), Principal.from_user(staff_user), enterprise, statements
+    await engine.dispose()
+    permission_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_enterprise_and_decision_come_from_one_query(setup):
+    session, owner, staff_user, enterprise, statements = setup
+    service = EnterpriseService(session)
+
+    assert await service.get_enterprise_for_user(enterprise.id, owner) == (enterprise, True)
+    assert await service.get_enterprise_for_user(enterprise.id, staff_user) == (enterprise, False)
+    assert await service.get_enterprise_for_user(9999, owner) == (None, False)
+    assert len(statements) == 3
+
+    # Cached decision: the enterprise itself comes from the identity map
+    assert await service.get_enterprise_for_user(enterprise.id, owner) == (enterprise, True)
+    assert len(statements) == 3
+
+
+@pytest.mark.asyncio
+async def test_staff_changes_invalidate_cached_decisions(setup):
+    session, owner, staff_user, enterprise, statements = setup
+    service = EnterpriseService(session)
+    assert not await service.has_permission(enterprise, staff_user.id)
+    assert permission_cache.get((staff_user.id, enterprise.id)) is False
+
+    staff = (await session.execute(select(Staff).filter_by(user_id=staff_user.id))).scalar_one()
+    staff.is_active = True
+    await session.commit()
+
+    assert permission_cache.get((staff_user.id, enterprise.id)) is None
+    assert await service.has_permission(enterprise, staff_user.id)
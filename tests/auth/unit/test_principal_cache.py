@@ -0,0 +1,60 @@
+import pytest
+from fakeredis import FakeAsyncRedis
+from app.auth.models.users import SubscriptionPlans, User
+from app.auth.services.cache import TTLCache
+from app.auth.services.principal_cache import Principal, PrincipalCache
+
+
+def make_principal(user_id: int = 1, **overrides) -> Principal:
+    user = User(
+        id=user_id,
+        email=f"user{user_id}@example.com",
+        username=f"user{user_id}",
+        first_name="Test",
+        last_name="User",
+        phone_number=None,
+        subscription_plan=SubscriptionPlans.PRO,
+        is_active=True,
+        is_superuser=False,
+        email_verified=True,
+    )
+    for key, value in overrides.items():
+        setattr(user, key, value)
+    return Principal.from_user(user)
+
+
+@pytest.mark.asyncio
+async def test_local_cache_get_set_and_invalidate():
+    cache = PrincipalCache(TTLCache(max_size=10, default_ttl=60))
+    principal = make_principal()
+
+    assert await cache.get(1) is None
+    await cache.set(principal)
+    assert await cache.get(1) is principal
+
+    await cache.invalidate(1)
+    assert await cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared_between_processes():
+    redis = FakeAsyncRedis()
+    writer = PrincipalCache(TTLCache(max_size=10, default_ttl=60), redis=redis)
+    reader = PrincipalCache(TTLCache(max_size=10, default_ttl=60), redis=redis)
+    principal = make_principal(7)
+
+    await writer.set(principal)
+    assert await reader.get(7) == principal
+    assert 0 < await redis.ttl("principal:7") <= writer.redis_ttl
+
+    await writer.invalidate(7)
+    assert await redis.get("principal:7") is None
+    await redis.aclose()
+
+
+def test_principal_is_immutable_and_serialisable():
+    principal = make_principal(is_superuser=True)
+    with pytest.raises(AttributeError):
+        principal.is_superuser = False  # type: ignore
+    assert Principal.from_json(principal.to_json()) == principal
+    assert principal.subscription_plan == "pro"
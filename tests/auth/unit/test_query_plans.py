@@ -0,0 +1,116 @@
+import pytest
+from datetime import datetime
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.models.email_outbox import EmailOutbox, OutboxStatus
+from app.auth.models.users import Client, Staff, StaffRole, User
+from app.auth.services import token_service
+from app.auth.services.auth_service import AuthService
+from app.auth.services.email_outbox import OutboxWorker
+from app.auth.services.principal_cache import principal_cache
+from app.auth.services.token_service import TokenService, hash_token
+from app.enterprises.models.enterprises import Enterprise, EnterpriseType
+from app.enterprises.services.enterprise_service import EnterpriseService
+from app.schema_version import ALEMBIC_INI
+
+
+async def introspect_batch(session_factory):
+    for user_id in (1, 2, 3):
+        await principal_cache.invalidate(user_id)
+    async with session_factory() as db:
+        await TokenService.introspect_tokens(db, [TokenService.create_access_token(i) for i in (1, 2, 3)])
+
+
+async def access_claims(session_factory):
+    async with session_factory() as db:
+        await TokenService.build_access_claims(db, await db.get(User, 1))
+
+
+async def resolve_access(session_factory):
+    async with session_factory() as db:
+        await EnterpriseService(db)._resolve_access(1, 2)
+
+
+async def claim_outbox(session_factory):
+    await OutboxWorker(session_factory)._claim("plan-check")
+
+
+def with_session(call):
+    async def run(session_factory):
+        async with session_factory() as db:
+            await call(db)
+    return run
+
+
+# Code paths on the request path (and the outbox poller). The SQL they really
+# issue is captured and each statement must be served by an index (SEARCH)
+# rather than a full table or index scan. Register new ones here.
+HOT_PATHS = {
+    "user by email": with_session(lambda db: AuthService(db).get_user_by_email("u1@example.com")),
+    "user by username": with_session(lambda db: AuthService(db).get_user_by_username("u1")),
+    "user by verification token": with_session(lambda db: AuthService(db).verify_user_email("unknown")),
+    "users by id batch": introspect_batch,
+    "staff by invite token": with_session(lambda db: EnterpriseService(db).accept_invitation("unknown")),
+    "memberships for claims": access_claims,
+    "enterprise with access decision": resolve_access,
+    "due outbox emails": claim_outbox,
+}
+
+
+@pytest.fixture(scope="module")
+def seeded(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "plans.db"
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "head")
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"u{i}@example.com", "username": f"u{i}", "password_hash": "x",
+             "subscription_plan": "FREE", "token_version": 0, "verification_token_hash": hash_token(f"v{i}")}
+            for i in range(1, 501)
+        ])
+        conn.execute(insert(Enterprise), [
+            {"id": i, "owner_id": i, "name": f"e{i}", "email": f"e{i}@example.com", "type": EnterpriseType.BUSINESS,
+             "default_tax_year": 2025, "country": "NG", "city": "Lagos"}
+            for i in range(1, 101)
+        ])
+        conn.execute(insert(Staff), [
+            {"user_id": i, "enterprise_id": (i % 100) + 1, "role": StaffRole.CPA, "is_active": i % 2 == 0,
+             "invite_token_hash": hash_token(f"i{i}")}
+            for i in range(1, 501)
+        ])
+        conn.execute(insert(Client), [
+            {"user_id": i, "enterprise_id": (i % 100) + 1, "is_active": True} for i in range(1, 501)
+        ])
+        conn.execute(insert(EmailOutbox), [
+            {"template": "welcome", "to_email": f"u{i}@example.com", "context": {}, "attempts": 0,
+             "status": OutboxStatus.SENT if i % 10 else OutboxStatus.PENDING, "next_attempt_at": datetime(2025, 1, 1)}
+            for i in range(1, 501)
+        ])
+        conn.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", HOT_PATHS)
+async def test_hot_path_queries_use_an_index(seeded, name, monkeypatch):
+    monkeypatch.setattr(token_service, "ACCESS_TOKEN_PROFILE", "claims")
+    engine = create_async_engine(seeded.url.set(drivername="sqlite+aiosqlite"))
+    executed = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, parameters, *args: executed.append((statement, parameters)))
+    await HOT_PATHS[name](async_sessionmaker(engine, expire_on_commit=False))
+    await engine.dispose()
+
+    queries = [(sql, params) for sql, params in executed if sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))]
+    assert queries, f"{name} issued no queries"
+    with seeded.connect() as conn:
+        for sql, params in queries:
+            plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)]
+            scans = [step for step in plan if step.startswith("SCAN")]
+            assert not scans, f"{name} falls back to a scan: {sql} -> {plan}"
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import InvalidRequestError
+from app.auth.database import ReplicaRouter, create_engine_from_settings, read_sessionmaker
+from app.auth.models.users import User
+from app.config import DatabaseSettings
+
+
+def make_engine(url):
+    return create_engine_from_settings(DatabaseSettings(), url)
+
+
+async def database_name(session):
+    return (await session.execute(text("PRAGMA database_list"))).all()[0][2]
+
+
+@pytest.mark.asyncio
+async def test_replicas_are_used_round_robin(tmp_path):
+    replicas = [make_engine(f"sqlite:///{tmp_path / name}") for name in ("r1.db", "r2.db")]
+    primary = make_engine("sqlite+aiosqlite://")
+    router = ReplicaRouter(replicas, read_sessionmaker(primary), retry_after=30)
+
+    seen = []
+    for _ in range(4):
+        session = await router.session()
+        seen.append((await database_name(session)).rsplit("/", 1)[-1])
+        await session.close()
+    assert seen == ["r1.db", "r2.db", "r1.db", "r2.db"]
+
+    for e in replicas + [primary]:
+        await e.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_is_skipped_then_falls_back_to_primary(tmp_path):
+    broken = make_engine(f"sqlite:///{tmp_path / 'missing' / 'r.db'}")
+    primary = make_engine("sqlite+aiosqlite://")
+    router = ReplicaRouter([broken], read_sessionmaker(primary), retry_after=30)
+
+    session = await router.session()
+    assert await database_name(session) == ""  # in-memory primary
+    await session.close()
+    assert router.metrics()["replicas"][0]["healthy"] is False
+    assert router.metrics()["primary_fallbacks"] == 1
+
+    router.fallback_to_primary = False
+    with pytest.raises(RuntimeError):
+        await router.session()
+
+    await broken.dispose()
+    await primary.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_sessions_never_commit():
+    primary = make_engine("sqlite+aiosqlite://")
+    statements = []
+    event.listen(primary.sync_engine, "commit", lambda conn: statements.append("COMMIT"))
+    router = ReplicaRouter([], read_sessionmaker(primary), retry_after=30)
+
+    session = await router.session()
+    await session.execute(text("SELECT 1"))
+    session.add(User(email="a@example.com", username="a", password_hash="x"))
+    with pytest.raises(InvalidRequestError):
+        await session.commit()
+    await session.close()
+    assert statements == []
+    await primary.dispose()
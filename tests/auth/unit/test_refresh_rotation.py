@@ -0,0 +1,165 @@
+import time
+import pytest
+import pytest_asyncio
+from fakeredis import FakeAsyncRedis
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.database import Base
+from app.auth.models.users import User
+from app.auth.services import auth_service as auth_service_module
+from app.auth.services import revocation_service
+from app.auth.services.auth_service import AuthService
+from app.auth.services.revocation_service import (
+    BloomFilter,
+    InMemoryRevocationStore,
+    RedisBloomFilter,
+    RedisRevocationStore,
+    RevocationIndex,
+    _digest,
+    check_revocation_store,
+)
+from app.auth.services.token_service import TokenService
+
+
+def make_index(prune_interval: float = 300) -> RevocationIndex:
+    return RevocationIndex(InMemoryRevocationStore(), BloomFilter(1000, 0.01), prune_interval=prune_interval)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    digests = [_digest(f"jti-{i}") for i in range(1000)]
+    for digest in digests:
+        bloom.add(digest)
+    assert all(digest in bloom for digest in digests)
+    false_positives = sum(_digest(f"other-{i}") in bloom for i in range(1000))
+    assert false_positives < 50
+
+
+@pytest.mark.asyncio
+async def test_revoke_is_exact_and_idempotent():
+    index = make_index()
+    assert not await index.is_revoked("a")
+    assert await index.revoke("a", time.time() + 60)
+    assert not await index.revoke("a", time.time() + 60)
+    assert await index.is_revoked("a")
+    assert not await index.is_revoked("b")
+
+
+@pytest.mark.asyncio
+async def test_pruning_drops_expired_entries_and_rebuilds_filter():
+    index = make_index(prune_interval=0)
+    await index.revoke("short", time.time() + 0.01)
+    await index.revoke("long", time.time() + 60)
+    time.sleep(0.02)
+
+    await index.revoke("trigger", time.time() + 60)
+    assert not await index.is_revoked("short")
+    assert await index.is_revoked("long")
+    assert _digest("short") not in index.bloom
+
+
+@pytest.mark.asyncio
+async def test_redis_store_is_exact_across_instances():
+    client = FakeAsyncRedis()
+    first = RevocationIndex(RedisRevocationStore(client), BloomFilter(1000, 0.01))
+    second = RevocationIndex(RedisRevocationStore(client), BloomFilter(1000, 0.01))
+
+    assert await first.revoke("a", time.time() + 60)
+    # The second worker's filter never saw "a"; the shared store still answers
+    assert await second.is_revoked("a")
+    assert not await second.revoke("a", time.time() + 60)
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_redis_bloom_filter_is_shared_and_expires_by_generation(monkeypatch):
+    client = FakeAsyncRedis()
+    start = (int(time.time()) // 100 + 1) * 100
+    now = {"t": float(start)}
+    monkeypatch.setattr(time, "time", lambda: now["t"])
+
+    def index():
+        return RevocationIndex(RedisRevocationStore(client), RedisBloomFilter(client, 1000, 0.01, window=100))
+
+    first, second = index(), index()
+    # The current generation has not collected for a full window: every check asks the store
+    assert await second.bloom.might_contain(_digest("never"))
+    await first.revoke("a", now["t"] + 150)
+    # Each generation expires when its window ends, so the filter never grows
+    generation = start // 100
+    assert await client.expiretime(f"revoked-bloom:{generation}") == start + 101
+    assert await client.expiretime(f"revoked-bloom:{generation + 1}:opened") == start + 201
+
+    now["t"] += 100
+    # Opened during the previous window, so a negative answer is trusted
+    assert not await second.bloom.might_contain(_digest("never"))
+    assert not await second.is_revoked("never")
+    assert await second.bloom.might_contain(_digest("a"))
+    assert await second.is_revoked("a")
+
+    # A revocation outliving the window stays in every generation it reaches
+    await second.revoke("long", now["t"] + 250)
+    now["t"] += 250
+    assert await first.bloom.might_contain(_digest("long"))
+    assert not await client.exists(f"revoked-bloom:{generation}")
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_local_filter_is_not_used_with_a_shared_store():
+    client = FakeAsyncRedis()
+    index = RevocationIndex(RedisRevocationStore(client), BloomFilter(1000, 0.01), prune_interval=0)
+    await index.revoke("a", time.time() + 60)
+    await index.revoke("b", time.time() + 60)
+    assert index.bloom.count == 0
+    assert await index.is_revoked("a")
+    await client.aclose()
+
+
+def test_memory_store_is_refused_with_several_workers(monkeypatch, capsys):
+    check_revocation_store(make_index(), workers=1)
+    with pytest.raises(RuntimeError):
+        check_revocation_store(make_index(), workers=4)
+    check_revocation_store(RevocationIndex(RedisRevocationStore(None), BloomFilter(10, 0.01)), workers=4)
+
+    monkeypatch.setattr(revocation_service.multiprocessing, "parent_process", lambda: object())
+    check_revocation_store(make_index(), workers=1)
+    assert "WARNING" in capsys.readouterr().out
+
+
+@pytest_asyncio.fixture
+async def session(monkeypatch):
+    monkeypatch.setattr(auth_service_module, "revocation_index", make_index())
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        session.add(User(id=1, email="a@example.com", username="a", password_hash="x"))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_and_rejects_reuse(session):
+    service = AuthService(session)
+    user = await session.get(User, 1)
+    original = TokenService.create_tokens_for_user(user)["refresh_token"]
+
+    rotated = (await service.refresh_token(original))["refresh_token"]
+    assert rotated != original
+    assert TokenService.verify_token(rotated, "refresh")["fam"] == TokenService.verify_token(original, "refresh")["fam"]
+
+    # Replaying the old token fails and revokes the whole family
+    with pytest.raises(HTTPException):
+        await service.refresh_token(original)
+    with pytest.raises(HTTPException):
+        await service.refresh_token(rotated)
+
+
+@pytest.mark.asyncio
+async def test_refresh_tokens_without_jti_are_rejected(session):
+    token = TokenService.encode_token({"sub": "1", "exp": time.time() + 60, "type": "refresh"})
+    with pytest.raises(HTTPException) as exc:
+        await AuthService(session).refresh_token(token)
+    assert exc.value.status_code == 401
@@ -0,0 +1,37 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from app.middleware.static_files import IMMUTABLE_CACHE_CONTROL, ImmutableStaticFiles
+
+HASHED = "0123456789abcdef0123456789abcdef.png"
+
+
+@pytest.mark.asyncio
+async def test_content_addressed_files_are_immutable_with_strong_etags(tmp_path):
+    (tmp_path / HASHED).write_bytes(b"png")
+    (tmp_path / "enterprise_1.png").write_bytes(b"legacy")
+    transport = ASGITransport(app=ImmutableStaticFiles(directory=tmp_path))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(f"/{HASHED}")
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["etag"] == '"0123456789abcdef0123456789abcdef"'
+
+        cached = await client.get(f"/{HASHED}", headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304 and cached.content == b""
+
+        legacy = await client.get("/enterprise_1.png")
+        assert legacy.status_code == 200
+        assert legacy.headers["cache-control"] == "no-cache"
+
+
+@pytest.mark.asyncio
+async def test_svgs_cannot_run_script_from_our_origin(tmp_path):
+    name = "fedcba9876543210fedcba9876543210.svg"
+    (tmp_path / name).write_bytes(b'<svg xmlns="http://www.w3.org/2000/svg" onload="alert(1)"/>')
+    transport = ASGITransport(app=ImmutableStaticFiles(directory=tmp_path))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(f"/{name}")
+        assert response.status_code == 200
+        assert response.headers["content-security-policy"] == "default-src 'none'; style-src 'unsafe-inline'"
+        assert response.headers["content-disposition"] == "attachment"
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
@@ -0,0 +1,62 @@
+import time
+import pytest
+from fastapi import HTTPException
+from app.auth.services import token_service
+from app.auth.services.cache import TTLCache
+from app.auth.services.token_service import TokenService, verified_token_cache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, default_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_drops_expired_entries():
+    cache = TTLCache(max_size=10)
+    cache.set("past", 1, expires_at=time.time() - 1)
+    cache.set("soon", 2, expires_at=time.time() + 0.05)
+    assert cache.get("past") is None
+    assert cache.get("soon") == 2
+    time.sleep(0.06)
+    assert cache.get("soon") is None
+    assert len(cache) == 0
+
+
+def test_decode_token_skips_verification_on_repeat(monkeypatch):
+    verified_token_cache.clear()
+    token = TokenService.create_access_token(1)
+
+    calls = []
+    real_decode = token_service.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(1)
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(token_service.jwt, "decode", counting_decode)
+
+    first = TokenService.verify_token(token)
+    second = TokenService.verify_token(token)
+    assert first == second
+    assert first["sub"] == "1"
+    assert len(calls) == 1
+
+    # Callers get a copy, so mutating it cannot poison the cache
+    second["sub"] = "2"
+    assert TokenService.verify_token(token)["sub"] == "1"
+
+
+def test_invalid_tokens_are_not_cached():
+    verified_token_cache.clear()
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            TokenService.decode_token("not-a-jwt")
+    assert len(verified_token_cache) == 0
@@ -0,0 +1,136 @@
+import pytest
+import pytest_asyncio
+from fastapi.security import HTTPAuthorizationCredentials
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.auth.database import Base, get_read_db
+from app.auth.models.users import User
+from app.auth.routes import auth_routes
+from app.auth.services import token_service
+from app.auth.services.principal_cache import Principal, principal_cache
+from app.auth.services.token_service import TokenService
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    from main import app
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    async with session_factory() as session:
+        users = [User(email=f"u{i}@example.com", username=f"u{i}", password_hash="x") for i in range(3)]
+        users[2].is_active = False
+        session.add_all(users)
+        await session.commit()
+    for user in users:
+        await principal_cache.invalidate(user.id)
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    monkeypatch.setattr(auth_routes, "INTERNAL_API_KEY", "internal-secret")
+    monkeypatch.setattr(token_service, "AsyncSessionLocal", session_factory)
+    app.dependency_overrides[get_read_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client, users, statements, session_factory
+    app.dependency_overrides.pop(get_read_db, None)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_batch_introspection_resolves_users_in_one_query(client):
+    client, users, statements, _ = client
+    tokens = [
+        TokenService.create_access_token(users[0].id),
+        TokenService.create_access_token(users[1].id),
+        TokenService.create_access_token(users[2].id),
+        TokenService.create_refresh_token(users[0].id),
+        "garbage",
+        TokenService.create_access_token(9999),
+    ]
+
+    response = await client.post(
+        "/auth/introspect/batch",
+        json={"tokens": tokens},
+        headers={"X-Internal-API-Key": "internal-secret"},
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+
+    assert [r["status"] for r in results] == [
+        "active", "active", "user_inactive", "invalid", "invalid", "user_not_found",
+    ]
+    assert results[0]["principal"]["email"] == "u0@example.com"
+    assert results[3]["principal"] is None
+    # One IN query for every user; the one it did not find is re-checked on the primary
+    assert len([s for s in statements if "FROM users" in s]) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_introspection_requires_internal_key(client):
+    client, users, _, _ = client
+    response = await client.post(
+        "/auth/introspect/batch",
+        json={"tokens": [TokenService.create_access_token(users[0].id)]},
+        headers={"X-Internal-API-Key": "wrong"},
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_tokens_newer_than_the_cached_principal_refetch_it(client):
+    client, users, _, session_factory = client
+    # Cached before the user's memberships changed
+    async with session_factory() as session:
+        await principal_cache.set(Principal.from_user(await session.get(User, users[0].id)))
+        user = await session.get(User, users[0].id)
+        user.token_version = 1
+        await session.commit()
+
+    current = TokenService.create_access_token(users[0].id, {"su": False, "ent": {}, "ver": 1})
+    old = TokenService.create_access_token(users[0].id, {"su": False, "ent": {}, "ver": 0})
+    response = await client.post(
+        "/auth/introspect/batch",
+        json={"tokens": [current, old]},
+        headers={"X-Internal-API-Key": "internal-secret"},
+    )
+    assert [r["status"] for r in response.json()["results"]] == ["active", "outdated"]
+    assert (await principal_cache.get(users[0].id)).token_version == 1
+
+
+@pytest.mark.asyncio
+async def test_users_missing_from_the_replica_are_read_from_the_primary(client, monkeypatch):
+    client, users, _, replica_factory = client
+    # A user just created on the primary that the replica has not received yet
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    primary_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with primary_factory() as session:
+        session.add(User(id=500, email="new@example.com", username="new", password_hash="x"))
+        await session.commit()
+    monkeypatch.setattr(token_service, "AsyncSessionLocal", primary_factory)
+
+    response = await client.post(
+        "/auth/introspect/batch",
+        json={"tokens": [TokenService.create_access_token(500), TokenService.create_access_token(9999)]},
+        headers={"X-Internal-API-Key": "internal-secret"},
+    )
+    assert [r["status"] for r in response.json()["results"]] == ["active", "user_not_found"]
+
+    await principal_cache.invalidate(500)
+    token = HTTPAuthorizationCredentials(scheme="Bearer", credentials=TokenService.create_access_token(500))
+    async with replica_factory() as replica:
+        principal = await TokenService.get_current_user(token, replica)
+    assert principal.email == "new@example.com"
+    await principal_cache.invalidate(500)
+    await engine.dispose()
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi import FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+from jwt.algorithms import OKPAlgorithm
+from app.microservices import token_verifier
+from app.microservices.crm.crm_routes import crm_router
+from app.microservices.token_verifier import JWKSCache, verify_access_token
+
+
+def signing_key(kid):
+    key = ed25519.Ed25519PrivateKey.generate()
+    jwk = json.loads(OKPAlgorithm.to_jwk(key.public_key()))
+    return key, {**jwk, "kid": kid, "alg": "EdDSA", "use": "sig"}
+
+
+def token(key, kid, **claims):
+    payload = {"sub": "1", "type": "access", "exp": time.time() + 60, **claims}
+    return jwt.encode(payload, key, algorithm="EdDSA", headers={"kid": kid})
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    keys = {"published": []}
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"keys": keys["published"]})
+
+    cache = JWKSCache("http://gateway/jwks.json", lifespan=3600, min_refresh=0,
+                      client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(token_verifier, "jwks_cache", cache)
+    return cache, keys, requests
+
+
+@pytest.mark.asyncio
+async def test_keys_are_fetched_once_and_refetched_for_an_unknown_kid(gateway):
+    cache, keys, requests = gateway
+    first, first_jwk = signing_key("k1")
+    keys["published"] = [first_jwk]
+
+    claims = await asyncio.gather(*(verify_access_token(token(first, "k1")) for _ in range(5)))
+    assert all(c["sub"] == "1" for c in claims)
+    assert len(requests) == 1
+
+    second, second_jwk = signing_key("k2")
+    keys["published"] = [first_jwk, second_jwk]
+    assert (await verify_access_token(token(second, "k2")))["sub"] == "1"
+    assert len(requests) == 2
+
+    cache.min_refresh = 3600
+    with pytest.raises(HTTPException) as exc:
+        await verify_access_token(token(signing_key("k3")[0], "k3"))
+    assert exc.value.status_code == 401
+    # Unknown kids cannot make every request refetch
+    assert len(requests) == 2
+    await cache.aclose()
+
+
+@pytest.mark.asyncio
+async def test_refresh_tokens_and_bad_signatures_are_rejected(gateway):
+    cache, keys, _ = gateway
+    key, jwk = signing_key("k1")
+    keys["published"] = [jwk]
+    with pytest.raises(HTTPException):
+        await verify_access_token(token(key, "k1", type="refresh"))
+    with pytest.raises(HTTPException):
+        await verify_access_token(token(signing_key("k1")[0], "k1"))
+    await cache.aclose()
+
+
+@pytest.mark.asyncio
+async def test_service_routes_require_a_verified_token(gateway):
+    cache, keys, _ = gateway
+    key, jwk = signing_key("k1")
+    keys["published"] = [jwk]
+    app = FastAPI()
+
+    @crm_router.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    app.include_router(crm_router)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/crm/ping")).status_code in (401, 403)
+        bad = await client.get("/crm/ping", headers={"Authorization": "Bearer nonsense"})
+        assert bad.status_code == 401
+        good = await client.get("/crm/ping", headers={"Authorization": f"Bearer {token(key, 'k1')}"})
+        assert good.status_code == 200
+    await cache.aclose()
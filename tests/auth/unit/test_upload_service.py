@@ -0,0 +1,79 @@
+import hashlib
+import io
+import os
+import pytest
+from fastapi import HTTPException, UploadFile
+from app.enterprises.services.blob_storage import LocalBlobStorage
+from app.enterprises.services.upload_service import UploadService, sniff_image_type
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+def upload(data: bytes, filename="logo.png") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename)
+
+
+@pytest.mark.parametrize("head, extension", [
+    (PNG, ".png"),
+    (b"\xff\xd8\xff\xe0JFIF", ".jpg"),
+    (b"GIF89a...", ".gif"),
+    (b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg"/>', ".svg"),
+    (b"MZ\x90\x00", None),
+    (b"<html><script>", None),
+])
+def test_sniff_image_type(head, extension):
+    assert sniff_image_type(head) == extension
+
+
+@pytest.mark.asyncio
+async def test_save_streams_to_a_content_addressed_path(tmp_path):
+    service = UploadService(LocalBlobStorage(tmp_path), max_bytes=1024, url_prefix="/logos/", chunk_size=16)
+    saved = await service.save(upload(PNG, filename="logo.gif"))
+    # The extension comes from the content, not the filename
+    name = hashlib.sha256(PNG).hexdigest()[:32] + ".png"
+    assert saved == name
+    assert (tmp_path / name).read_bytes() == PNG
+    assert service.url_for(name) == f"/logos/{name}"
+
+    # Identical uploads share one file
+    assert await service.save(upload(PNG)) == name
+    assert [p.name for p in tmp_path.iterdir()] == [name]
+
+
+@pytest.mark.asyncio
+async def test_non_images_are_rejected_before_writing(tmp_path):
+    service = UploadService(LocalBlobStorage(tmp_path / "logos"), max_bytes=1024, url_prefix="/logos/")
+    with pytest.raises(HTTPException) as exc:
+        await service.save(upload(b"#!/bin/sh\nrm -rf /"))
+    assert exc.value.status_code == 415
+    assert not (tmp_path / "logos").exists()
+
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_cut_off_and_cleaned_up(tmp_path):
+    service = UploadService(LocalBlobStorage(tmp_path), max_bytes=64, url_prefix="/logos/", chunk_size=16)
+    with pytest.raises(HTTPException) as exc:
+        await service.save(upload(PNG))
+    assert exc.value.status_code == 413
+    # No temp file is left behind
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_urls_only_map_to_blobs_in_the_store(tmp_path):
+    service = UploadService(LocalBlobStorage(tmp_path / "logos"), max_bytes=1024, url_prefix="/logos/")
+    assert service.name_for("/logos/abc.png") == "abc.png"
+    assert service.name_for("/logos/../secret.txt") == "secret.txt"
+    assert service.name_for("/elsewhere/secret.txt") is None
+
+
+@pytest.mark.asyncio
+async def test_garbage_collection_keeps_referenced_and_recent_files(tmp_path):
+    service = UploadService(LocalBlobStorage(tmp_path), max_bytes=1024, url_prefix="/logos/")
+    for name in ["kept.png", "orphan.png", "fresh.png"]:
+        (tmp_path / name).write_bytes(b"x")
+    for name in ["kept.png", "orphan.png"]:
+        os.utime(tmp_path / name, (0, 0))
+
+    removed = await service.collect_garbage({"/logos/kept.png", "https://cdn.example.com/other.png"}, grace_seconds=60)
+    assert removed == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fresh.png", "kept.png"]